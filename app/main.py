@@ -1,14 +1,96 @@
 from fastapi import FastAPI
+from fastapi.responses import Response
 from dotenv import load_dotenv
 from app.routes import feeds, posts, subscribers
 from app.services.scheduler import start_scheduler
+from app.services.persistence import get_read_cache_stats, get_lock_stats, codec
+from app.services.generation_cache import generation_cache
+from app.services.llm_client import generation_pool
+from app.services.llm_resilience import CLOSED, HALF_OPEN, OPEN, circuit_breaker, resilient_caller
+from app.services.rate_limiter import rate_limiter
+from app.services.model_router import model_router
+from app.services.jobs import job_workers
+from app.services.idempotency import idempotency_store
+from app.services.speculation import speculator
+from app.services.metrics import CONTENT_TYPE, CallbackMetric, registry, render_metrics
 
 # Load environment variables from .env file
 load_dotenv()
 start_scheduler()  # Uncomment to activate scheduling on app start
+job_workers.start()  # Also resumes jobs queued before a restart
 
 app = FastAPI(title="Trivance Content Engine")
 
 app.include_router(feeds.router, prefix="/feeds", tags=["Feeds"])
 app.include_router(posts.router, prefix="/posts", tags=["Posts"])
 app.include_router(subscribers.router, prefix="/subscribers", tags=["Subscribers"])
+
+
+@app.get("/health", tags=["System"])
+def health():
+    """Liveness check with storage cache statistics."""
+    return {
+        "status": "ok",
+        "storage": {
+            "codec": codec.name,
+            "read_cache": get_read_cache_stats(),
+            "locks": get_lock_stats(),
+        },
+        "generation": {
+            "cache": generation_cache.stats(),
+            "pool": generation_pool.stats(),
+            "resilience": resilient_caller.stats(),
+            "circuit_breaker": circuit_breaker.stats(),
+            "rate_limit": rate_limiter.stats(),
+            "router": model_router.stats(),
+            "jobs": job_workers.stats(),
+            "idempotency": idempotency_store.stats(),
+            "speculation": speculator.stats(),
+        },
+    }
+
+
+# Live state, read when /metrics is scraped
+registry.register(CallbackMetric(
+    "trivance_generation_in_flight", "LLM calls currently running.",
+    lambda: {(): generation_pool.in_flight}))
+registry.register(CallbackMetric(
+    "trivance_generation_waiting", "LLM calls waiting for a pool slot.",
+    lambda: {(): generation_pool.waiting}))
+registry.register(CallbackMetric(
+    "trivance_generation_pool_outcomes_total", "Finished LLM pool calls by outcome.",
+    lambda: {(k,): v for k, v in generation_pool.stats().items()
+             if k in ("completed", "failed", "timed_out", "cancelled")},
+    ("outcome",), type="counter"))
+registry.register(CallbackMetric(
+    "trivance_llm_retries_total", "LLM attempts retried after transient errors.",
+    lambda: {(): resilient_caller.retries}, type="counter"))
+registry.register(CallbackMetric(
+    "trivance_llm_hedges_total", "Hedged LLM requests fired and won.",
+    lambda: {("fired",): resilient_caller.hedges_fired, ("won",): resilient_caller.hedges_won},
+    ("result",), type="counter"))
+registry.register(CallbackMetric(
+    "trivance_llm_circuit_state", "OpenAI circuit breaker state (1 for the current state).",
+    lambda: {(state,): int(circuit_breaker.state == state) for state in (CLOSED, OPEN, HALF_OPEN)},
+    ("state",)))
+registry.register(CallbackMetric(
+    "trivance_llm_circuit_events_total", "Times the circuit opened, and calls it refused.",
+    lambda: {("opened",): circuit_breaker.opened, ("rejected",): circuit_breaker.rejected},
+    ("event",), type="counter"))
+registry.register(CallbackMetric(
+    "trivance_router_routes_total", "Generations routed to each model or to templates.",
+    lambda: {(target,): count for target, count in model_router.stats()["routes"].items()},
+    ("target",), type="counter"))
+registry.register(CallbackMetric(
+    "trivance_rate_limit_queue_depth", "Requests waiting for rate limiter capacity (all processes).",
+    lambda: {(): rate_limiter.queue_depth()}))
+registry.register(CallbackMetric(
+    "trivance_speculation_total", "Speculative pre-generations by outcome.",
+    lambda: {(k,): getattr(speculator, k) for k in ("submitted", "generated", "failed")},
+    ("outcome",), type="counter"))
+
+
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def metrics():
+    """Prometheus metrics: generation latency, tokens, fallbacks and cache hits."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
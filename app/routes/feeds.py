@@ -5,6 +5,8 @@ from app.services.rss import (
     add_feed, get_all_feeds, remove_feed, 
     get_articles_by_feed_name, get_top_article_from_all_feeds
 )
+from app.routes.responses import CodecJSONResponse
+from app.services.speculation import speculator
 
 router = APIRouter()
 
@@ -12,11 +14,18 @@ class FeedInput(BaseModel):
     name: str
     url: str
 
+def _speculate(articles):
+    """Pre-generate the top of the queue in the background; never fails the request."""
+    try:
+        speculator.speculate(sorted(articles, key=lambda x: x.get("score", 0), reverse=True))
+    except Exception as e:
+        print(f"Error starting speculative generation: {e}")
+
 @router.post("/")
 def create_feed(feed: FeedInput):
     return add_feed(feed)
 
-@router.get("/")
+@router.get("/", response_class=CodecJSONResponse)
 def list_feeds():
     return get_all_feeds()
 
@@ -24,7 +33,7 @@ def list_feeds():
 def delete_feed(name: str):
     return remove_feed(name)
 
-@router.get("/articles")
+@router.get("/articles", response_class=CodecJSONResponse)
 def get_articles(feed_name: Optional[str] = None, limit: Optional[int] = 10):
     """
     Get articles from one feed or all feeds if feed_name is not provided.
@@ -39,6 +48,7 @@ def get_articles(feed_name: Optional[str] = None, limit: Optional[int] = 10):
                 articles.extend(fetch_articles_from_feed(feed["url"], limit))
         if not articles:
             raise HTTPException(status_code=404, detail="No articles found.")
+        _speculate(articles)
         return articles
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching articles: {str(e)}")
@@ -61,7 +71,7 @@ def get_top_article(max_age_days: Optional[int] = 7):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting top article: {str(e)}")
 
-@router.get("/articles/all")
+@router.get("/articles/all", response_class=CodecJSONResponse)
 def get_all_articles(limit_per_feed: Optional[int] = 5):
     """
     Get articles from all feeds with scores.
@@ -80,6 +90,7 @@ def get_all_articles(limit_per_feed: Optional[int] = 5):
         
         # Sort by score
         all_articles.sort(key=lambda x: x["score"], reverse=True)
+        _speculate(all_articles)
         return all_articles
         
     except Exception as e:
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from app.services.generator import generate_commentary
-from app.services.posts import save_generated_post, get_all_posts, get_recent_posts
-from app.services.persistence import save_json, load_json
+from app.services.generator import FANOUT_PLATFORMS, STYLE_EXAMPLES, generate_batch, generate_commentary
+from app.services.posts import save_generated_post, get_all_posts, get_recent_posts, get_post, delete_post
+from app.services.post_store import history_repository
+from app.services.retention import POLICIES, query_archive
+from app.services.jobs import attach_upgrade, callback_url_error, job_queue, job_workers, public_job
+from app.services.idempotency import IdempotencyConflict, IdempotencyInProgress, idempotency_store
+from app.routes.responses import CodecJSONResponse
+import json
 import re
 from datetime import datetime
 
@@ -32,6 +38,21 @@ class ArticleInput(BaseModel):
             data['source'] = "RSS Feeds"
         super().__init__(**data)
 
+class BatchGenerateInput(BaseModel):
+    articles: List[ArticleInput] = Field(..., min_length=1, description="Articles to generate for")
+    styles: List[str] = Field(default_factory=lambda: list(STYLE_EXAMPLES), description="Styles from STYLE_EXAMPLES")
+    platforms: List[str] = Field(default_factory=lambda: ["LinkedIn"], description="Target platforms")
+    max_concurrency: Optional[int] = Field(default=None, ge=1, le=32, description="Parallel generations")
+    save: bool = Field(default=True, description="Save each generated post")
+
+class GenerationJobInput(BaseModel):
+    article: ArticleInput
+    callback_url: Optional[str] = Field(default=None, pattern=r"^https?://", description="POSTed the job when done")
+    fresh: bool = Field(default=False, description="Bypass the generation cache")
+    variants: int = Field(default=1, ge=1, le=5, description="Drafts to return")
+    latency_budget: Optional[float] = Field(default=None, gt=0, le=120, description="Seconds the generation may take")
+    save: bool = Field(default=True, description="Save the generated post")
+
 class HashtagInput(BaseModel):
     content: str
 
@@ -48,6 +69,26 @@ class PostHistoryInput(BaseModel):
     hashtags: List[str] = []
     timestamp: str
 
+IdempotencyKey = Header(default=None, alias="Idempotency-Key", max_length=255,
+                        description="Retries with the same key return the first response")
+
+
+def _idempotent(scope: str, key: Optional[str], request: Any, response: Response, execute):
+    """Run ``execute`` once per Idempotency-Key; retries replay the stored response."""
+    if not key:
+        return execute()
+    try:
+        result, replayed = idempotency_store.run(
+            scope, key, request, execute,
+            succeeded=lambda r: not (isinstance(r, dict) and "error" in r))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
 @router.post("/debug")
 def debug_input(payload: Dict[str, Any]):
     """Debug endpoint to inspect incoming JSON payloads."""
@@ -58,15 +99,43 @@ def debug_input(payload: Dict[str, Any]):
     }
 
 @router.post("/generate")
-def generate_post(article: ArticleInput):
-    """Generate a post from article content with error handling."""
+def generate_post(article: ArticleInput, response: Response, fresh: bool = False,
+                  variants: int = Query(default=1, ge=1, le=5, description="Drafts to return"),
+                  latency_budget: Optional[float] = Query(default=None, gt=0, le=120,
+                                                          description="Seconds this request may take"),
+                  race_sla: Optional[float] = Query(default=None, gt=0, le=30,
+                                                    description="Return a template if the LLM takes longer"),
+                  idempotency_key: Optional[str] = IdempotencyKey):
+    """
+    Generate a post from article content with error handling.
+    Pass fresh=true to bypass the generation cache. With variants=N the
+    response carries N drafts in "variants" (one LLM request); "post" is
+    the first draft and is the one saved to history. latency_budget picks
+    the model (or templates) expected to answer in time; the response's
+    "route" reports the choice and why. With an Idempotency-Key header a
+    retry returns the first response instead of generating again.
+
+    race_sla=S returns the LLM post if it is ready within S seconds, else a
+    template post at once plus "upgrade_job"; the saved post is replaced by
+    the LLM version when that job finishes.
+    """
+    request = {"article": article.model_dump(), "fresh": fresh, "variants": variants,
+               "latency_budget": latency_budget, "race_sla": race_sla}
+    return _idempotent("generate", idempotency_key, request, response,
+                       lambda: _generate_and_save(article, fresh, variants, latency_budget, race_sla))
+
+
+def _generate_and_save(article: ArticleInput, fresh: bool, variants: int,
+                       latency_budget: Optional[float], race_sla: Optional[float] = None) -> Dict[str, Any]:
     try:
         # Log the received data for debugging
         print(f"Received article data: title='{article.title}', source='{article.source}', style='{article.post_style}'")
         print(f"Using article source: {article.source}")  # ✅ Debug echo for source
         
         # Generate content with style parameter
-        result = generate_commentary(article, post_style=article.post_style)
+        result = generate_commentary(article, post_style=article.post_style,
+                                     platform=article.platform or "LinkedIn", fresh=fresh,
+                                     variants=variants, budget_seconds=latency_budget, race_sla=race_sla)
         
         # Ensure result has expected structure
         if not isinstance(result, dict):
@@ -74,13 +143,16 @@ def generate_post(article: ArticleInput):
         
         # Save the generated post to persistent storage
         if "post" in result:
-            save_generated_post(
+            saved = save_generated_post(
                 title=article.title,
                 summary=article.summary,
                 source=article.source,
                 link=article.link,
                 generated_content=result["post"]
             )
+            if "upgrade_job" in result:
+                result["post_id"] = saved["post_id"]
+                attach_upgrade(result["upgrade_job"]["id"], saved["post_id"])
         else:
             print("Warning: No 'post' field in generation result")
         
@@ -93,6 +165,145 @@ def generate_post(article: ArticleInput):
             detail=f"Error generating post: {str(e)}"
         )
 
+@router.post("/generate/stream")
+def generate_post_stream(article: ArticleInput, fresh: bool = False,
+                         idempotency_key: Optional[str] = IdempotencyKey):
+    """
+    Generate a post and stream it as server-sent events: "token" events
+    carry text as it is written, a final "done" event carries the full
+    result (the same shape /generate returns). The post is saved once the
+    stream completes.
+
+    With an Idempotency-Key header a duplicate request (a double click, a
+    retry) does not generate again: it waits for the original and gets its
+    result as a single "done" event.
+    """
+    platform = article.platform or "LinkedIn"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    scope = "generate_stream"
+    request = {"article": article.model_dump(), "fresh": fresh}
+
+    if idempotency_key:
+        try:
+            replayed, stored = idempotency_store.begin(scope, idempotency_key, request)
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except IdempotencyInProgress as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if replayed:
+            return StreamingResponse(iter([f"event: done\ndata: {json.dumps(stored)}\n\n"]),
+                                     media_type="text/event-stream",
+                                     headers={**headers, "Idempotent-Replayed": "true"})
+
+    def events():
+        completed = False
+        try:
+            for event in generate_commentary(article, post_style=article.post_style, platform=platform,
+                                             fresh=fresh, stream=True):
+                if event["type"] == "done":
+                    result = event["result"]
+                    if "post" in result:
+                        save_generated_post(
+                            title=article.title,
+                            summary=article.summary,
+                            source=article.source,
+                            link=article.link,
+                            generated_content=result["post"]
+                        )
+                    if idempotency_key and "error" not in result:
+                        idempotency_store.complete(scope, idempotency_key, result)
+                        completed = True
+                    yield f"event: done\ndata: {json.dumps(result)}\n\n"
+                else:
+                    yield f"event: token\ndata: {json.dumps({'text': event['text']})}\n\n"
+        finally:
+            # Failed, or the client went away mid-stream: a retry should run again
+            if idempotency_key and not completed:
+                idempotency_store.abandon(scope, idempotency_key)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+@router.post("/generate/fanout")
+def generate_post_fanout(article: ArticleInput, fresh: bool = False,
+                         platforms: List[str] = Query(default=FANOUT_PLATFORMS, description="Target platforms")):
+    """
+    Generate the same article for several platforms from one LLM call.
+    Each platform's post is validated (X: 280 characters) and falls back
+    to a template on its own; every post is saved.
+    """
+    result = generate_commentary(article, post_style=article.post_style, fresh=fresh, platforms=platforms)
+    for platform_result in result["platforms"].values():
+        if "post" in platform_result:
+            save_generated_post(
+                title=article.title,
+                summary=article.summary,
+                source=article.source,
+                link=article.link,
+                generated_content=platform_result["post"]
+            )
+    return result
+
+@router.post("/generate/batch")
+def generate_posts_batch(batch: BatchGenerateInput, fresh: bool = False):
+    """
+    Generate posts for every article x style x platform combination.
+    Items run concurrently and fall back to templates individually.
+    """
+    unknown = [s for s in batch.styles if s not in STYLE_EXAMPLES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown styles: {', '.join(unknown)}. Available: {', '.join(STYLE_EXAMPLES)}"
+        )
+    if not batch.styles or not batch.platforms:
+        raise HTTPException(status_code=400, detail="At least one style and one platform are required")
+
+    result = generate_batch(batch.articles, batch.styles, batch.platforms,
+                            fresh=fresh, max_concurrency=batch.max_concurrency)
+
+    if batch.save:
+        for item in result["items"]:
+            article = batch.articles[item["article_index"]]
+            if "post" in item["result"]:
+                save_generated_post(
+                    title=article.title,
+                    summary=article.summary,
+                    source=article.source,
+                    link=article.link,
+                    generated_content=item["result"]["post"]
+                )
+    return result
+
+@router.post("/jobs", status_code=202)
+def create_generation_job(job: GenerationJobInput, response: Response,
+                          idempotency_key: Optional[str] = IdempotencyKey):
+    """
+    Queue a generation instead of waiting for it. Poll GET /posts/jobs/{id}
+    for the result, or pass callback_url to have the finished job POSTed
+    there. Jobs are persisted and resume after a restart. A retry with the
+    same Idempotency-Key returns the original job instead of queueing another.
+    """
+    if job.callback_url:
+        error = callback_url_error(job.callback_url)
+        if error:
+            raise HTTPException(status_code=422, detail=error)
+
+    def enqueue():
+        job_id = job_queue.enqueue("generate", job.model_dump(exclude={"callback_url"}), job.callback_url)
+        job_workers.start()
+        job_workers.notify()
+        return {"id": job_id, "status": "queued", "status_url": f"/posts/jobs/{job_id}"}
+
+    return _idempotent("jobs", idempotency_key, job.model_dump(), response, enqueue)
+
+@router.get("/jobs/{job_id}")
+def get_generation_job(job_id: str):
+    """Status of a queued generation, with its result once finished."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
+
 @router.post("/hashtags")
 def generate_hashtags(input_data: HashtagInput):
     """Generate hashtags for given content."""
@@ -163,15 +374,20 @@ def generate_media(input_data: MediaInput):
     }
 
 @router.post("/save")
-def save_post_to_history(post_data: PostHistoryInput):
-    """Save a published post to history."""
+def save_post_to_history(post_data: PostHistoryInput, response: Response,
+                         idempotency_key: Optional[str] = IdempotencyKey):
+    """
+    Save a published post to history. With an Idempotency-Key header a
+    retry returns the first response instead of adding a duplicate row.
+    """
+    return _idempotent("save", idempotency_key, post_data.model_dump(), response,
+                       lambda: _save_to_history(post_data))
+
+
+def _save_to_history(post_data: PostHistoryInput) -> Dict[str, Any]:
     try:
-        # Load existing history
-        history = load_json("generated_posts.json", [])
-        
-        # Add new post
+        # The repository assigns a stable, never-reused ID
         new_post = {
-            "id": len(history) + 1,
             "title": post_data.title,
             "source": post_data.source,
             "enhanced_summary": post_data.enhanced_summary,
@@ -184,37 +400,62 @@ def save_post_to_history(post_data: PostHistoryInput):
             "word_count": len(post_data.generated_post.split())
         }
         
-        history.append(new_post)
-        
-        # Save updated history
-        save_json("generated_posts.json", history)
+        new_post = history_repository.add(new_post)
         
         return {
             "message": "Post saved to history successfully",
             "post_id": new_post["id"],
-            "total_posts": len(history)
+            "total_posts": history_repository.count()
         }
         
     except Exception as e:
         return {"error": f"Failed to save post: {str(e)}"}
 
-@router.get("/history")
-def get_post_history(limit: int = 50):
+@router.get("/history", response_class=CodecJSONResponse)
+def get_post_history(limit: int = 50, include_archived: bool = False):
     """Get post generation history."""
     try:
-        history = load_json("generated_posts.json", [])
-        # Return most recent first
-        recent_history = sorted(history, key=lambda x: x.get("timestamp", ""), reverse=True)
-        return recent_history[:limit]
+        # Most recent first, served from the timestamp index
+        history = history_repository.recent(limit)
+        if include_archived and len(history) < limit:
+            history = history + query_archive("history", limit=limit - len(history))
+        return history
     except Exception as e:
         return {"error": f"Failed to load history: {str(e)}"}
 
-@router.get("/")
-def get_posts(limit: int = 10):
+@router.get("/", response_class=CodecJSONResponse)
+def get_posts(limit: int = 10, include_archived: bool = False):
     """Get recent posts with optional limit."""
-    return get_recent_posts(limit)
+    return get_recent_posts(limit, include_archived=include_archived)
 
-@router.get("/all")
+@router.get("/all", response_class=CodecJSONResponse)
 def get_all_generated_posts():
     """Get all generated posts."""
     return get_all_posts()
+
+@router.get("/archive", response_class=CodecJSONResponse)
+def get_archived_posts(store: str = "posts", start: Optional[float] = None,
+                       end: Optional[float] = None, limit: int = 100):
+    """
+    Query archived records (store: posts, history or vault) between unix
+    timestamps start and end, newest first.
+    """
+    if store not in POLICIES:
+        raise HTTPException(status_code=400, detail=f"Unknown store '{store}'. Use one of: {', '.join(POLICIES)}")
+    return query_archive(store, start=start, end=end, limit=limit)
+
+@router.get("/{post_id}")
+def get_post_by_id(post_id: str):
+    """Get a single generated post by ID."""
+    post = get_post(post_id)
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return post
+
+@router.delete("/{post_id}")
+def delete_post_by_id(post_id: str):
+    """Delete a generated post by ID."""
+    result = delete_post(post_id)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["message"])
+    return result
@@ -0,0 +1,15 @@
+"""
+Response classes shared by the API routers.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.services.persistence import codec
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSON response rendered with the same codec used for persistence."""
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content, compact=True)
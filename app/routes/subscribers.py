@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List
 from app.services.subscribers import add_subscriber, list_subscribers
+from app.routes.responses import CodecJSONResponse
 
 router = APIRouter()
 
@@ -12,6 +13,6 @@ class SubscriberInput(BaseModel):
 def subscribe(subscriber: SubscriberInput):
     return add_subscriber(subscriber.email)
 
-@router.get("/")
+@router.get("/", response_class=CodecJSONResponse)
 def get_subscribers():
     return list_subscribers()
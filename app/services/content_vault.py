@@ -1,39 +1,139 @@
 """
 Content Vault - Store and manage successful AI-generated content examples
+
+Entries are appended to a JSON Lines log (content_vault.jsonl), so storing
+a post never rewrites the vault. A small stats snapshot
+(content_vault_stats.json) is updated incrementally on each store and
+records how much of the log it covers; if the log grew or was rewritten
+behind its back, the snapshot catches up from the log.
 """
 import json
 import os
 from datetime import datetime
 from typing import Dict, Any, List
 
+from . import persistence
+from .persistence import file_lock, read_json_file, write_json_file
+from .retention import query_archive
+
+TAIL_BLOCK_SIZE = 8192
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        "total_stored": 0,
+        "total_characters": 0,
+        "methods_used": {},
+        "styles_used": {},
+        "platforms_used": {},
+        "latest_post": None,
+        "log_size": 0,
+        "log_inode": None,
+    }
+
+
+def _apply_entry(stats: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Fold one vault entry into the stats snapshot."""
+    stats["total_stored"] += 1
+    stats["total_characters"] += entry.get("character_count", 0)
+    for field, bucket in (("method", "methods_used"), ("style_used", "styles_used"), ("platform", "platforms_used")):
+        value = entry.get(field, "unknown")
+        stats[bucket][value] = stats[bucket].get(value, 0) + 1
+    stats["latest_post"] = entry.get("timestamp", stats["latest_post"])
+
+
 class ContentVault:
-    def __init__(self, vault_path: str = "data/content_vault.json"):
-        self.vault_path = vault_path
-        self.ensure_vault_exists()
-    
+    def __init__(self, vault_path: str = None):
+        # vault_path names the legacy single-file vault; the log and stats live beside it
+        self.vault_path = vault_path or str(persistence.DATA_DIR / "content_vault.json")
+        stem = os.path.splitext(self.vault_path)[0]
+        self.log_path = stem + ".jsonl"
+        self.stats_path = stem + "_stats.json"
+
+    def _has_log(self) -> bool:
+        """Whether there is a log to read; converts a legacy vault, but never creates an empty one"""
+        if not os.path.exists(self.log_path) and os.path.exists(self.vault_path):
+            self.ensure_vault_exists()
+        return os.path.exists(self.log_path)
+
     def ensure_vault_exists(self):
-        """Create the vault file if it doesn't exist"""
-        os.makedirs(os.path.dirname(self.vault_path), exist_ok=True)
-        if not os.path.exists(self.vault_path):
-            self._save_vault({"successful_posts": [], "stats": {"total_stored": 0}})
-    
-    def _load_vault(self) -> Dict[str, Any]:
-        """Load the content vault from file"""
+        """Create the vault log, converting a legacy content_vault.json once"""
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        if os.path.exists(self.log_path):
+            return
+        with file_lock(self.log_path):
+            if os.path.exists(self.log_path):
+                return
+            entries = []
+            if os.path.exists(self.vault_path):
+                try:
+                    entries = (read_json_file(self.vault_path, None, use_cache=False) or {}).get("successful_posts", [])
+                except Exception as e:
+                    print(f"Error reading legacy vault {self.vault_path}: {e}")
+            persistence.write_file_atomic(self.log_path, b"".join(self._encode(e) for e in entries))
+            if entries:
+                os.replace(self.vault_path, self.vault_path + ".migrated")
+                print(f"💾 Converted {len(entries)} vault entries to {self.log_path}")
+            self._sync_stats()
+
+    @staticmethod
+    def _encode(entry: Dict[str, Any]) -> bytes:
+        return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _iter_log(self, offset: int = 0):
+        """Yield (entry, end_offset) for each complete line from offset"""
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write; picked up once completed
+                offset += len(line)
+                if line.strip():
+                    yield json.loads(line), offset
+
+    def _sync_stats(self) -> Dict[str, Any]:
+        """
+        Bring the stats snapshot in line with the log. Caller holds the log
+        lock. Replays only the unseen tail unless the log was replaced.
+        """
+        cached = read_json_file(self.stats_path, None)
+        stats = _empty_stats()
+        if cached:
+            stats.update({k: (dict(v) if isinstance(v, dict) else v) for k, v in cached.items()})
         try:
-            with open(self.vault_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            log_stat = os.stat(self.log_path)
+        except OSError:
+            return stats
+
+        if stats["log_inode"] != log_stat.st_ino or stats["log_size"] > log_stat.st_size:
+            stats = _empty_stats()  # rewritten (e.g. by retention): rebuild
+        elif stats["log_size"] == log_stat.st_size:
+            return stats
+
+        offset = stats["log_size"]
+        for entry, offset in self._iter_log(offset):
+            _apply_entry(stats, entry)
+        stats["log_size"] = offset
+        stats["log_inode"] = log_stat.st_ino
+        write_json_file(self.stats_path, stats)
+        return stats
+
+    def _load_stats(self) -> Dict[str, Any]:
+        """Snapshot for the current log; O(1) unless the log changed elsewhere"""
+        if not self._has_log():
+            return _empty_stats()
+        try:
+            stats = read_json_file(self.stats_path, None)
+            log_stat = os.stat(self.log_path)
+            if stats and stats.get("log_inode") == log_stat.st_ino and stats.get("log_size") == log_stat.st_size:
+                return stats
         except Exception:
-            return {"successful_posts": [], "stats": {"total_stored": 0}}
-    
-    def _save_vault(self, vault_data: Dict[str, Any]):
-        """Save the content vault to file"""
-        with open(self.vault_path, 'w', encoding='utf-8') as f:
-            json.dump(vault_data, f, indent=2, ensure_ascii=False)
-    
+            pass
+        with file_lock(self.log_path):
+            return self._sync_stats()
+
     def store_successful_post(self, article_title: str, generated_post: str, metadata: Dict[str, Any]):
         """Store a successful post with metadata"""
-        vault_data = self._load_vault()
-        
         post_entry = {
             "timestamp": datetime.now().isoformat(),
             "article_title": article_title,
@@ -45,44 +145,66 @@ class ContentVault:
             "token_usage": metadata.get("token_usage", {}),
             "generation_time": metadata.get("generation_time", 0)
         }
-        
-        vault_data["successful_posts"].append(post_entry)
-        vault_data["stats"]["total_stored"] = len(vault_data["successful_posts"])
-        
-        self._save_vault(vault_data)
-        print(f"💾 Stored successful post in content vault ({len(vault_data['successful_posts'])} total)")
-    
-    def get_recent_successes(self, limit: int = 5) -> List[Dict[str, Any]]:
+
+        self.ensure_vault_exists()  # Files are created on the first write, not at import
+        # Append under the log lock so concurrent workers can't interleave lines
+        with file_lock(self.log_path):
+            stats = self._sync_stats()
+            with open(self.log_path, "ab") as f:
+                f.write(self._encode(post_entry))
+                f.flush()
+                log_size = f.tell()
+            _apply_entry(stats, post_entry)
+            stats["log_size"] = log_size
+            stats["log_inode"] = os.stat(self.log_path).st_ino
+            write_json_file(self.stats_path, stats)
+        print(f"💾 Stored successful post in content vault ({stats['total_stored']} total)")
+
+    def _tail(self, limit: int) -> List[Dict[str, Any]]:
+        """Last limit entries of the log, oldest first, reading from the end"""
+        if limit <= 0 or not self._has_log():
+            return []
+        with open(self.log_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= limit:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = data.split(b"\n")[:-1]  # drop text after the last newline (torn write)
+        if position > 0:
+            lines = lines[1:]  # first line may be partial
+        return [json.loads(line) for line in lines[-limit:] if line.strip()]
+
+    def get_recent_successes(self, limit: int = 5, include_archived: bool = False) -> List[Dict[str, Any]]:
         """Get recent successful posts"""
-        vault_data = self._load_vault()
-        return vault_data["successful_posts"][-limit:]
-    
+        recent = self._tail(limit)
+        if include_archived and len(recent) < limit:
+            older = query_archive("vault", limit=limit - len(recent))
+            recent = list(reversed(older)) + recent
+        return recent
+
+    def get_archived(self, start: float = None, end: float = None, limit: int = None) -> List[Dict[str, Any]]:
+        """Get archived vault entries between unix timestamps, newest first"""
+        return query_archive("vault", start=start, end=end, limit=limit)
+
     def get_stats(self) -> Dict[str, Any]:
         """Get vault statistics"""
-        vault_data = self._load_vault()
-        posts = vault_data["successful_posts"]
-        
-        if not posts:
+        stats = self._load_stats()
+        total = stats["total_stored"]
+
+        if not total:
             return {"total_posts": 0}
-        
-        methods = {}
-        styles = {}
-        avg_length = 0
-        
-        for post in posts:
-            method = post.get("method", "unknown")
-            style = post.get("style_used", "unknown")
-            
-            methods[method] = methods.get(method, 0) + 1
-            styles[style] = styles.get(style, 0) + 1
-            avg_length += post.get("character_count", 0)
-        
+
         return {
-            "total_posts": len(posts),
-            "average_length": avg_length // len(posts) if posts else 0,
-            "methods_used": methods,
-            "styles_used": styles,
-            "latest_post": posts[-1]["timestamp"] if posts else None
+            "total_posts": total,
+            "average_length": stats["total_characters"] // total,
+            "methods_used": dict(stats["methods_used"]),
+            "styles_used": dict(stats["styles_used"]),
+            "platforms_used": dict(stats["platforms_used"]),
+            "latest_post": stats["latest_post"]
         }
 
 # Global vault instance
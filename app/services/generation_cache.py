@@ -0,0 +1,214 @@
+"""
+Generation cache - reuse LLM posts for repeated article/style/platform requests.
+
+Keys are a hash of the normalized title and summary plus style, platform,
+model and temperature, so cosmetic differences (HTML entities, spacing,
+case) still hit. Entries expire after a TTL and the cache is bounded with
+LRU eviction. It is persisted to data/generation_cache.json so entries
+survive restarts and are shared between workers.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .persistence import load_json, update_json
+
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+GENERATION_CACHE_TTL_HOURS = float(os.getenv("GENERATION_CACHE_TTL_HOURS", "24"))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "500"))
+GENERATION_CACHE_FILE = "generation_cache.json"
+
+
+def _normalize(text: Optional[str]) -> str:
+    text = html.unescape(text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def make_cache_key(title: str, summary: str, style: str, platform: str,
+                   model: str, temperature: float) -> str:
+    """Stable hash of everything that determines the generated post."""
+    material = json.dumps(
+        [_normalize(title), _normalize(summary), style, platform, model, round(float(temperature), 3)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """TTL + LRU cache of generation results, persisted as JSON."""
+
+    def __init__(self, filename: str = GENERATION_CACHE_FILE,
+                 ttl_seconds: float = GENERATION_CACHE_TTL_HOURS * 3600,
+                 max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+                 enabled: bool = GENERATION_CACHE_ENABLED):
+        self.filename = filename
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.tokens_saved = 0
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        now = time.time()
+        stored = load_json(self.filename, {})
+        for key, entry in sorted(stored.items(), key=lambda item: item[1].get("last_used", 0)):
+            if entry.get("expires_at", 0) > now:
+                self._entries[key] = entry
+
+    def _lookup_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Entries written by other workers since we loaded."""
+        return load_json(self.filename, {}).get(key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._lookup_disk(key)
+            if entry is not None and entry.get("expires_at", 0) <= now:
+                self._entries.pop(key, None)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry = {**entry, "last_used": now, "hits": entry.get("hits", 0) + 1}
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.tokens_saved += entry.get("total_tokens", 0)
+
+        result = dict(entry["result"])
+        result["cached"] = True
+        result["cache_age_seconds"] = round(now - entry["created_at"], 1)
+        return result
+
+    def contains(self, key: str) -> bool:
+        """Whether a live entry exists, without counting a lookup or touching recency."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._lookup_disk(key)
+        return entry is not None and entry.get("expires_at", 0) > time.time()
+
+    def take(self, key: str, field: str) -> Any:
+        """
+        Remove ``field`` from a cached result and return it, or None if it is
+        already gone. The stored file decides, so only one worker gets it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and field in entry["result"]:
+                result = {k: v for k, v in entry["result"].items() if k != field}
+                self._entries[key] = {**entry, "result": result}
+        taken = []
+
+        def remove(stored: Dict[str, Any]) -> Dict[str, Any]:
+            entry = stored.get(key)
+            if entry is not None and field in entry.get("result", {}):
+                result = dict(entry["result"])
+                taken.append(result.pop(field))
+                stored[key] = {**entry, "result": result}
+            return stored
+
+        try:
+            update_json(self.filename, remove, {})
+        except Exception as e:
+            print(f"Error updating generation cache: {e}")
+        return taken[0] if taken else None
+
+    def put(self, key: str, result: Dict[str, Any], total_tokens: int = 0,
+            ttl_seconds: Optional[float] = None) -> None:
+        """Store a result and persist the cache."""
+        if not self.enabled:
+            return
+        now = time.time()
+        entry = {
+            "result": result,
+            "created_at": now,
+            "last_used": now,
+            "expires_at": now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds),
+            "total_tokens": total_tokens,
+            "hits": 0,
+        }
+        with self._lock:
+            self._load()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        self._persist(key, entry)
+
+    def _persist(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            # Hits only touch memory; carry their recency over so disk LRU agrees
+            recency = {k: v.get("last_used", 0) for k, v in self._entries.items()}
+
+        def merge(stored: Dict[str, Any]) -> Dict[str, Any]:
+            now = time.time()
+            for k, v in stored.items():
+                if k in recency and recency[k] > v.get("last_used", 0):
+                    stored[k] = {**v, "last_used": recency[k]}
+            stored[key] = entry
+            live = [(k, v) for k, v in stored.items() if v.get("expires_at", 0) > now]
+            live.sort(key=lambda item: item[1].get("last_used", 0))
+            return dict(live[-self.max_entries:])
+
+        try:
+            update_json(self.filename, merge, {})
+        except Exception as e:
+            print(f"Error persisting generation cache: {e}")
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loaded = True
+        update_json(self.filename, lambda stored: {}, {})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "tokens_saved": self.tokens_saved,
+            }
+
+
+generation_cache = GenerationCache()
@@ -1,12 +1,11 @@
 import os
 import re
+import json
 import time
 import html
 import logging
-import threading
-from typing import Dict, Any, Optional
-import openai
-import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
 
 
 
@@ -16,15 +15,37 @@ try:
 except ImportError:
     content_vault = None
 
+from .generation_cache import generation_cache, make_cache_key
+from .llm_resilience import circuit_breaker, latency_budget, resilient_caller
+from .metrics import record_cache_lookup, record_generation
+from .model_router import Route, model_router
+from .prompt_builder import DEFAULT_STYLE, PromptBuilder, estimate_tokens, style_key
+from .llm_client import (
+    OPENAI_MAX_CONCURRENCY, GenerationCancelled, GenerationTimeout, generation_pool,
+)
+
 USE_GPT = os.getenv("USE_OPENAI_GPT", "false").lower() == "true"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+OPENAI_MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", "400"))
 DEBUG_GPT_RESPONSE = os.getenv("DEBUG_GPT_RESPONSE", "false").lower() == "true"
 
+# Race mode: how often to check whether the LLM job has finished
+RACE_POLL_INTERVAL = 0.05
+
+FANOUT_PLATFORMS = ["LinkedIn", "X", "Email"]
+X_CHAR_LIMIT = 280
+
 STYLE_EXAMPLES = {
     "trivance_default": {
         "description": "Professional, clear, consultative, and educational",
         "sentence_style": "Balanced and strategic, avoids fluff",
         "example_phrases": [
+            "What this means in practice:",
+            "The practical angle:",
+            "Where this fits:",
+            "The strategic read:"
         ],
         "hooks": [
             "📊 {title} — and the implications are clear:",
@@ -99,6 +120,9 @@ def extract_key_insights(text: str) -> list:
     return insights
 
 
+prompt_builder = PromptBuilder(extract_key_insights)
+
+
 def generate_hashtags(text: str) -> str:
     """Generate relevant hashtags based on content."""
     hashtag_map = {
@@ -123,129 +147,249 @@ def generate_hashtags(text: str) -> str:
     
     return ' '.join(list(found_tags)[:6])
 
-def generate_with_openai(article, post_style="trivance_default", platform="LinkedIn") -> Dict[str, Any]:
-    """Generate content using OpenAI GPT with timeout and enhanced error handling."""
+def build_openai_request(article, post_style="trivance_default", platform="LinkedIn") -> Dict[str, Any]:
+    """Prompt, chat messages and extracted insights for one article, fitted to the platform's token budget."""
+    return _openai_request(article, prompt_builder.build(article, post_style, platform), OPENAI_MAX_TOKENS)
+
+
+def build_fanout_request(article, post_style: str, platforms: List[str]) -> Dict[str, Any]:
+    """Like build_openai_request, but one prompt asks for every platform's post as JSON."""
+    return _openai_request(article, prompt_builder.build_fanout(article, post_style, platforms),
+                           OPENAI_MAX_TOKENS * len(platforms))
+
+
+def _openai_request(article, plan, max_tokens: int) -> Dict[str, Any]:
+    if plan.summary_strategy != "full":
+        logging.info(f"✂️ Prompt compressed ({plan.summary_strategy}): "
+                     f"{plan.original_tokens} → {plan.estimated_tokens} tokens (budget {plan.budget})")
+    return {
+        "prompt": plan.prompt,
+        "insights": plan.insights,
+        "messages": plan.messages,
+        "title": html.unescape(article.title) if article.title else "",
+        "prompt_stats": plan.stats(),
+        "model": OPENAI_MODEL,
+        "max_tokens": max_tokens,
+        # What the provider counts against TPM: the prompt plus the completion allowance
+        "rate_limit_tokens": plan.estimated_tokens + max_tokens,
+    }
+
+
+def _token_usage(usage) -> Dict[str, int]:
+    return {field: getattr(usage, field, 0) or 0
+            for field in ("prompt_tokens", "completion_tokens", "total_tokens")}
+
+
+def _split_evenly(total: int, weights: List[int]) -> List[int]:
+    """Share an integer total by weight; the parts always add up to the total."""
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights, weight_sum = [1] * len(weights), len(weights)
+    shares = [total * w // weight_sum for w in weights]
+    for i in range(total - sum(shares)):
+        shares[i % len(shares)] += 1
+    return shares
+
+
+def _split_usage(usage: Dict[str, int], texts: List[Optional[str]]) -> List[Dict[str, int]]:
+    """
+    Per-choice token usage for an n>1 completion. The API only reports
+    totals: the shared prompt is split evenly and completion tokens in
+    proportion to each choice's estimated length.
+    """
+    prompt = _split_evenly(usage["prompt_tokens"], [1] * len(texts))
+    completion = _split_evenly(usage["completion_tokens"], [estimate_tokens(t or "") for t in texts])
+    return [{"prompt_tokens": p, "completion_tokens": c, "total_tokens": p + c}
+            for p, c in zip(prompt, completion)]
+
+
+def _finish_openai_post(article, text: Optional[str], request: Dict[str, Any], post_style: str,
+                        platform: str, duration: float, token_usage: Dict[str, int],
+                        store: bool = True) -> Dict[str, Any]:
+    """
+    Validate the model's text, add hashtags, store it in the vault and build
+    the result. With store=False the vault entry is left to the caller: the
+    result carries it as "vault_metadata".
+    """
+    if not text or not text.strip():
+        logging.error("❌ OpenAI returned empty content")
+        return {
+            "error": "Empty content in OpenAI response", 
+            "fallback": True
+        }
+    
+    text = text.strip()
+    
+    # Debug mode: Log GPT response
+    if DEBUG_GPT_RESPONSE:
+        logging.info(f"[DEBUG] GPT Raw Output ({len(text)} chars):\n{text[:200]}{'...' if len(text) > 200 else ''}")
+    
+    # Check minimum length threshold
+    if len(text) < 50:
+        logging.error(f"❌ OpenAI response too short: {len(text)} characters")
+        return {
+            "error": f"Response too short ({len(text)} characters)",
+            "fallback": True
+        }
+    
+    logging.info(f"✅ OpenAI generation successful! ({len(text)} characters, {duration:.2f}s)")
+    
+    # Verify this looks like AI-generated content (not template-like)
+    template_indicators = [
+        "Consider this:",
+        "Smart businesses recognize",
+        "The framework that works:",
+        "Here's a specific takeaway:",  # Added the problematic phrase
+        "Here's what's interesting:",
+        "Think about it:",
+        "✦ Identify",
+        "✦ Map", 
+        "✦ Choose"
+    ]
+    
+    if any(indicator in text for indicator in template_indicators):
+        logging.warning("⚠️ OpenAI response contains template-like patterns - possible content issue")
+        if DEBUG_GPT_RESPONSE:
+            logging.info(f"[DEBUG] Suspicious content detected:\n{text}")
+    
+    # Store generation metadata for debugging
+    generation_metadata = {
+        "prompt_length": len(request["prompt"]),
+        "response_length": len(text),
+        "generation_time": duration,
+        "has_template_patterns": any(indicator in text for indicator in template_indicators)
+    }
+    
+    if DEBUG_GPT_RESPONSE:
+        logging.info(f"[DEBUG] Generation metadata: {generation_metadata}")
+    
+    # Add hashtags for LinkedIn
+    if platform == "LinkedIn":
+        text += f"\n\n{generate_hashtags(article.title + ' ' + article.summary)}"
+
+    # Store in content vault
+    vault_metadata = {
+        "method": "openai_gpt",
+        "style_used": post_style,
+        "platform": platform,
+        "generation_time": duration,
+        "token_usage": token_usage
+    }
+    if content_vault and store:
+        content_vault.store_successful_post(article.title, text, vault_metadata)
+
+    return {
+        **({} if store else {"vault_metadata": vault_metadata}),
+        "post": text,
+        "method": "openai_gpt",
+        "prompt_used": request["prompt"],
+        "style_used": post_style,
+        "platform": platform,
+        "key_insights": request["insights"],
+        "prompt_stats": request["prompt_stats"],
+        "model": request["model"],
+        "token_usage": token_usage
+    }
+
+
+def _finish_openai_variants(article, texts: List[Optional[str]], request: Dict[str, Any], post_style: str,
+                            platform: str, duration: float, token_usage: Dict[str, int],
+                            store: bool = True) -> Dict[str, Any]:
+    """
+    Finish each choice of a multi-draft completion on its own (validation,
+    hashtags, vault entry with its share of the usage). Drafts that fail
+    validation are dropped; the first good one doubles as the main result.
+    """
+    drafts = []
+    for text, usage in zip(texts, _split_usage(token_usage, texts)):
+        draft = _finish_openai_post(article, text, request, post_style, platform, duration, usage, store)
+        if not draft.get("error"):
+            drafts.append({**draft, "variant": len(drafts) + 1})
+    if not drafts:
+        return {"error": f"No usable drafts among {len(texts)} choices", "fallback": True}
+    logging.info(f"✅ {len(drafts)}/{len(texts)} drafts usable")
+    return {**drafts[0], "token_usage": token_usage, "variants": drafts}
+
+
+def _circuit_open_error() -> Dict[str, Any]:
+    wait = circuit_breaker.retry_in()
+    logging.warning(f"⛔ OpenAI circuit open - skipping the call (next probe in {wait:.0f}s)")
+    return {"error": f"Circuit open: OpenAI calls paused after repeated failures (next probe in {wait:.0f}s)",
+            "fallback": True}
+
+
+def _call_outcome(e: Exception) -> Optional[bool]:
+    """What a failed pool call means for the circuit breaker: cancellations say nothing about the provider."""
+    return None if isinstance(e, (GenerationCancelled, ImportError)) else False
+
+
+def _openai_call_error(e: Exception, timeout: float) -> Dict[str, Any]:
+    """Map a failed pool call to the generator's error result."""
+    if isinstance(e, GenerationTimeout):
+        logging.error(f"⏰ OpenAI API call timed out after {timeout:g} seconds")
+        return {"error": f"API call timeout ({timeout:g}s)", "fallback": True}
+    if isinstance(e, GenerationCancelled):
+        logging.warning("🛑 OpenAI API call cancelled")
+        return {"error": "API call cancelled", "fallback": True}
+    if isinstance(e, ImportError):
+        logging.error(f"📦 OpenAI library not available: {e}")
+        return {"error": f"OpenAI library not available: {e}", "fallback": True}
+    error_msg = f"OpenAI API error: {str(e)}"
+    logging.error(f"🚨 {error_msg}")
+    return {"error": f"API error: {error_msg}", "fallback": True}
+
+
+def generate_with_openai(article, post_style="trivance_default", platform="LinkedIn",
+                         variants: int = 1, model: Optional[str] = None,
+                         timeout: Optional[float] = None, store: bool = True) -> Dict[str, Any]:
+    """
+    Generate content using OpenAI GPT with timeout and enhanced error handling.
+    With variants > 1 the drafts come from one request (the API's ``n``), so
+    the prompt is only sent and billed once. ``model`` and ``timeout``
+    default to OPENAI_MODEL and the platform's latency budget. store=False
+    keeps the post out of the content vault (see _finish_openai_post).
+    """
     try:
-        import openai
-        import threading
-        
-        result = {"success": False, "error": None, "response": None}
-        
-        def api_call():
-            try:
-                client = openai.OpenAI(api_key=OPENAI_API_KEY)
-                style = STYLE_EXAMPLES.get(post_style, STYLE_EXAMPLES["trivance_default"])
-                source = article.source.strip() or "RSS Feeds"
-                
-                # Decode HTML entities before processing
-                clean_title = html.unescape(article.title) if article.title else ""
-                clean_summary = html.unescape(article.summary) if article.summary else ""
-                
-                insights = extract_key_insights(clean_summary)
-                
-                platform_note = {
-                    "LinkedIn": "Include hashtags at the end.",
-                    "Email": "No hashtags. Use subject line style tone.",
-                    "X": "Post must be under 280 characters. Short, bold, and direct."
-                }[platform if platform in ["LinkedIn", "Email", "X"] else "LinkedIn"]
-
-                prompt = textwrap.dedent(f"""
-                    You are a strategic content writer at Trivance AI — a consultancy that helps small and mid-sized companies apply AI in practical, high-leverage ways.
-
-                    Create an engaging {platform} post about this article using a {post_style} tone.
-
-                    **You MUST avoid** generic phrases like:
-                    - “Consider this:”
-                    - “Smart businesses recognize”
-                    - “Here's what's interesting:”
-                    These sound templated and generic. Do not use them.
-
-                    Instead:
-                    - Reference specific features, technologies, or business problems from the article
-                    - Explain where this tool could fit into a small/mid-sized org (e.g., HR, logistics, IT ops)
-                    - Write like you’re speaking to a COO or Director of Ops — smart and time-conscious
-                    - Keep the Trivance tone: clear, consultative, and outcome-driven
-
-                    Structure:
-                    1. Hook (clear, relevant to the headline)
-                    2. Specific insight (e.g. what this enables)
-                    3. Strategic framing (why it matters, where it fits)
-                    4. Soft CTA or reflection
-
-                    Article Details:
-                    Title: {clean_title}
-                    Source: {source}
-                    Link: {article.link}
-                    Summary: {clean_summary}
-
-                    Key insights to optionally reference: {insights}
-
-                    Final Reminder: Write like a strategist, not a marketer.
-                """)
-                
-                logging.info(f"OpenAI API request sent for article: {clean_title[:50]}...")
-                import json
-
-                prompt_length = len(prompt)
-                logging.info(f"⏱ Prompt length: {prompt_length} characters")
-                logging.info(f"⏱ Prompt sample (first 500 chars):\n{prompt[:500]}")
-
-                # Also validate the message object
-                message_payload = [
-                    {"role": "system", "content": "You are a strategic..."},
-                    {"role": "user", "content": prompt}
-                ]
-                logging.info("Message payload JSON size:", len(json.dumps(message_payload)))
-
-                completion = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a strategic, human-sounding content writer for Trivance AI. You write posts that are specific, business-relevant, and NEVER use clichés like 'consider this' or 'smart businesses recognize.'"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=400,
-                    temperature=0.7
-                )
-
-                logging.info("OpenAI API response received successfully")
-                
-                result["success"] = True
-                result["response"] = completion
-                result["prompt"] = prompt
-                result["insights"] = insights
-                logging.info(f"OpenAI generation successful - tokens used: {completion.usage.total_tokens}")
-                
-            except Exception as e:
-                error_msg = f"OpenAI API error: {str(e)}"
-                logging.error(error_msg)
-                result["error"] = error_msg
-        
-        # Start API call in thread with timeout
+        request = build_openai_request(article, post_style, platform)
+        request["model"] = model or OPENAI_MODEL
+        logging.info(f"OpenAI API request sent for article: {request['title'][:50]}...")
+        logging.info(f"⏱ Prompt length: {len(request['prompt'])} characters")
+        if DEBUG_GPT_RESPONSE:
+            logging.info(f"⏱ Prompt sample (first 500 chars):\n{request['prompt'][:500]}")
+
+        # Runs on the shared generation pool with retries/hedging; once the
+        # latency budget is spent the request itself is cancelled
+        timeout = timeout or latency_budget(platform)
+        choices = {"n": variants} if variants > 1 else {}
+        if not circuit_breaker.allow():
+            return _circuit_open_error()
         start_time = time.time()
-        thread = threading.Thread(target=api_call)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=15)  # 15 second timeout
-        
+        try:
+            completion = generation_pool.run(
+                lambda client: resilient_caller.call(
+                    client,
+                    lambda c: c.chat.completions.create(
+                        model=request["model"],
+                        messages=request["messages"],
+                        max_tokens=OPENAI_MAX_TOKENS,
+                        temperature=OPENAI_TEMPERATURE,
+                        **choices
+                    ),
+                    platform,
+                    # Each extra choice can use another completion allowance
+                    tokens=request["rate_limit_tokens"] + OPENAI_MAX_TOKENS * (variants - 1),
+                ),
+                timeout=timeout,
+            )
+        except Exception as e:
+            circuit_breaker.record(_call_outcome(e))
+            return _openai_call_error(e, timeout)
+        circuit_breaker.record(True)
+
         duration = time.time() - start_time
-        
-        if thread.is_alive():
-            logging.error("⏰ OpenAI API call timed out after 15 seconds")
-            return {
-                "error": "API call timeout (15s)",
-                "fallback": True
-            }
-        
-        if not result["success"]:
-            error_msg = result.get("error", "Unknown API error")
-            logging.error(f"🚨 OpenAI API error: {error_msg}")
-            return {
-                "error": f"API error: {error_msg}",
-                "fallback": True
-            }
+        logging.info("OpenAI API response received successfully")
         
         # Process successful response
-        completion = result["response"]
         if not completion or not completion.choices:
             logging.error("❌ OpenAI returned empty response or no choices")
             return {
@@ -253,93 +397,13 @@ def generate_with_openai(article, post_style="trivance_default", platform="Linke
                 "fallback": True
             }
         
-        text = completion.choices[0].message.content
-        if not text or not text.strip():
-            logging.error("❌ OpenAI returned empty content")
-            return {
-                "error": "Empty content in OpenAI response", 
-                "fallback": True
-            }
-        
-        text = text.strip()
-        
-        # Debug mode: Log GPT response
-        if DEBUG_GPT_RESPONSE:
-            logging.info(f"[DEBUG] GPT Raw Output ({len(text)} chars):\n{text[:200]}{'...' if len(text) > 200 else ''}")
-        
-        # Check minimum length threshold
-        if len(text) < 50:
-            logging.error(f"❌ OpenAI response too short: {len(text)} characters")
-            return {
-                "error": f"Response too short ({len(text)} characters)",
-                "fallback": True
-            }
-        
-        logging.info(f"✅ OpenAI generation successful! ({len(text)} characters, {duration:.2f}s)")
-        
-        # Verify this looks like AI-generated content (not template-like)
-        template_indicators = [
-            "Consider this:",
-            "Smart businesses recognize",
-            "The framework that works:",
-            "Here's a specific takeaway:",  # Added the problematic phrase
-            "Here's what's interesting:",
-            "Think about it:",
-            "✦ Identify",
-            "✦ Map", 
-            "✦ Choose"
-        ]
-        
-        if any(indicator in text for indicator in template_indicators):
-            logging.warning("⚠️ OpenAI response contains template-like patterns - possible content issue")
-            if DEBUG_GPT_RESPONSE:
-                logging.info(f"[DEBUG] Suspicious content detected:\n{text}")
-        
-        # Store generation metadata for debugging
-        generation_metadata = {
-            "prompt_length": len(result.get("prompt", "")),
-            "response_length": len(text),
-            "generation_time": duration,
-            "has_template_patterns": any(indicator in text for indicator in template_indicators)
-        }
-        
-        if DEBUG_GPT_RESPONSE:
-            logging.info(f"[DEBUG] Generation metadata: {generation_metadata}")
-        
-        # Add hashtags for LinkedIn
-        if platform == "LinkedIn":
-            text += f"\n\n{generate_hashtags(article.title + ' ' + article.summary)}"
-
-        # Store in content vault
-        if content_vault:
-            vault_metadata = {
-                "method": "openai_gpt",
-                "style_used": post_style,
-                "platform": platform,
-                "generation_time": duration,
-                "token_usage": {
-                    "prompt_tokens": getattr(completion.usage, 'prompt_tokens', 0) if hasattr(completion, 'usage') else 0,
-                    "completion_tokens": getattr(completion.usage, 'completion_tokens', 0) if hasattr(completion, 'usage') else 0,
-                    "total_tokens": getattr(completion.usage, 'total_tokens', 0) if hasattr(completion, 'usage') else 0
-                }
-            }
-            content_vault.store_successful_post(article.title, text, vault_metadata)
-
-        return {
-            "post": text,
-            "method": "openai_gpt",
-            "prompt_used": result["prompt"],
-            "style_used": post_style,
-            "platform": platform,
-            "key_insights": result["insights"]
-        }
+        usage = _token_usage(completion.usage)
+        if variants == 1:
+            return _finish_openai_post(article, completion.choices[0].message.content, request,
+                                       post_style, platform, duration, usage, store)
+        return _finish_openai_variants(article, [c.message.content for c in completion.choices], request,
+                                       post_style, platform, duration, usage, store)
         
-    except ImportError as e:
-        logging.error(f"📦 OpenAI library not available: {e}")
-        return {
-            "error": f"OpenAI library not available: {e}",
-            "fallback": True
-        }
     except Exception as e:
         logging.error(f"🚨 OpenAI generation failed: {str(e)}")
         return {
@@ -347,6 +411,138 @@ def generate_with_openai(article, post_style="trivance_default", platform="Linke
             "fallback": True
         }
 
+
+def _parse_fanout(text: Optional[str], platforms: List[str]) -> Dict[str, str]:
+    """Platform -> post text from the model's JSON reply (a ```json fence is tolerated)."""
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if not match:
+        raise ValueError("Fan-out reply is not a JSON object")
+    data = json.loads(match.group(0))
+    by_key = {str(k).strip().lower(): v for k, v in data.items()} if isinstance(data, dict) else {}
+    return {p: by_key[p.lower()] for p in platforms if isinstance(by_key.get(p.lower()), str)}
+
+
+def generate_fanout_with_openai(article, post_style: str, platforms: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Generate every platform's post from one structured (JSON) completion.
+    Returns a result per platform; each is checked on its own (X posts must
+    fit in X_CHAR_LIMIT characters), so one bad platform does not sink the rest.
+    """
+    try:
+        request = build_fanout_request(article, post_style, platforms)
+        logging.info(f"OpenAI fan-out request sent for {', '.join(platforms)}: {request['title'][:50]}...")
+        timeout = max(latency_budget(p) for p in platforms)
+        if not circuit_breaker.allow():
+            error = _circuit_open_error()
+            return {p: error for p in platforms}
+        start_time = time.time()
+        try:
+            completion = generation_pool.run(
+                lambda client: resilient_caller.call(
+                    client,
+                    lambda c: c.chat.completions.create(
+                        model=OPENAI_MODEL,
+                        messages=request["messages"],
+                        max_tokens=request["max_tokens"],
+                        temperature=OPENAI_TEMPERATURE,
+                        response_format={"type": "json_object"},
+                    ),
+                    "fanout",
+                    tokens=request["rate_limit_tokens"],
+                ),
+                timeout=timeout,
+            )
+        except Exception as e:
+            circuit_breaker.record(_call_outcome(e))
+            error = _openai_call_error(e, timeout)
+            return {p: error for p in platforms}
+        circuit_breaker.record(True)
+
+        duration = time.time() - start_time
+        if not completion or not completion.choices:
+            raise ValueError("Empty response from OpenAI")
+        texts = _parse_fanout(completion.choices[0].message.content, platforms)
+    except Exception as e:
+        logging.error(f"🚨 OpenAI fan-out failed: {str(e)}")
+        error = {"error": f"OpenAI fan-out failed: {str(e)}", "fallback": True}
+        return {p: error for p in platforms}
+
+    usages = _split_usage(_token_usage(completion.usage), [texts.get(p) for p in platforms])
+    results = {}
+    for platform, usage in zip(platforms, usages):
+        text = (texts.get(platform) or "").strip()
+        if not text:
+            results[platform] = {"error": f"No {platform} post in fan-out reply", "fallback": True}
+        elif platform == "X" and len(text) > X_CHAR_LIMIT:
+            logging.error(f"❌ X post over {X_CHAR_LIMIT} characters: {len(text)}")
+            results[platform] = {"error": f"X post too long ({len(text)} > {X_CHAR_LIMIT} characters)",
+                                 "fallback": True}
+        else:
+            results[platform] = _finish_openai_post(article, text, request, post_style, platform,
+                                                    duration, usage)
+    return results
+
+
+def stream_with_openai(article, post_style="trivance_default", platform="LinkedIn") -> Iterator[Dict[str, Any]]:
+    """
+    Stream a generation: yields {"type": "token", "text": ...} events as the
+    model produces them, then one {"type": "done", "result": ...} event once
+    the post has been checked, tagged and stored.
+    """
+    try:
+        request = build_openai_request(article, post_style, platform)
+    except Exception as e:
+        logging.error(f"🚨 OpenAI generation failed: {str(e)}")
+        yield {"type": "done", "result": {"error": f"OpenAI generation failed: {str(e)}", "fallback": True}}
+        return
+
+    timeout = latency_budget(platform)
+    if not circuit_breaker.allow():
+        yield {"type": "done", "result": _circuit_open_error()}
+        return
+    start_time = time.time()
+    parts: List[str] = []
+    usage = None
+    outcome = None
+    try:
+        # Retries cover opening the stream; once tokens flow there is no hedge to race
+        for chunk in generation_pool.stream(
+            lambda client: resilient_caller.call(
+                client,
+                lambda c: c.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=request["messages"],
+                    max_tokens=OPENAI_MAX_TOKENS,
+                    temperature=OPENAI_TEMPERATURE,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                ),
+                platform,
+                hedge=False,
+                tokens=request["rate_limit_tokens"],
+            ),
+            timeout=timeout,
+        ):
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield {"type": "token", "text": chunk.choices[0].delta.content}
+        outcome = True
+    except Exception as e:
+        outcome = _call_outcome(e)
+        yield {"type": "done", "result": _openai_call_error(e, timeout)}
+        return
+    finally:
+        # Also runs when the consumer stops reading, so a half-open probe is never leaked
+        circuit_breaker.record(outcome)
+
+    duration = time.time() - start_time
+    result = _finish_openai_post(article, "".join(parts), request, post_style, platform,
+                                 duration, _token_usage(usage))
+    yield {"type": "done", "result": result}
+
+
 def generate_template_based(article, post_style="trivance_default", platform="LinkedIn") -> Dict[str, Any]:
     import random
 
@@ -361,7 +557,7 @@ def generate_template_based(article, post_style="trivance_default", platform="Li
     insight_text = " ".join(i.replace("Key insight:", "").strip() for i in selected_insights)
 
     # Style selection
-    style = STYLE_EXAMPLES.get(post_style, STYLE_EXAMPLES["trivance_default"])
+    style = STYLE_EXAMPLES.get(style_key(post_style), STYLE_EXAMPLES[DEFAULT_STYLE])
     hook_template = random.choice(style["hooks"])
     hook = hook_template.format(title=clean_title)
     phrase = random.choice(style["example_phrases"])
@@ -399,39 +595,361 @@ Source: {source}
     }
 
 
-def generate_commentary(article, post_style="trivance_default", platform="LinkedIn"):
+def generation_cache_key(article, post_style="trivance_default", platform="LinkedIn", variants: int = 1,
+                         model: Optional[str] = None) -> str:
+    """Cache key for an LLM generation of this article, style and platform."""
+    key = make_cache_key(article.title, article.summary, post_style, platform,
+                         model or OPENAI_MODEL, OPENAI_TEMPERATURE)
+    return key if variants == 1 else f"{key}:n{variants}"
+
+
+def _template_variants(result: Dict[str, Any], article, post_style: str, platform: str,
+                       variants: int) -> Dict[str, Any]:
+    """Pad a template result out to the requested number of drafts."""
+    drafts = [result] + [generate_template_based(article, post_style, platform) for _ in range(variants - 1)]
+    return {**result, "variants": [{**d, "variant": i + 1} for i, d in enumerate(drafts)]}
+
+
+def _template_fallback(article, post_style: str, platform: str, error_msg: str) -> Dict[str, Any]:
+    logging.error(f"❌ OpenAI failed: {error_msg}")
+    logging.warning("🔄 Falling back to template generation...")
+    
+    # Add fallback metadata for tracking
+    fallback_result = generate_template_based(article, post_style, platform)
+    fallback_result["fallback_reason"] = error_msg
+    fallback_result["attempted_method"] = "openai_gpt"
+    return fallback_result
+
+
+def _log_generation_path() -> str:
+    if not USE_GPT:
+        logging.info("📋 OpenAI disabled - using template generation")
+        return "OpenAI disabled"
+    elif not OPENAI_API_KEY:
+        logging.warning("🔑 No OpenAI API key - using template generation")
+        return "no OpenAI API key"
+    else:
+        logging.info("📋 Using template generation")
+        return "template generation"
+
+
+def _cached_generation(article, cache_key: str, fresh: bool, post_style: str,
+                       platform: str) -> Optional[Dict[str, Any]]:
+    if fresh:
+        generation_cache.record_bypass()
+        record_cache_lookup(post_style, platform, "bypass")
+        return None
+    cached = generation_cache.get(cache_key)
+    record_cache_lookup(post_style, platform, "miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    logging.info("⚡ Serving cached generation")
+    if cached.pop("vault_metadata", None) is not None:
+        # A speculative post reaches the vault when it is first served, not when it was pre-generated
+        vault_metadata = generation_cache.take(cache_key, "vault_metadata")
+        if content_vault and vault_metadata is not None:
+            content_vault.store_successful_post(article.title, cached["post"], vault_metadata)
+    return cached
+
+
+def generate_commentary(article, post_style="trivance_default", platform="LinkedIn", fresh=False,
+                        stream=False, variants: int = 1, platforms: Optional[List[str]] = None,
+                        budget_seconds: Optional[float] = None, race_sla: Optional[float] = None):
+    """
+    Generate a post for the article. LLM results are served from the
+    generation cache unless fresh=True, which forces a new call (and
+    refreshes the cached entry).
+
+    With stream=True an iterator of events is returned instead of a result:
+    {"type": "token", "text": ...} chunks as the post is written, then a
+    single {"type": "done", "result": ...} carrying the final result. On a
+    fallback the final post replaces whatever was streamed so far.
+
+    With variants > 1 the result also carries a "variants" list of drafts
+    to choose from; "post" is the first of them.
+
+    With platforms=[...] (fan-out) one LLM call writes a post for each
+    platform and the result is {"platforms": {platform: result}, ...};
+    ``platform`` is ignored and failed platforms fall back to templates
+    individually.
+
+    Blocking generations are routed by model_router: the first configured
+    model expected to finish within ``budget_seconds`` (default: the
+    platform's latency budget) is used, or templates when none is. The
+    result's "route" says where it went and why.
+
+    With race_sla=S (race mode) a template post is built right away and the
+    LLM generation runs as an "upgrade" job. If the LLM post is ready
+    within S seconds it is returned; otherwise the template is returned
+    with "upgrade_job" set, and app.services.jobs.attach_upgrade() swaps
+    the LLM post into the saved history entry once it lands.
+    """
+    if race_sla is not None:
+        if stream or platforms or variants > 1:
+            raise ValueError("Race mode generates a single, non-streamed post")
+        return _race_commentary(article, post_style, platform, fresh, race_sla)
+    if platforms:
+        return _fanout_commentary(article, post_style, platforms, fresh)
+    if stream:
+        if variants > 1:
+            raise ValueError("Streaming generates a single variant")
+        return _stream_commentary(article, post_style, platform, fresh)
+
+    started = time.time()
+    result = _generate_commentary(article, post_style, platform, fresh, variants, budget_seconds)
+    if variants > 1 and "variants" not in result:
+        result = _template_variants(result, article, post_style, platform, variants)
+    record_generation(result, post_style, platform, time.time() - started)
+    return result
+
+
+def _generate_commentary(article, post_style: str, platform: str, fresh: bool, variants: int = 1,
+                         budget_seconds: Optional[float] = None) -> Dict[str, Any]:
     logging.info(f"🔄 Starting content generation for: {article.title[:50]}...")
     logging.info(f"   Style: {post_style}, Platform: {platform}, USE_GPT: {USE_GPT}")
     
     if USE_GPT and OPENAI_API_KEY:
-        logging.info("🤖 Attempting OpenAI generation...")
-        result = generate_with_openai(article, post_style, platform)
+        budget = budget_seconds or latency_budget(platform)
+        # A cached post is free and instant, so it wins before any routing (or templates) under load
+        if not fresh:
+            # OPENAI_MODEL too: streamed and speculative posts are cached under it
+            for model in dict.fromkeys([*model_router.models, OPENAI_MODEL]):
+                cache_key = generation_cache_key(article, post_style, platform, variants, model)
+                if generation_cache.contains(cache_key):
+                    cached = _cached_generation(article, cache_key, fresh, post_style, platform)
+                    if cached is not None:
+                        return {**cached, "route": Route(model, "cached", budget).to_dict()}
+
+        route = model_router.route(budget)
+        if route.model is None:
+            logging.warning(f"🧭 Routed to templates: {route.reason}")
+            return {**generate_template_based(article, post_style, platform), "route": route.to_dict()}
+
+        cache_key = generation_cache_key(article, post_style, platform, variants, route.model)
+        cached = _cached_generation(article, cache_key, fresh, post_style, platform)
+        if cached is not None:
+            return {**cached, "route": {**route.to_dict(), "reason": "cached"}}
+
+        logging.info(f"🤖 Attempting OpenAI generation with {route.model} ({route.reason})...")
+        started = time.time()
+        result = generate_with_openai(article, post_style, platform, variants,
+                                      model=route.model, timeout=route.budget_seconds)
+        if not result.get("error") or "timeout" in result["error"]:
+            model_router.observe(route.model, time.time() - started)
+        result = {**result, "route": route.to_dict()}
         
         # Check if we actually got an OpenAI response
         if result.get("method") == "openai_gpt" and not result.get("error"):
             logging.info("✅ OpenAI generation completed successfully!")
+            generation_cache.put(cache_key, result, result.get("token_usage", {}).get("total_tokens", 0))
             if DEBUG_GPT_RESPONSE:
                 content_preview = result.get("post", "")[:100] + "..." if len(result.get("post", "")) > 100 else result.get("post", "")
                 logging.info(f"[DEBUG] Final content preview: {content_preview}")
             return result
         else:
-            error_msg = result.get('error', 'Unknown OpenAI failure')
-            logging.error(f"❌ OpenAI failed: {error_msg}")
-            logging.warning("🔄 Falling back to template generation...")
-            
-            # Add fallback metadata for tracking
-            fallback_result = generate_template_based(article, post_style, platform)
-            fallback_result["fallback_reason"] = error_msg
-            fallback_result["attempted_method"] = "openai_gpt"
-            return fallback_result
+            return {**_template_fallback(article, post_style, platform,
+                                         result.get('error', 'Unknown OpenAI failure')),
+                    "route": route.to_dict()}
+    else:
+        reason = _log_generation_path()
+        budget = budget_seconds or latency_budget(platform)
+        return {**generate_template_based(article, post_style, platform),
+                "route": Route(None, reason, budget).to_dict()}
+
+
+def _race_commentary(article, post_style: str, platform: str, fresh: bool, race_sla: float) -> Dict[str, Any]:
+    from .jobs import FAILED, SUCCEEDED, job_queue, job_workers
+
+    started = time.time()
+    template = generate_template_based(article, post_style, platform)
+    if not (USE_GPT and OPENAI_API_KEY):
+        reason = _log_generation_path()
+        return {**template, "route": Route(None, reason, race_sla).to_dict()}
+
+    article_fields = {field: getattr(article, field, None) for field in ("title", "summary", "source", "link")}
+    job_id = job_queue.enqueue("upgrade", {"article": article_fields, "post_style": post_style,
+                                           "platform": platform, "fresh": fresh})
+    job_workers.start()
+    job_workers.notify()
+
+    deadline = started + race_sla
+    job = job_queue.get(job_id)
+    while job["status"] not in (SUCCEEDED, FAILED) and time.time() < deadline:
+        time.sleep(RACE_POLL_INTERVAL)
+        job = job_queue.get(job_id)
+
+    race = {"sla_seconds": race_sla, "job_id": job_id}
+    if job["status"] == SUCCEEDED:
+        logging.info(f"🏁 LLM won the race in {time.time() - started:.2f}s")
+        return {**job["result"], "race": {**race, "winner": "llm"}}
+    if job["status"] == FAILED:
+        logging.warning(f"🏁 LLM failed within the race SLA: {job['error']}")
+        return {**template, "fallback_reason": job["error"], "attempted_method": "openai_gpt",
+                "race": {**race, "winner": "template"}}
+    logging.info(f"🏁 Template returned after {race_sla:g}s SLA; LLM upgrade pending (job {job_id})")
+    record_generation(template, post_style, platform, time.time() - started)
+    return {**template, "race": {**race, "winner": "template"},
+            "upgrade_job": {"id": job_id, "status_url": f"/posts/jobs/{job_id}"}}
+
+
+def _fanout_commentary(article, post_style: str, platforms: List[str], fresh: bool) -> Dict[str, Any]:
+    started = time.time()
+    platforms = list(dict.fromkeys(platforms))
+    results: Dict[str, Dict[str, Any]] = {}
+
+    if USE_GPT and OPENAI_API_KEY:
+        # Cached platforms are served as usual; only the rest go into the fan-out call
+        keys = {p: generation_cache_key(article, post_style, p) for p in platforms}
+        for p in platforms:
+            cached = _cached_generation(article, keys[p], fresh, post_style, p)
+            if cached is not None:
+                results[p] = cached
+        missing = [p for p in platforms if p not in results]
+        if missing:
+            logging.info(f"🤖 Attempting OpenAI fan-out for {', '.join(missing)}...")
+            for p, result in generate_fanout_with_openai(article, post_style, missing).items():
+                if result.get("method") == "openai_gpt" and not result.get("error"):
+                    generation_cache.put(keys[p], result, result["token_usage"].get("total_tokens", 0))
+                    results[p] = result
+                else:
+                    results[p] = _template_fallback(article, post_style, p,
+                                                    result.get("error", "Unknown OpenAI failure"))
     else:
-        if not USE_GPT:
-            logging.info("📋 OpenAI disabled - using template generation")
-        elif not OPENAI_API_KEY:
-            logging.warning("🔑 No OpenAI API key - using template generation")
+        _log_generation_path()
+        results = {p: generate_template_based(article, post_style, p) for p in platforms}
+
+    seconds = time.time() - started
+    token_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    for p in platforms:
+        record_generation(results[p], post_style, p, seconds)
+        if not results[p].get("cached"):
+            for field in token_usage:
+                token_usage[field] += results[p].get("token_usage", {}).get(field, 0)
+    return {
+        "platforms": {p: results[p] for p in platforms},
+        "style_used": post_style,
+        "fallbacks": sum(1 for r in results.values() if r.get("fallback_reason")),
+        "token_usage": token_usage,
+        "wall_seconds": round(seconds, 3),
+    }
+
+
+def _stream_commentary(article, post_style: str, platform: str, fresh: bool) -> Iterator[Dict[str, Any]]:
+    started = time.time()
+    for event in _stream_events(article, post_style, platform, fresh):
+        if event["type"] == "done":
+            record_generation(event["result"], post_style, platform, time.time() - started)
+        yield event
+
+
+def _stream_events(article, post_style: str, platform: str, fresh: bool) -> Iterator[Dict[str, Any]]:
+    logging.info(f"🔄 Starting streamed generation for: {article.title[:50]}...")
+    streamed = False
+
+    if USE_GPT and OPENAI_API_KEY:
+        cache_key = generation_cache_key(article, post_style, platform)
+        cached = _cached_generation(article, cache_key, fresh, post_style, platform)
+        if cached is not None:
+            yield {"type": "token", "text": cached["post"]}
+            yield {"type": "done", "result": cached}
+            return
+
+        logging.info("🤖 Streaming OpenAI generation...")
+        result: Dict[str, Any] = {}
+        for event in stream_with_openai(article, post_style, platform):
+            if event["type"] == "done":
+                result = event["result"]
+            else:
+                streamed = True
+                yield event
+
+        if result.get("method") == "openai_gpt" and not result.get("error"):
+            generation_cache.put(cache_key, result, result.get("token_usage", {}).get("total_tokens", 0))
+            yield {"type": "done", "result": result}
+            return
+        result = _template_fallback(article, post_style, platform,
+                                    result.get("error", "Unknown OpenAI failure"))
+    else:
+        _log_generation_path()
+        result = generate_template_based(article, post_style, platform)
+
+    if not streamed:
+        yield {"type": "token", "text": result["post"]}
+    yield {"type": "done", "result": result}
+
+
+def _generate_batch_item(article, post_style: str, platform: str, fresh: bool) -> Dict[str, Any]:
+    started = time.time()
+    try:
+        result = generate_commentary(article, post_style, platform, fresh=fresh)
+    except Exception as e:
+        logging.error(f"❌ Batch item failed, using template: {e}")
+        result = generate_template_based(article, post_style, platform)
+        result["fallback_reason"] = str(e)
+    return {
+        "title": article.title,
+        "post_style": post_style,
+        "platform": platform,
+        "latency_seconds": round(time.time() - started, 3),
+        "result": result,
+    }
+
+
+def generate_batch(articles: List[Any], styles: List[str], platforms: List[str],
+                   fresh: bool = False, max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Generate every article x style x platform combination with bounded
+    concurrency. Each item falls back to a template on its own, so one
+    failure never sinks the batch.
+    """
+    combos = [(i, article, style, platform)
+              for i, article in enumerate(articles) for style in styles for platform in platforms]
+    workers = max(1, min(max_concurrency or OPENAI_MAX_CONCURRENCY, len(combos) or 1))
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-generate") as executor:
+        futures = [executor.submit(_generate_batch_item, article, style, platform, fresh)
+                   for _, article, style, platform in combos]
+        items = []
+        for (article_index, _, _, _), future in zip(combos, futures):
+            item = future.result()
+            item["article_index"] = article_index
+            items.append(item)
+
+    latencies = sorted(item["latency_seconds"] for item in items)
+    tokens = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    methods: Dict[str, int] = {}
+    cached = fallbacks = 0
+    for item in items:
+        result = item["result"]
+        methods[result.get("method", "unknown")] = methods.get(result.get("method", "unknown"), 0) + 1
+        if result.get("cached"):
+            cached += 1  # tokens were spent by an earlier request
         else:
-            logging.info("📋 Using template generation")
-        return generate_template_based(article, post_style, platform)
+            for field in tokens:
+                tokens[field] += result.get("token_usage", {}).get(field, 0)
+        if result.get("fallback_reason"):
+            fallbacks += 1
+
+    return {
+        "items": items,
+        "summary": {
+            "total": len(items),
+            "methods": methods,
+            "cached": cached,
+            "fallbacks": fallbacks,
+            "concurrency": workers,
+            "wall_seconds": round(time.time() - started, 3),
+            "latency_seconds": {
+                "total": round(sum(latencies), 3),
+                "avg": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                "max": latencies[-1] if latencies else 0.0,
+            },
+            "token_usage": tokens,
+        },
+    }
+
 
 def get_available_styles() -> Dict[str, str]:
     return {k: v["description"] for k, v in STYLE_EXAMPLES.items()}
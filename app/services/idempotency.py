@@ -0,0 +1,224 @@
+"""
+Idempotency keys for endpoints that spend money or write records.
+
+A request carrying an ``Idempotency-Key`` header runs once. Its response is
+kept for IDEMPOTENCY_TTL_SECONDS, and a retry with the same key and the same
+body gets that stored response back without running again. A duplicate
+that arrives while the first request is still running waits for it to
+finish. Reusing a key with a different body is rejected.
+
+Keys are kept in a small SQLite table under data/, so the stored responses
+and in-flight markers are shared by all worker processes. The table is
+capped at IDEMPOTENCY_MAX_KEYS rows, oldest first. Failed requests are not
+stored, so a retry after an error runs again.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import persistence
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# How long a duplicate waits for the in-flight original before giving up
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+# An in-flight marker older than this belongs to a request that died; it may be taken over
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+IDEMPOTENCY_DB = "idempotency.db"
+POLL_INTERVAL = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    response TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_created ON idempotency_keys (created_at);
+"""
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request."""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request is still running after the wait limit."""
+
+
+def fingerprint(request: Any) -> str:
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, db_path: Optional[Path] = None, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+                 max_keys: int = IDEMPOTENCY_MAX_KEYS, wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS,
+                 lock_seconds: float = IDEMPOTENCY_LOCK_SECONDS):
+        self._db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self._initialized: Optional[Path] = None
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path or persistence.DATA_DIR / IDEMPOTENCY_DB
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.db_path
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        if self._initialized != path:
+            with self._lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._initialized = path
+        return conn
+
+    def _claim(self, scope: str, key: str, digest: str) -> Tuple[str, Optional[Any]]:
+        """
+        One look at the key: ("run", None) when this request now owns it,
+        ("done", response) when a stored response exists, ("wait", None)
+        while another request holds it.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT fingerprint, response, created_at, expires_at FROM idempotency_keys "
+                "WHERE scope = ? AND key = ?", (scope, key)
+            ).fetchone()
+            stale = row is not None and (
+                row[3] <= now or (row[1] is None and now - row[2] > self.lock_seconds))
+            if row is not None and not stale:
+                conn.execute("COMMIT")
+                if row[0] != digest:
+                    raise IdempotencyConflict(f"Idempotency-Key {key!r} was already used for a different request")
+                return ("wait", None) if row[1] is None else ("done", json.loads(row[1]))
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (scope, key, fingerprint, response, created_at, expires_at) "
+                "VALUES (?, ?, ?, NULL, ?, ?)",
+                (scope, key, digest, now, now + self.ttl_seconds),
+            )
+            self._prune(conn, now)
+            conn.execute("COMMIT")
+            return "run", None
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0] - self.max_keys
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE rowid IN "
+                "(SELECT rowid FROM idempotency_keys WHERE response IS NOT NULL ORDER BY created_at LIMIT ?)",
+                (excess,),
+            )
+
+    def _store(self, scope: str, key: str, response: Any) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE idempotency_keys SET response = ? WHERE scope = ? AND key = ?",
+                         (json.dumps(response), scope, key))
+        finally:
+            conn.close()
+
+    def _release(self, scope: str, key: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM idempotency_keys WHERE scope = ? AND key = ? AND response IS NULL",
+                         (scope, key))
+        finally:
+            conn.close()
+
+    def begin(self, scope: str, key: str, request: Any) -> Tuple[bool, Any]:
+        """
+        Take the key, waiting while another request holds it. Returns
+        (True, response) to replay a stored response, or (False, None) when
+        the caller now owns the key and must end with ``complete`` or
+        ``abandon``. For callers that cannot hand ``run`` a single callable,
+        such as streamed responses.
+        """
+        digest = fingerprint(request)
+        deadline = time.monotonic() + self.wait_seconds
+        waited = False
+        while True:
+            state, response = self._claim(scope, key, digest)
+            if state == "done":
+                with self._lock:
+                    self.replayed += 1
+                    self.waited += waited
+                return True, response
+            if state == "run":
+                return False, None
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(f"A request with Idempotency-Key {key!r} is still in progress")
+            waited = True
+            time.sleep(POLL_INTERVAL)
+
+    def complete(self, scope: str, key: str, response: Any) -> None:
+        """Store the owner's response for replay."""
+        self._store(scope, key, response)
+        with self._lock:
+            self.executed += 1
+
+    def abandon(self, scope: str, key: str) -> None:
+        """Free the key without storing anything, so a retry runs again."""
+        self._release(scope, key)
+        with self._lock:
+            self.executed += 1
+
+    def run(self, scope: str, key: str, request: Any, execute: Callable[[], Any],
+            succeeded: Callable[[Any], bool] = lambda response: True) -> Tuple[Any, bool]:
+        """
+        Run ``execute`` once per (scope, key). Returns (response, replayed).
+        Responses for which ``succeeded`` is false, and exceptions, free the
+        key instead of being stored.
+        """
+        replayed, response = self.begin(scope, key, request)
+        if replayed:
+            return response, True
+
+        try:
+            response = execute()
+        except BaseException:
+            self._release(scope, key)
+            raise
+        if succeeded(response):
+            self.complete(scope, key, response)
+        else:
+            self.abandon(scope, key)
+        return response, False
+
+    def stats(self) -> Dict[str, Any]:
+        keys = in_flight = 0
+        if self.db_path.exists():
+            conn = self._connect()
+            try:
+                keys, in_flight = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(response IS NULL), 0) FROM idempotency_keys").fetchone()
+            finally:
+                conn.close()
+        return {"keys": keys, "in_flight": in_flight, "max_keys": self.max_keys,
+                "executed": self.executed, "replayed": self.replayed, "waited": self.waited}
+
+
+idempotency_store = IdempotencyStore()
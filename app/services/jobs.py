@@ -0,0 +1,457 @@
+"""
+Persistent generation job queue with a local worker pool.
+
+Jobs live in a SQLite table under data/ (jobs.db), so they survive
+restarts and every process shares one queue. Workers claim the oldest
+queued job inside an IMMEDIATE transaction, which means two workers never
+get the same job. A claim is a lease: if a worker dies mid-job, the lease
+expires and another worker picks the job up again, up to JOB_MAX_ATTEMPTS
+times. Throughput scales with JOB_WORKERS threads per process, or with
+more processes pointed at the same data directory.
+
+When a job finishes, its optional callback URL gets a POST with the job
+record. Callback hosts must resolve to public addresses unless they are
+listed in JOB_CALLBACK_ALLOWED_HOSTS, so a caller cannot point the server
+at internal services. Finished jobs are deleted JOB_RETENTION_HOURS after
+they finish.
+
+"upgrade" jobs back the race mode of generate_commentary: they run the LLM
+generation that lost the race against a template, then swap the LLM post
+into the history entry that was saved with the template text.
+"""
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from . import persistence
+from .generator import generate_commentary
+from .posts import save_generated_post, upgrade_generated_post
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "5"))
+JOB_CALLBACK_ATTEMPTS = 3
+# Hosts allowed to resolve to private or loopback addresses, e.g. an internal webhook receiver
+JOB_CALLBACK_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",")
+                              if host.strip()}
+# Succeeded and failed jobs are deleted this long after finishing; 0 keeps them
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+JOB_PRUNE_INTERVAL = 300
+JOBS_DB = "jobs.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    callback_url TEXT,
+    callback_status TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS generation_jobs_status ON generation_jobs (status, created_at);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class JobQueue:
+    """The jobs table: enqueue, claim with a lease, finish, look up."""
+
+    def __init__(self, db_path: Optional[Path] = None, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, retention_seconds: float = JOB_RETENTION_HOURS * 3600):
+        self._db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._next_prune = 0.0
+        self._initialized: Optional[Path] = None
+        self._lock = threading.Lock()
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path or persistence.DATA_DIR / JOBS_DB
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.db_path
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if self._initialized != path:
+            with self._lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._initialized = path
+        return conn
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None,
+                job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO generation_jobs (id, kind, status, payload, callback_url, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), callback_url, time.time()),
+            )
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job: queued, or running on a worker whose lease ran out."""
+        if not self.db_path.exists():
+            return None  # Nothing was ever enqueued; the database is created by the first enqueue
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            # Jobs whose workers died too often are given up on
+            conn.execute(
+                "UPDATE generation_jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+                (FAILED, "worker lost too many times", now, RUNNING, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT * FROM generation_jobs WHERE status = ? OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE generation_jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                "lease_expires_at = ?, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, worker, now + self.lease_seconds, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            return self._decode(row)
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, worker: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> bool:
+        """Record the outcome; False if the lease was lost to another worker meanwhile."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "UPDATE generation_jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "lease_expires_at = NULL WHERE id = ? AND worker = ? AND status = ?",
+                (FAILED if error else SUCCEEDED, None if result is None else json.dumps(result), error,
+                 time.time(), job_id, worker, RUNNING),
+            ).rowcount == 1
+        finally:
+            conn.close()
+
+    def annotate(self, job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Merge ``fields`` into the job's payload; returns the job as it stands afterwards."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT payload FROM generation_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            payload = {**json.loads(row["payload"]), **fields}
+            conn.execute("UPDATE generation_jobs SET payload = ? WHERE id = ?", (json.dumps(payload), job_id))
+            job = self._decode(conn.execute("SELECT * FROM generation_jobs WHERE id = ?", (job_id,)).fetchone())
+            conn.execute("COMMIT")
+            return job
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def prune(self) -> int:
+        """Delete succeeded and failed jobs that finished more than the retention period ago."""
+        self._next_prune = time.time() + JOB_PRUNE_INTERVAL
+        if self.retention_seconds <= 0 or not self.db_path.exists():
+            return 0
+        conn = self._connect()
+        try:
+            removed = conn.execute(
+                "DELETE FROM generation_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, time.time() - self.retention_seconds),
+            ).rowcount
+        finally:
+            conn.close()
+        if removed:
+            print(f"🧹 Pruned {removed} finished jobs")
+        return removed
+
+    def prune_due(self) -> bool:
+        return time.time() >= self._next_prune
+
+    def set_callback_status(self, job_id: str, status: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE generation_jobs SET callback_status = ? WHERE id = ?", (status, job_id))
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not self.db_path.exists():
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM generation_jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._decode(row) if row else None
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        if self.db_path.exists():
+            conn = self._connect()
+            try:
+                counts = dict(conn.execute("SELECT status, COUNT(*) FROM generation_jobs GROUP BY status").fetchall())
+            finally:
+                conn.close()
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The job as API clients see it."""
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "callback_status": job["callback_status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+def callback_url_error(url: str) -> Optional[str]:
+    """
+    Why a callback URL may not be called, or None if it may. Every address
+    the host resolves to must be public (not private, loopback, link-local
+    or reserved) unless the host is in JOB_CALLBACK_ALLOWED_HOSTS.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError as e:
+        return f"invalid callback URL: {e}"
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return "callback URL must be http(s) with a host"
+    host = parts.hostname.lower()
+    if host in JOB_CALLBACK_ALLOWED_HOSTS:
+        return None
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except OSError:
+        return f"callback host {host} does not resolve"
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            return f"callback host {host} resolves to a non-public address ({address})"
+    return None
+
+
+def send_callback(url: str, body: Dict[str, Any], attempts: int = JOB_CALLBACK_ATTEMPTS) -> str:
+    """POST the job to its callback URL with a few retries; returns a short status for the record."""
+    error = callback_url_error(url)  # Checked again at send time: DNS may have changed since enqueue
+    if error:
+        print(f"Error delivering job callback to {url}: {error}")
+        return f"refused: {error}"
+    status = "not sent"
+    for attempt in range(attempts):
+        try:
+            # Redirects are not followed; they could lead to an internal address
+            response = requests.post(url, json=body, timeout=JOB_CALLBACK_TIMEOUT, allow_redirects=False)
+            status = f"HTTP {response.status_code}"
+            if response.status_code < 500:
+                return status
+        except requests.RequestException as e:
+            status = f"error: {e.__class__.__name__}"
+        if attempt + 1 < attempts:
+            time.sleep(0.5 * 2 ** attempt)
+    print(f"Error delivering job callback to {url}: {status}")
+    return status
+
+
+class JobWorkerPool:
+    """
+    Worker threads that claim and run jobs. ``handlers`` maps a job kind to
+    its function; ``finishers`` run with the stored job once a job of that
+    kind has succeeded.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]],
+                 workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL,
+                 finishers: Optional[Dict[str, Callable[[Dict[str, Any]], None]]] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.finishers = finishers or {}
+        self.workers = max(0, workers)
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def notify(self) -> None:
+        """Wake idle workers after an enqueue instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _loop(self) -> None:
+        worker = f"{os.getpid()}-{threading.current_thread().name}-{uuid.uuid4().hex[:6]}"
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker)
+            except Exception as e:
+                print(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                if self.queue.prune_due():
+                    try:
+                        self.queue.prune()
+                    except Exception as e:
+                        print(f"Error pruning jobs: {e}")
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.run_job(job, worker)
+
+    def run_job(self, job: Dict[str, Any], worker: str) -> None:
+        handler = self.handlers.get(job["kind"])
+        result, error = None, None
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind {job['kind']!r}")
+            result = handler(job["payload"])
+        except Exception as e:
+            print(f"Error running job {job['id']}: {e}")
+            error = str(e)
+        if not self.queue.finish(job["id"], worker, result, error):
+            return  # lease lost: another worker owns the job now
+        with self._lock:
+            if error:
+                self.failed += 1
+            else:
+                self.completed += 1
+        finished = self.queue.get(job["id"])
+        finisher = self.finishers.get(job["kind"])
+        if finisher is not None and not error:
+            try:
+                finisher(finished)
+            except Exception as e:
+                print(f"Error finishing job {job['id']}: {e}")
+        if job.get("callback_url"):
+            self.queue.set_callback_status(job["id"], send_callback(job["callback_url"], public_job(finished)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len(self._threads), "completed": self.completed, "failed": self.failed,
+                **self.queue.stats()}
+
+
+def run_generation_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handler for "generate" jobs: the same work as POST /posts/generate."""
+    article = SimpleNamespace(**payload["article"])
+    result = generate_commentary(article, post_style=article.post_style, platform=article.platform or "LinkedIn",
+                                 fresh=payload.get("fresh", False), variants=payload.get("variants", 1),
+                                 budget_seconds=payload.get("latency_budget"))
+    if payload.get("save", True) and "post" in result:
+        save_generated_post(
+            title=article.title,
+            summary=article.summary,
+            source=article.source,
+            link=article.link,
+            generated_content=result["post"]
+        )
+    return result
+
+
+def run_upgrade_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handler for "upgrade" jobs: the LLM generation only; a template fallback fails the job."""
+    article = SimpleNamespace(**payload["article"])
+    result = generate_commentary(article, post_style=payload["post_style"], platform=payload["platform"],
+                                 fresh=payload.get("fresh", False))
+    if result.get("method") != "openai_gpt":
+        raise RuntimeError(result.get("fallback_reason") or "LLM generation unavailable")
+    return result
+
+
+def _apply_upgrade(job: Dict[str, Any]) -> None:
+    post_id = job["payload"].get("upgrade_post_id")
+    if post_id is not None and job["status"] == SUCCEEDED and job["result"]:
+        if upgrade_generated_post(post_id, job["result"]["post"], method=job["result"]["method"],
+                                  upgrade_job=job["id"]):
+            print(f"⬆️ Upgraded post {post_id} with the LLM version (job {job['id']})")
+
+
+def attach_upgrade(job_id: str, post_id: Any) -> None:
+    """
+    Point an upgrade job at the history entry holding the template post.
+    Whichever side comes second applies the upgrade: the job's finisher if
+    it is still running now, otherwise this call.
+    """
+    job = job_queue.annotate(job_id, upgrade_post_id=post_id)
+    if job is not None:
+        _apply_upgrade(job)
+
+
+job_queue = JobQueue()
+job_workers = JobWorkerPool(job_queue, {"generate": run_generation_job, "upgrade": run_upgrade_job},
+                            finishers={"upgrade": _apply_upgrade})
@@ -0,0 +1,270 @@
+"""
+Shared OpenAI client - created once per process and reused across requests.
+
+The client owns a pooled httpx connection pool, so repeated generations
+reuse warm TLS connections instead of paying a new handshake per call.
+Timeouts and pool limits come from the environment; OPENAI_BASE_URL points
+the client at any OpenAI-compatible server (e.g. a local mock).
+
+Generations run through GenerationPool: coroutines on one background event
+loop, at most OPENAI_MAX_CONCURRENCY at a time. A timeout cancels the
+request task, which closes its connection instead of leaving a thread
+behind that keeps spending tokens.
+"""
+import asyncio
+import concurrent.futures
+import os
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+import httpx
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "15"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+
+class OpenAIClientManager:
+    """Lazily builds one pooled OpenAI client and hands it out."""
+
+    def __init__(self, **settings: Any):
+        self._settings: Dict[str, Any] = {
+            "api_key": OPENAI_API_KEY,
+            "base_url": OPENAI_BASE_URL,
+            "timeout": OPENAI_TIMEOUT,
+            "connect_timeout": OPENAI_CONNECT_TIMEOUT,
+            "max_connections": OPENAI_MAX_CONNECTIONS,
+            "max_keepalive_connections": OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        }
+        self._settings.update(settings)
+        self._client = None
+        self._lock = threading.Lock()
+        self.clients_created = 0
+        self.version = 0  # bumped by configure() so async clients know to rebuild
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return dict(self._settings)
+
+    def _http_options(self) -> Dict[str, Any]:
+        s = self._settings
+        return {
+            "timeout": httpx.Timeout(s["timeout"], connect=s["connect_timeout"]),
+            "limits": httpx.Limits(
+                max_connections=s["max_connections"],
+                max_keepalive_connections=s["max_keepalive_connections"],
+            ),
+        }
+
+    def _build(self):
+        if openai is None:
+            raise ImportError("openai package is not installed")
+        s = self._settings
+        self.clients_created += 1
+        return openai.OpenAI(
+            api_key=s["api_key"],
+            base_url=s["base_url"],
+            timeout=s["timeout"],
+            max_retries=0,  # the generator decides whether to retry or fall back
+            http_client=httpx.Client(**self._http_options()),
+        )
+
+    def build_async_client(self):
+        """A new AsyncOpenAI client; it must be used (and closed) on one event loop."""
+        if openai is None:
+            raise ImportError("openai package is not installed")
+        s = self._settings
+        self.clients_created += 1
+        return openai.AsyncOpenAI(
+            api_key=s["api_key"],
+            base_url=s["base_url"],
+            timeout=s["timeout"],
+            max_retries=0,
+            http_client=httpx.AsyncClient(**self._http_options()),
+        )
+
+    def get_client(self):
+        """The shared client, created on first use."""
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build()
+                client = self._client
+        return client
+
+    def configure(self, **settings: Any) -> None:
+        """Change settings (API key, base URL, timeouts, limits); the next call rebuilds the client."""
+        with self._lock:
+            self._settings.update(settings)
+            self.version += 1
+            self._close_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+
+class GenerationTimeout(TimeoutError):
+    """The call did not finish in time and was cancelled."""
+
+
+class GenerationCancelled(Exception):
+    """The call was cancelled before it finished."""
+
+
+class GenerationPool:
+    """Runs LLM calls on a background event loop with bounded concurrency."""
+
+    def __init__(self, manager: OpenAIClientManager, max_concurrency: int = OPENAI_MAX_CONCURRENCY):
+        self.manager = manager
+        self.max_concurrency = max(1, max_concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client = None
+        self._client_version = -1
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-generation-loop", daemon=True).start()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._loop = loop
+            return self._loop
+
+    async def _get_client(self):
+        # Only ever called on the pool's loop, so no lock is needed here
+        if self._client is None or self._client_version != self.manager.version:
+            old, self._client = self._client, None
+            if old is not None:
+                try:
+                    await old.close()
+                except Exception:
+                    pass
+            self._client_version = self.manager.version
+            self._client = self.manager.build_async_client()
+        return self._client
+
+    async def _acquire_and_call(self, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await call(await self._get_client())
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _run(self, call: Callable[[Any], Awaitable[Any]], timeout: Optional[float]) -> Any:
+        try:
+            result = await asyncio.wait_for(self._acquire_and_call(call), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise GenerationTimeout(f"generation timed out after {timeout:g}s") from None
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def submit(self, call: Callable[[Any], Awaitable[Any]],
+               timeout: Optional[float] = None) -> "concurrent.futures.Future":
+        """
+        Schedule ``call(async_client)`` and return a future. Cancelling the
+        future cancels the request; ``timeout`` covers queueing plus the call.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._run(call, timeout), loop)
+
+    def run(self, call: Callable[[Any], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run ``call(async_client)`` and block for its result."""
+        future = self.submit(call, timeout)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise GenerationCancelled("generation was cancelled") from None
+        except BaseException:
+            # KeyboardInterrupt and friends: don't leave the request running
+            future.cancel()
+            raise
+
+    def stream(self, call: Callable[[Any], Awaitable[Any]],
+               timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Run ``call(async_client)``, which resolves to an async iterable (a
+        streamed completion), and yield its items in the calling thread as
+        they arrive. Closing the iterator early cancels the request.
+        """
+        items: "queue.Queue" = queue.Queue()
+        finished = object()
+
+        async def pump(client):
+            async for item in await call(client):
+                items.put(item)
+
+        future = self.submit(pump, timeout)
+        future.add_done_callback(lambda _: items.put(finished))
+        try:
+            while True:
+                item = items.get()
+                if item is finished:
+                    break
+                yield item
+            try:
+                future.result()
+            except concurrent.futures.CancelledError:
+                raise GenerationCancelled("generation was cancelled") from None
+        finally:
+            future.cancel()  # no-op when done; aborts the stream if the consumer went away
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+        }
+
+
+client_manager = OpenAIClientManager()
+generation_pool = GenerationPool(client_manager)
+
+
+def get_openai_client():
+    """Shortcut for the process-wide client."""
+    return client_manager.get_client()
@@ -0,0 +1,314 @@
+"""
+Retries, hedging and latency budgets for LLM calls.
+
+Transient failures (timeouts, connection errors, 429 and 5xx responses)
+are retried with exponential backoff and full jitter. With hedging on, a
+second identical request is fired once the first has run longer than the
+observed p95 latency for the platform; whichever finishes first wins and
+the other is cancelled. Every generation also has a per-platform latency
+budget covering all attempts, after which the caller falls back.
+
+A circuit breaker sits in front of all of this. When most recent
+generations failed, it opens and callers fall back to templates at once
+instead of spending their whole budget on a provider that is down.
+"""
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+from .rate_limiter import RateLimiter, rate_limiter
+
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "4"))
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+# Hedge delay used until enough latencies have been observed for a p95
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "6"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Seconds a whole generation (every attempt and hedge) may take per platform
+DEFAULT_LATENCY_BUDGETS = {"LinkedIn": 15.0, "Email": 20.0, "X": 10.0}
+LATENCY_BUDGETS = {
+    platform: float(os.getenv(f"LLM_LATENCY_BUDGET_{platform.upper()}", str(budget)))
+    for platform, budget in DEFAULT_LATENCY_BUDGETS.items()
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() == "true"
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))          # recent generations considered
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))    # before the rate is trusted
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+
+def latency_budget(platform: str) -> float:
+    return LATENCY_BUDGETS.get(platform, LATENCY_BUDGETS.get("LinkedIn", DEFAULT_LATENCY_BUDGETS["LinkedIn"]))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient provider or network errors that a new attempt may fix."""
+    if openai is not None:
+        if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return isinstance(error, ConnectionError)
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt n sleeps U(0, min(max_delay, base * 2**n))."""
+
+    max_attempts: int = LLM_RETRY_ATTEMPTS
+    base_delay: float = LLM_RETRY_BASE_DELAY
+    max_delay: float = LLM_RETRY_MAX_DELAY
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = math.ceil(pct / 100 * len(samples))  # nearest-rank percentile
+        return samples[min(len(samples), max(1, rank)) - 1]
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and their outcomes fill a rolling window; once
+    it holds ``min_calls`` outcomes and the failure share reaches
+    ``failure_rate``, the circuit opens. Open: calls are refused for
+    ``open_seconds``. Half-open: up to ``half_open_probes`` calls go
+    through; if they all succeed the circuit closes, any failure reopens it.
+    """
+
+    def __init__(self, enabled: bool = LLM_BREAKER_ENABLED, window: int = LLM_BREAKER_WINDOW,
+                 min_calls: int = LLM_BREAKER_MIN_CALLS, failure_rate: float = LLM_BREAKER_FAILURE_RATE,
+                 open_seconds: float = LLM_BREAKER_OPEN_SECONDS,
+                 half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES):
+        self.enabled = enabled
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self._outcomes: Deque[bool] = deque(maxlen=max(1, window))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_out = 0
+        self._probes_ok = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_out = self._probes_ok = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; half-open admits a limited number of probes."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_out < self.half_open_probes:
+                self._probes_out += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def record(self, success: Optional[bool]) -> None:
+        """Outcome of an allowed call; None (cancelled, misconfigured) only frees a probe slot."""
+        if not self.enabled:
+            return
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if success is None:
+                    self._probes_out = max(0, self._probes_out - 1)
+                elif not success:
+                    self._open()
+                else:
+                    self._probes_ok += 1
+                    if self._probes_ok >= self.half_open_probes:
+                        self._state = CLOSED
+                        self._outcomes.clear()
+                return
+            if state == CLOSED and success is not None:
+                self._outcomes.append(success)
+                failures = self._outcomes.count(False)
+                if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            outcomes = list(self._outcomes)
+        return {
+            "enabled": self.enabled,
+            "state": state,
+            "recent_calls": len(outcomes),
+            "recent_failure_rate": round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+class ResilientCaller:
+    """Wraps one LLM call coroutine with retries and optional hedging."""
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, hedging: bool = LLM_HEDGING_ENABLED,
+                 hedge_default_delay: float = LLM_HEDGE_DEFAULT_DELAY,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 limiter: Optional[RateLimiter] = None):
+        self.policy = policy or RetryPolicy()
+        self.limiter = limiter
+        self.hedging = hedging
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.retries_exhausted = 0
+
+    def _tracker(self, platform: str) -> LatencyTracker:
+        if platform not in self.latency:
+            self.latency[platform] = LatencyTracker()
+        return self.latency[platform]
+
+    def hedge_delay(self, platform: str) -> float:
+        """Observed p95 for the platform, or the default until there are enough samples."""
+        tracker = self._tracker(platform)
+        if len(tracker) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return tracker.percentile(95)
+
+    async def _timed(self, make_call: Callable[[Any], Awaitable[Any]], client: Any, platform: str,
+                     tokens: int) -> Any:
+        # Every attempt and hedge is a request of its own as far as rate limits go
+        if self.limiter is not None:
+            await self.limiter.acquire_async(tokens)
+        started = time.monotonic()
+        result = await make_call(client)
+        self._tracker(platform).record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, make_call: Callable[[Any], Awaitable[Any]], client: Any, platform: str,
+                      tokens: int) -> Any:
+        primary = asyncio.ensure_future(self._timed(make_call, client, platform, tokens))
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            # Cancelled here (timeout, client gone), the primary must not keep spending tokens
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(platform))
+            if done:
+                return primary.result()
+
+            self.hedges_fired += 1
+            hedge = asyncio.ensure_future(self._timed(make_call, client, platform, tokens))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, client: Any, make_call: Callable[[Any], Awaitable[Any]],
+                   platform: str = "LinkedIn", hedge: bool = True, tokens: int = 0) -> Any:
+        """
+        Run ``make_call(client)`` with retries (and hedging when enabled and
+        allowed). ``tokens`` is what one attempt counts against the rate limiter.
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.hedging and hedge:
+                    return await self._hedged(make_call, client, platform, tokens)
+                return await self._timed(make_call, client, platform, tokens)
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.policy.max_attempts:
+                    if attempt >= self.policy.max_attempts and is_retryable(e):
+                        self.retries_exhausted += 1
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.policy.delay(attempt - 1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "retries_exhausted": self.retries_exhausted,
+            "hedging": self.hedging,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "p95_seconds": {platform: round(tracker.percentile(95), 3)
+                            for platform, tracker in self.latency.items() if len(tracker)},
+            "latency_budgets": dict(LATENCY_BUDGETS),
+        }
+
+
+resilient_caller = ResilientCaller(limiter=rate_limiter)
+circuit_breaker = CircuitBreaker()
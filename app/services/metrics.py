@@ -0,0 +1,226 @@
+"""
+In-process generation metrics, exposed in Prometheus text format at /metrics.
+
+Counters and histograms are labelled by style, platform and method so
+latency and token spend can be broken down without grepping logs. Gauges
+for live state (in-flight generations, rate limiter queue) are read from
+their owners when the endpoint is scraped.
+"""
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .prompt_builder import DEFAULT_STYLE, style_key
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0)
+
+# The STYLE_EXAMPLES keys; other styles get the default template and are counted under it
+KNOWN_STYLES = {"trivance_default", "punchy", "casual"}
+KNOWN_PLATFORMS = {"LinkedIn", "Email", "X"}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+                                for k, v in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series["count"] if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]})
+                           for k, v in self._values.items())
+        for key, series in items:
+            for bound, count in zip(self.buckets, series["buckets"]):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A gauge or counter whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Tuple[str, ...] = (), type: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.read = read
+        self.type = type
+
+    def render(self) -> List[str]:
+        try:
+            samples = self.read()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return []
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+                                for k, v in sorted(samples.items()) if v is not None]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+GENERATION_SECONDS = registry.register(Histogram(
+    "trivance_generation_duration_seconds", "Time to produce a post, including fallbacks.",
+    ("style", "platform", "method")))
+GENERATIONS = registry.register(Counter(
+    "trivance_generations_total", "Posts produced.", ("style", "platform", "method")))
+GENERATION_TOKENS = registry.register(Counter(
+    "trivance_generation_tokens_total", "LLM tokens spent (cache hits excluded).",
+    ("style", "platform", "method", "kind")))
+FALLBACKS = registry.register(Counter(
+    "trivance_generation_fallbacks_total", "LLM generations that fell back to templates.",
+    ("style", "platform", "reason")))
+CACHE_LOOKUPS = registry.register(Counter(
+    "trivance_generation_cache_total", "Generation cache lookups.", ("style", "platform", "result")))
+
+
+def style_label(style: Optional[str]) -> str:
+    key = style_key(style)
+    return key if key in KNOWN_STYLES else DEFAULT_STYLE
+
+
+def platform_label(platform: Optional[str]) -> str:
+    return platform if platform in KNOWN_PLATFORMS else "other"
+
+
+_FALLBACK_PATTERNS = [
+    ("circuit_open", re.compile(r"circuit open", re.I)),
+    ("timeout", re.compile(r"time(d)? ?out", re.I)),
+    ("cancelled", re.compile(r"cancel", re.I)),
+    ("rate_limited", re.compile(r"\b429\b|rate limit", re.I)),
+    ("server_error", re.compile(r"\b5\d\d\b")),
+    ("too_short", re.compile(r"too short", re.I)),
+    ("empty_response", re.compile(r"empty", re.I)),
+    ("unavailable", re.compile(r"not available|not installed", re.I)),
+    ("api_error", re.compile(r"api error", re.I)),
+]
+
+
+def fallback_reason_label(message: Optional[str]) -> str:
+    """Collapse a free-text fallback reason into a low-cardinality label."""
+    for label, pattern in _FALLBACK_PATTERNS:
+        if message and pattern.search(message):
+            return label
+    return "other"
+
+
+def record_cache_lookup(style: str, platform: str, result: str) -> None:
+    CACHE_LOOKUPS.inc(style=style_label(style), platform=platform_label(platform), result=result)
+
+
+def record_generation(result: Dict[str, Any], style: str, platform: str, seconds: float) -> None:
+    """Account one finished generation (LLM, cached or template)."""
+    labels = {"style": style_label(style), "platform": platform_label(platform)}
+    method = "cache" if result.get("cached") else result.get("method", "unknown")
+    GENERATION_SECONDS.observe(seconds, method=method, **labels)
+    GENERATIONS.inc(method=method, **labels)
+    if not result.get("cached"):
+        usage = result.get("token_usage") or {}
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens", 0)
+            if tokens:
+                GENERATION_TOKENS.inc(tokens, method=method, kind=kind, **labels)
+    if result.get("fallback_reason"):
+        FALLBACKS.inc(reason=fallback_reason_label(result["fallback_reason"]), **labels)
+
+
+def render_metrics() -> str:
+    return registry.render()
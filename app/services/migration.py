@@ -0,0 +1,375 @@
+"""
+Streaming migration of the JSON stores into SQLite.
+
+Records are parsed one at a time from each file (never the whole array at
+once) and inserted in batched transactions. After every batch the number
+of records done is committed together with the batch, so a failed or
+interrupted run resumes where it stopped.
+
+Usage:
+    python -m app.services.migration [--batch-size 500] [--restart] [--db sqlite:///path.db]
+"""
+import argparse
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import persistence
+
+DEFAULT_BATCH_SIZE = 500
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class StreamingJSONError(ValueError):
+    """Raised when a store file isn't the JSON shape the migration expects."""
+
+
+class _ChunkReader:
+    """Character buffer over a file that is refilled on demand."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer stays bounded by the largest record
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise StreamingJSONError(f"Expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def decode_value(self, decoder: json.JSONDecoder) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self.fill():
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return value
+
+
+def iter_json_array(path: Path, key: Optional[str] = None,
+                    chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the items of a top-level JSON array, or of the array stored under
+    ``key`` in a top-level object, without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _ChunkReader(f, chunk_size)
+        if reader.peek() == "":
+            return
+
+        if key is not None:
+            reader.expect("{")
+            while True:
+                if reader.peek() == "}":
+                    return
+                name = reader.decode_value(decoder)
+                reader.expect(":")
+                if name == key:
+                    break
+                reader.decode_value(decoder)  # skip small sibling values like "stats"
+                if reader.peek() == ",":
+                    reader.pos += 1
+
+        reader.expect("[")
+        if reader.peek() == "]":
+            return
+        while True:
+            yield reader.decode_value(decoder)
+            char = reader.peek()
+            if char == ",":
+                reader.pos += 1
+            elif char == "]":
+                return
+            else:
+                raise StreamingJSONError(f"Unexpected {char!r} in array in {path}")
+
+
+# -- record mappings -------------------------------------------------------
+
+def _feed_row(feed: Dict) -> Tuple:
+    return (feed.get("name"), feed.get("url"))
+
+
+def _subscriber_row(email: Any) -> Tuple:
+    return (email,)
+
+
+def _post_row(post: Dict) -> Tuple:
+    return (
+        None if post.get("id") is None else str(post["id"]), post.get("title", ""), post.get("summary"), post.get("source"),
+        post.get("link"), post.get("generated_content", ""), post.get("created_at"),
+        post.get("timestamp"),
+    )
+
+
+def _history_row(post: Dict) -> Tuple:
+    return (
+        post.get("id"), post.get("title", ""), post.get("source"), post.get("enhanced_summary"),
+        post.get("generated_post", ""), post.get("platform"), post.get("media"),
+        json.dumps(post.get("hashtags", [])), post.get("timestamp"),
+        post.get("character_count"), post.get("word_count"),
+    )
+
+
+def _vault_row(entry: Dict) -> Tuple:
+    return (
+        entry.get("timestamp"), entry.get("article_title"), entry.get("generated_post", ""),
+        entry.get("character_count"), entry.get("method"), entry.get("style_used"),
+        entry.get("platform"), json.dumps(entry.get("token_usage", {})),
+        entry.get("generation_time"),
+    )
+
+
+# name -> (file, key inside the file, INSERT statement, row mapper)
+SOURCES: Dict[str, Tuple[str, Optional[str], str, Callable[[Any], Tuple]]] = {
+    "feeds": (
+        "feeds.json", None,
+        "INSERT OR IGNORE INTO feeds (name, url) VALUES (?, ?)",
+        _feed_row,
+    ),
+    "subscribers": (
+        "subscribers.json", None,
+        "INSERT OR IGNORE INTO subscribers (email) VALUES (?)",
+        _subscriber_row,
+    ),
+    "posts": (
+        "posts.json", None,
+        "INSERT OR IGNORE INTO posts (id, title, summary, source, link, generated_content, "
+        "created_at, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        _post_row,
+    ),
+    "generated_posts": (
+        "generated_posts.json", None,
+        "INSERT OR IGNORE INTO post_history (id, title, source, enhanced_summary, generated_post, "
+        "platform, media, hashtags, timestamp, character_count, word_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _history_row,
+    ),
+    "content_vault": (
+        "content_vault.jsonl", None,
+        "INSERT OR IGNORE INTO vault_entries (timestamp, article_title, generated_post, "
+        "character_count, method, style_used, platform, token_usage, generation_time) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _vault_row,
+    ),
+}
+
+
+# Sources whose rows carry their own primary key: source -> (table, id type).
+# A clash with a different row, or a missing ID, gets a fresh ID instead of being dropped.
+KEYED_SOURCES: Dict[str, Tuple[str, Callable[[int], Any]]] = {
+    "posts": ("posts", str),
+    "generated_posts": ("post_history", int),
+}
+
+
+# Older layouts to read when a source's current file doesn't exist yet
+LEGACY_FILES: Dict[str, Tuple[str, Optional[str]]] = {
+    "content_vault": ("content_vault.json", "successful_posts"),
+}
+
+
+def iter_json_lines(path: Path) -> Iterator[Any]:
+    """Yield the records of a JSON Lines file one at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_records(path: Path, key: Optional[str] = None) -> Iterator[Any]:
+    """Stream records from a .jsonl log or a JSON array file."""
+    if path.suffix == ".jsonl":
+        return iter_json_lines(path)
+    return iter_json_array(path, key)
+
+
+def _insert_keyed(conn: sqlite3.Connection, statement: str, table: str,
+                  id_type: Callable[[int], Any], row: Tuple) -> str:
+    """Insert one keyed row; returns "migrated", "duplicate" (already there) or "rekeyed"."""
+    if row[0] is not None and conn.execute(statement, row).rowcount == 1:
+        return "migrated"
+    # Same content already stored (under this or an earlier assigned ID), e.g. a --restart
+    columns = [c.strip() for c in re.search(r"\(([^)]*)\)", statement).group(1).split(",")]
+    match = " AND ".join(f"{column} IS ?" for column in columns[1:])
+    if conn.execute(f"SELECT 1 FROM {table} WHERE {match} LIMIT 1", row[1:]).fetchone():
+        return "duplicate"
+    new_id = conn.execute(f"SELECT COALESCE(MAX(CAST(id AS INTEGER)), 0) + 1 FROM {table}").fetchone()[0]
+    conn.execute(statement.replace("INSERT OR IGNORE", "INSERT", 1), (id_type(new_id), *row[1:]))
+    return "rekeyed"
+
+
+def _progress(conn: sqlite3.Connection, source: str) -> Tuple[int, bool]:
+    row = conn.execute(
+        "SELECT records_done, completed FROM migration_progress WHERE source = ?", (source,)
+    ).fetchone()
+    return (row["records_done"], bool(row["completed"])) if row else (0, False)
+
+
+def _record_progress(conn: sqlite3.Connection, source: str, done: int, completed: bool) -> None:
+    conn.execute(
+        "INSERT INTO migration_progress (source, records_done, completed, updated_at) "
+        "VALUES (?, ?, ?, CURRENT_TIMESTAMP) "
+        "ON CONFLICT(source) DO UPDATE SET records_done = excluded.records_done, "
+        "completed = excluded.completed, updated_at = excluded.updated_at",
+        (source, done, completed),
+    )
+
+
+def migrate_source(conn: sqlite3.Connection, source: str, data_dir: Path,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   report: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Stream one JSON store into its table, resuming from saved progress."""
+    filename, key, statement, to_row = SOURCES[source]
+    path = data_dir / filename
+    if not path.exists() and source in LEGACY_FILES:
+        filename, key = LEGACY_FILES[source]
+        path = data_dir / filename
+    done, completed = _progress(conn, source)
+    result = {"source": source, "file": str(path), "migrated": 0, "skipped": done,
+              "duplicates": 0, "rekeyed": 0, "total": done, "seconds": 0.0, "records_per_second": 0.0}
+
+    if completed:
+        report(f"⏭  {source}: already migrated ({done} records)")
+        result["status"] = "already_completed"
+        return result
+    if not path.exists():
+        report(f"⏭  {source}: {filename} not found")
+        result["status"] = "missing"
+        return result
+
+    start = time.perf_counter()
+    batch: List[Tuple] = []
+    position = 0
+
+    def flush(final: bool) -> None:
+        outcomes = {"migrated": 0, "duplicates": 0, "rekeyed": 0}
+        with conn:  # one transaction per batch, progress included
+            if batch and source in KEYED_SOURCES:
+                for row in batch:
+                    outcome = _insert_keyed(conn, statement, *KEYED_SOURCES[source], row)
+                    outcomes["duplicates" if outcome == "duplicate" else outcome] += 1
+                outcomes["migrated"] += outcomes["rekeyed"]  # written, under a new ID
+            elif batch:
+                inserted = conn.executemany(statement, batch).rowcount
+                outcomes["migrated"] = inserted
+                outcomes["duplicates"] = len(batch) - inserted  # unique feeds, emails, vault entries
+            _record_progress(conn, source, position, final)
+        for name, count in outcomes.items():
+            result[name] += count
+        result["total"] = position
+        batch.clear()
+        elapsed = time.perf_counter() - start
+        rate = result["migrated"] / elapsed if elapsed > 0 else 0.0
+        report(f"   {source}: {position} records ({rate:,.0f} records/s)")
+
+    for item in iter_records(path, key):
+        position += 1
+        if position <= done:
+            continue  # committed by a previous run
+        batch.append(to_row(item))
+        if len(batch) >= batch_size:
+            flush(final=False)
+    flush(final=True)
+
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    if result["seconds"] > 0:
+        result["records_per_second"] = round(result["migrated"] / result["seconds"], 1)
+    result["status"] = "completed"
+    report(f"✅ {source}: {result['migrated']} migrated ({result['rekeyed']} re-keyed), "
+           f"{result['duplicates']} duplicates skipped, {done} resumed past in {result['seconds']:.2f}s")
+    return result
+
+
+def run_migration(sources: Optional[List[str]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                  restart: bool = False, database_url: Optional[str] = None,
+                  data_dir: Optional[Path] = None,
+                  report: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Migrate the selected JSON stores (all by default) into SQLite."""
+    sources = sources or list(SOURCES)
+    unknown = [s for s in sources if s not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown migration sources: {', '.join(unknown)}")
+    data_dir = Path(data_dir or persistence.DATA_DIR)
+
+    conn = persistence.get_db_connection(database_url)
+    try:
+        if restart:
+            with conn:
+                conn.executemany("DELETE FROM migration_progress WHERE source = ?",
+                                 [(s,) for s in sources])
+        report(f"🚚 Migrating {', '.join(sources)} into {persistence.get_database_path(database_url)}")
+        start = time.perf_counter()
+        results = [migrate_source(conn, s, data_dir, batch_size, report) for s in sources]
+    finally:
+        conn.close()
+
+    seconds = time.perf_counter() - start
+    migrated = sum(r["migrated"] for r in results)
+    duplicates = sum(r["duplicates"] for r in results)
+    rekeyed = sum(r["rekeyed"] for r in results)
+    report(f"🏁 {migrated} records in {seconds:.2f}s ({rekeyed} re-keyed, {duplicates} duplicates skipped)")
+    return {"sources": results, "migrated": migrated, "rekeyed": rekeyed, "duplicates": duplicates,
+            "seconds": round(seconds, 3)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Migrate JSON stores into SQLite.")
+    parser.add_argument("--sources", default=",".join(SOURCES),
+                        help="comma-separated subset of: " + ", ".join(SOURCES))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore saved progress and start over")
+    parser.add_argument("--db", default=None, help="sqlite:/// URL (defaults to DATABASE_URL)")
+    parser.add_argument("--data-dir", default=None, help="directory holding the JSON stores")
+    args = parser.parse_args(argv)
+
+    run_migration(
+        sources=[s.strip() for s in args.sources.split(",") if s.strip()],
+        batch_size=args.batch_size,
+        restart=args.restart,
+        database_url=args.db,
+        data_dir=Path(args.data_dir) if args.data_dir else None,
+    )
+
+
+if __name__ == "__main__":
+    main()
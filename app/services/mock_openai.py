@@ -0,0 +1,269 @@
+"""
+Deterministic OpenAI-compatible stand-in for offline load and latency tests.
+
+Serves POST /v1/chat/completions (plain and streamed, with ``n`` choices and
+token usage) and GET /v1/models. Latency, streaming speed and error rates
+are configurable; every random draw comes from a generator seeded with the
+configured seed and the request's sequence number, so a run can be replayed
+exactly.
+
+Point the generator at it with OPENAI_BASE_URL:
+
+    python -m app.services.mock_openai --port 8010 --latency lognormal:0.8,0.4 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 OPENAI_API_KEY=mock USE_OPENAI_GPT=true uvicorn app.main:app
+
+Latency specs: ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,SD``,
+``lognormal:MEDIAN,SIGMA`` and ``exponential:MEAN`` (seconds).
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .prompt_builder import estimate_tokens
+
+_SENTENCES = [
+    "For operations leaders, the real question is where this removes a manual handoff.",
+    "Small teams can pilot it on one workflow before committing budget.",
+    "The gains show up first in intake, routing and reporting work nobody enjoys.",
+    "Pair it with a clear owner and a two-week success metric.",
+    "Integration effort, not licence cost, is what decides the payback period.",
+    "Start where data is already clean and the process is already documented.",
+    "Which of your weekly reports could run itself by next quarter?",
+    "The teams seeing results treat AI as a process change, not a tool purchase.",
+]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec like ``lognormal:0.8,0.4`` into a sampler (seconds, never negative)."""
+    kind, _, raw = spec.partition(":")
+    args = [float(a) for a in raw.split(",") if a.strip()]
+    samplers = {
+        "fixed": (1, lambda rng, s: s),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "normal": (2, lambda rng, mean, sd: rng.gauss(mean, sd)),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if kind not in samplers or len(args) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec {spec!r}; expected one of: "
+                         "fixed:S, uniform:LOW,HIGH, normal:MEAN,SD, lognormal:MEDIAN,SIGMA, exponential:MEAN")
+    sample = samplers[kind][1]
+    return lambda rng: max(0.0, sample(rng, *args))
+
+
+@dataclass
+class MockLLMConfig:
+    """Behaviour of the mock; fields can be changed while the server runs."""
+
+    latency: str = "fixed:0"                  # time before the response (or first chunk)
+    token_delay: float = 0.0                  # seconds between streamed chunks
+    error_rate: float = 0.0                   # share of requests answered with an error
+    error_statuses: Tuple[int, ...] = (500, 503, 429)
+    seed: int = 0
+    reply: Optional[str] = None               # fixed reply text instead of a synthesized post
+    usage: Optional[Tuple[int, int]] = None   # fixed (prompt, completion) tokens instead of estimates
+
+
+def _synthesize_post(messages: List[Dict[str, Any]], rng: random.Random) -> str:
+    prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+    match = re.search(r"^Title: (.+)$", prompt, re.MULTILINE)
+    title = match.group(1).strip() if match else "This week's AI news"
+    body = rng.sample(_SENTENCES, k=rng.randint(3, 5))
+    return f"{title} is worth a closer look. " + " ".join(body)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    server: "MockOpenAIServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (timeout or cancellation)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": "mock-gpt", "object": "model", "created": 0, "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        index, rng = self.server.next_request(self.path, body, self.client_address[1])
+        config = self.server.config
+
+        delay = self.server.scripted(self.server.delays)
+        time.sleep(parse_latency(config.latency)(rng) if delay is None else delay)
+
+        status = self.server.scripted(self.server.errors)
+        if status is None and config.error_rate and rng.random() < config.error_rate:
+            status = rng.choice(config.error_statuses)
+        if status is not None:
+            self.server.count("errors")
+            self._send_json(status, {"error": {"message": f"mock error {status}", "type": "server_error"}},
+                            {"Retry-After": "1"} if status == 429 else None)
+            return
+
+        messages = body.get("messages", [])
+        n = max(1, int(body.get("n") or 1))
+        texts = [config.reply if config.reply is not None else _synthesize_post(messages, rng) for _ in range(n)]
+        max_words = int(body.get("max_tokens") or 0) * 3 // 4
+        if max_words:
+            texts = [" ".join(t.split(" ")[:max_words]) for t in texts]
+        if config.usage is not None:
+            prompt_tokens, completion_tokens = config.usage
+        else:
+            prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) + 4 for m in messages) + 3
+            completion_tokens = sum(estimate_tokens(t) for t in texts)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": f"chatcmpl-mock-{index}", "created": int(time.time()), "model": body.get("model", "mock-gpt")}
+
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            self._stream(base, texts, usage if include_usage else None)
+        else:
+            self._send_json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}
+                for i, text in enumerate(texts)]})
+
+    def _stream(self, base: Dict[str, Any], texts: List[str], usage: Optional[Dict[str, int]]) -> None:
+        """Server-sent events: one chunk per word per choice, then usage and [DONE]."""
+        events = []
+        for i, text in enumerate(texts):
+            words = text.split(" ")
+            events += [{**base, "object": "chat.completion.chunk", "choices": [
+                {"index": i, "finish_reason": None, "delta": {"content": w if j == 0 else " " + w}}]}
+                for j, w in enumerate(words)]
+            events.append({**base, "object": "chat.completion.chunk",
+                           "choices": [{"index": i, "finish_reason": "stop", "delta": {}}]})
+        if usage is not None:
+            events.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for data in [json.dumps(e) for e in events] + ["[DONE]"]:
+                frame = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(frame), frame))
+                self.wfile.flush()
+                if self.server.config.token_delay:
+                    time.sleep(self.server.config.token_delay)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """
+    The mock server. ``requests`` logs every chat request; ``delays`` and
+    ``errors`` are queues of scripted per-request latencies and HTTP
+    statuses that take precedence over the configured distributions.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockLLMConfig()
+        self.requests: List[Dict[str, Any]] = []
+        self.delays: List[float] = []
+        self.errors: List[int] = []
+        self.counters = {"requests": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_request(self, path: str, body: Dict[str, Any], client_port: int) -> Tuple[int, random.Random]:
+        with self._lock:
+            index = self.counters["requests"]
+            self.counters["requests"] += 1
+            self.requests.append({"path": path, "body": body, "client_port": client_port})
+        return index, random.Random(f"{self.config.seed}:{index}")
+
+    def scripted(self, queue: List[Any]) -> Any:
+        with self._lock:
+            return queue.pop(0) if queue else None
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", default="lognormal:0.8,0.4",
+                        help="latency distribution, e.g. fixed:0.5 or lognormal:0.8,0.4")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", default="500,503,429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reply", default=None, help="fixed reply text")
+    args = parser.parse_args(argv)
+
+    parse_latency(args.latency)  # fail fast on a bad spec
+    config = MockLLMConfig(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_statuses.split(",") if s.strip()),
+        seed=args.seed,
+        reply=args.reply,
+    )
+    server = MockOpenAIServer(config, args.host, args.port)
+    print(f"🧪 Mock OpenAI server on {server.base_url} (latency {config.latency}, "
+          f"error rate {config.error_rate:.0%}, seed {config.seed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Latency-budget model routing.
+
+The candidates are the configured models in preference order (best first),
+then the template generator. A request goes to the first model whose
+expected latency fits its latency budget. The expected latency is the
+model's recent p90, stretched by the queue ahead of the call: pool waiters
+plus rate limiter waiters, per pool slot. A model with too few recent
+observations is tried anyway so it can build a history (and a degraded
+model gets another chance once its bad samples age out). When no model
+fits, the request goes straight to templates instead of waiting out a
+timeout.
+"""
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .llm_client import generation_pool
+from .rate_limiter import rate_limiter
+
+# Preference order, best first; defaults to the single OPENAI_MODEL
+OPENAI_MODELS = [m.strip() for m in os.getenv("OPENAI_MODELS", os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")).split(",")
+                 if m.strip()]
+ROUTER_LATENCY_PERCENTILE = float(os.getenv("ROUTER_LATENCY_PERCENTILE", "90"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+# Observations older than this no longer count
+ROUTER_WINDOW_SECONDS = float(os.getenv("ROUTER_WINDOW_SECONDS", "300"))
+# Share of the budget a model's expected latency may use (the rest is margin)
+ROUTER_HEADROOM = float(os.getenv("ROUTER_HEADROOM", "0.8"))
+# The rate limiter queue lives in SQLite; route decisions re-read it at most this often
+ROUTER_QUEUE_DEPTH_TTL = float(os.getenv("ROUTER_QUEUE_DEPTH_TTL", "1.0"))
+
+_queue_depth_lock = threading.Lock()
+_queue_depth_reading: Tuple[float, int] = (float("-inf"), 0)
+
+
+def _rate_limit_queue_depth() -> int:
+    """rate_limiter.queue_depth(), cached for ROUTER_QUEUE_DEPTH_TTL seconds."""
+    global _queue_depth_reading
+    now = time.monotonic()
+    with _queue_depth_lock:
+        read_at, depth = _queue_depth_reading
+    if now - read_at < ROUTER_QUEUE_DEPTH_TTL:
+        return depth
+    depth = rate_limiter.queue_depth()
+    with _queue_depth_lock:
+        _queue_depth_reading = (now, depth)
+    return depth
+
+
+def current_load() -> float:
+    """Calls queued ahead of a new one, per pool slot."""
+    waiting = generation_pool.waiting + _rate_limit_queue_depth()
+    return waiting / max(1, generation_pool.max_concurrency)
+
+
+@dataclass
+class Route:
+    """Where one request goes; ``model`` None means the template generator."""
+
+    model: Optional[str]
+    reason: str
+    budget_seconds: float
+    expected_seconds: Optional[float] = None
+    load: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "target": self.model or "template",
+            "reason": self.reason,
+            "budget_seconds": round(self.budget_seconds, 3),
+            "expected_seconds": None if self.expected_seconds is None else round(self.expected_seconds, 3),
+            "load": round(self.load, 3),
+        }
+
+
+class ModelRouter:
+    def __init__(self, models: Optional[List[str]] = None,
+                 percentile: float = ROUTER_LATENCY_PERCENTILE,
+                 min_samples: int = ROUTER_MIN_SAMPLES,
+                 window_seconds: float = ROUTER_WINDOW_SECONDS,
+                 headroom: float = ROUTER_HEADROOM,
+                 load: Callable[[], float] = current_load):
+        self.models = list(models or OPENAI_MODELS)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self.headroom = headroom
+        self.load = load
+        self._samples: Dict[str, Deque[Tuple[float, float]]] = {m: deque(maxlen=200) for m in self.models}
+        self._lock = threading.Lock()
+        self.routes: Counter = Counter()
+
+    def observe(self, model: str, seconds: float) -> None:
+        """Record how long a call to ``model`` took (a timeout counts as the full budget)."""
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=200)).append((time.time(), seconds))
+
+    def _recent(self, model: str) -> List[float]:
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            return sorted(s for t, s in self._samples.get(model, ()) if t >= cutoff)
+
+    def latency(self, model: str) -> Optional[float]:
+        """Recent latency percentile for the model, or None without enough samples."""
+        samples = self._recent(model)
+        if len(samples) < self.min_samples:
+            return None
+        rank = math.ceil(self.percentile / 100 * len(samples))
+        return samples[min(len(samples), max(1, rank)) - 1]
+
+    def route(self, budget_seconds: float) -> Route:
+        try:
+            load = self.load()
+        except Exception as e:
+            print(f"Error reading generation load: {e}")
+            load = 0.0
+        skipped = []
+        for model in self.models:
+            observed = self.latency(model)
+            if observed is None:
+                route = Route(model, "no recent latency history", budget_seconds, None, load)
+                break
+            expected = observed * (1 + load)
+            if expected <= budget_seconds * self.headroom:
+                reason = "fits latency budget" if not skipped else f"fits latency budget; skipped {', '.join(skipped)}"
+                route = Route(model, reason, budget_seconds, expected, load)
+                break
+            skipped.append(f"{model} (~{expected:.1f}s)")
+        else:
+            route = Route(None, f"no model fits {budget_seconds:g}s budget: {', '.join(skipped)}",
+                          budget_seconds, None, load)
+        with self._lock:
+            self.routes[route.model or "template"] += 1
+        return route
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = dict(self.routes)
+        return {
+            "models": list(self.models),
+            "routes": routes,
+            f"p{self.percentile:g}_seconds": {m: self.latency(m) for m in self.models},
+        }
+
+
+model_router = ModelRouter()
@@ -4,43 +4,479 @@ Future-ready for migration to Supabase or SQLite.
 """
 import json
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List, Dict
+from typing import Any, Callable, List, Dict, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Define data directory path
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
+# SQLite database (only sqlite:/// URLs are supported without extra dependencies).
+# Defaults to data/trivance.db inside DATA_DIR.
+SCHEMA_PATH = Path(__file__).parent.parent.parent / "db" / "schema.sql"
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Upper bound for the parsed-JSON read cache, accounted by on-disk file size
+JSON_CACHE_MAX_BYTES = int(os.getenv("JSON_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+JSON_CACHE_ENABLED = os.getenv("JSON_CACHE_ENABLED", "true").lower() == "true"
+
+# JSON codec: "auto" prefers orjson, then msgspec, then the stdlib json module
+JSON_CODEC = os.getenv("JSON_CODEC", "auto").lower()
+# Write stores without indentation (smaller files, faster saves)
+JSON_COMPACT_STORAGE = os.getenv("JSON_COMPACT_STORAGE", "false").lower() == "true"
+
+# Seconds to wait for the cross-process lock around a store before giving up
+PERSISTENCE_LOCK_TIMEOUT = float(os.getenv("PERSISTENCE_LOCK_TIMEOUT", "10"))
+
+
+class JSONCodec:
+    """Stdlib JSON codec; base class for the optional fast backends."""
+
+    name = "json"
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        if compact:
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+        return text.encode("utf-8")
+
+    def loads(self, raw: Union[bytes, str]) -> Any:
+        return json.loads(raw)
+
+
+class OrjsonCodec(JSONCodec):
+    """Codec backed by orjson (optional dependency)."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        option = self._orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= self._orjson.OPT_INDENT_2
+        return self._orjson.dumps(data, option=option)
+
+    def loads(self, raw: Union[bytes, str]) -> Any:
+        return self._orjson.loads(raw)
+
+
+class MsgspecCodec(JSONCodec):
+    """Codec backed by msgspec (optional dependency)."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._format = msgspec.json.format
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        raw = self._encoder.encode(data)
+        return raw if compact else self._format(raw, indent=2)
+
+    def loads(self, raw: Union[bytes, str]) -> Any:
+        return self._decoder.decode(raw)
+
+
+_CODECS = {"orjson": OrjsonCodec, "msgspec": MsgspecCodec, "json": JSONCodec}
+
+
+def get_codec(name: str = JSON_CODEC) -> JSONCodec:
+    """Return the named codec, falling back to stdlib json if unavailable."""
+    candidates = ["orjson", "msgspec", "json"] if name == "auto" else [name, "json"]
+    for candidate in candidates:
+        try:
+            return _CODECS[candidate]()
+        except (ImportError, KeyError):
+            continue
+    return JSONCodec()
+
+
+codec = get_codec()
+
+
+class JSONReadCache:
+    """
+    Process-level cache of parsed JSON files keyed by absolute path.
+
+    Entries are revalidated against the file's mtime and size on every read,
+    so edits made by other processes are picked up. Writes going through
+    this module invalidate the entry immediately. Memory is accounted by the
+    on-disk size of each cached file and bounded with LRU eviction.
+
+    Cached values are shared between callers: treat them as read-only and
+    copy before mutating.
+    """
+
+    def __init__(self, max_bytes: int = JSON_CACHE_MAX_BYTES, enabled: bool = JSON_CACHE_ENABLED):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _signature(stat: os.stat_result) -> Tuple[int, int, int]:
+        # Writes replace the file atomically, so the inode changes on every save
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path: Path) -> Tuple[bool, Any]:
+        """Return (hit, value) for path if the cached entry is still fresh."""
+        if not self.enabled:
+            return False, None
+        key = str(path)
+        try:
+            signature = self._signature(os.stat(key))
+        except OSError:
+            self.invalidate(path)
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            if entry is not None:
+                self._drop(key)
+                self.invalidations += 1
+            self.misses += 1
+        return False, None
+
+    def put(self, path: Path, signature: Tuple[int, int, int], value: Any) -> None:
+        """Cache a parsed value for path as read at the given signature."""
+        if not self.enabled:
+            return
+        key = str(path)
+        size = signature[2]
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (signature, size, value)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, path: Path) -> None:
+        """Drop the cached entry for path, if any."""
+        key = str(path)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+read_cache = JSONReadCache()
+
+
+class LockTimeoutError(TimeoutError):
+    """Raised when a store's file lock can't be acquired in time."""
+
+
+class _LockStats:
+    """Wait-time accounting for store locks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, acquired: bool) -> None:
+        with self._lock:
+            if acquired:
+                self.acquisitions += 1
+            else:
+                self.timeouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.acquisitions + self.timeouts
+            return {
+                "timeout_seconds": PERSISTENCE_LOCK_TIMEOUT,
+                "acquisitions": self.acquisitions,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": round(self.total_wait, 6),
+                "avg_wait_seconds": round(self.total_wait / attempts, 6) if attempts else 0.0,
+                "max_wait_seconds": round(self.max_wait, 6),
+            }
+
+
+lock_stats = _LockStats()
+
+# Per-path thread locks (reentrant) and the OS lock held by the outermost owner
+_thread_locks: Dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+def _try_os_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _release_os_lock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: Union[str, Path], timeout: Optional[float] = None):
+    """
+    Hold an exclusive advisory lock on path across threads and processes.
+
+    The lock lives on a ``<path>.lock`` sidecar so the data file itself can
+    be replaced atomically. Re-entrant within a thread.
+    """
+    key = str(Path(path).resolve())
+    timeout = PERSISTENCE_LOCK_TIMEOUT if timeout is None else timeout
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.RLock())
+
+    held = getattr(_held, "locks", None)
+    if held is None:
+        held = _held.locks = {}
+    if key in held:
+        with thread_lock:
+            held[key][1] += 1
+            try:
+                yield
+            finally:
+                held[key][1] -= 1
+        return
+
+    start = time.monotonic()
+    if not thread_lock.acquire(timeout=timeout):
+        lock_stats.record(time.monotonic() - start, acquired=False)
+        raise LockTimeoutError(f"Timed out waiting for lock on {key}")
+    fd = None
+    try:
+        fd = os.open(key + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        while not _try_os_lock(fd):
+            if time.monotonic() - start >= timeout:
+                lock_stats.record(time.monotonic() - start, acquired=False)
+                raise LockTimeoutError(f"Timed out waiting for lock on {key}")
+            time.sleep(0.005)
+        lock_stats.record(time.monotonic() - start, acquired=True)
+        held[key] = [fd, 1]
+        try:
+            yield
+        finally:
+            del held[key]
+            _release_os_lock(fd)
+    finally:
+        if fd is not None:
+            os.close(fd)
+        thread_lock.release()
+
+
+def read_json_file(path: Union[str, Path], default: Any = None, use_cache: bool = True) -> Any:
+    """
+    Load a JSON file by path through the read cache.
+
+    Raises on parse errors so callers can decide how to recover; a missing
+    file returns default. Read-modify-write callers pass use_cache=False to
+    get a private copy straight from disk.
+    """
+    full_path = Path(path).resolve()
+    if use_cache:
+        hit, value = read_cache.get(full_path)
+        if hit:
+            return value
+    if not full_path.exists():
+        return default
+    with open(full_path, 'rb') as f:
+        signature = JSONReadCache._signature(os.fstat(f.fileno()))
+        value = codec.loads(f.read())
+    if use_cache:
+        read_cache.put(full_path, signature, value)
+    return value
+
+
+# Read once: os.umask() can only be queried by setting it, which isn't thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(path: Path) -> int:
+    """The existing file's permission bits, or 0666 less the umask for a new file."""
+    try:
+        return os.stat(path).st_mode & 0o777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def write_file_atomic(path: Union[str, Path], payload: bytes) -> None:
+    """
+    Replace a file's contents under its file lock. The file is swapped in
+    atomically so unlocked readers never see a partial write.
+    """
+    full_path = Path(path).resolve()
+    with file_lock(full_path):
+        fd, tmp_path = tempfile.mkstemp(dir=full_path.parent, prefix=full_path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            # mkstemp creates 0600; keep the mode other readers (dashboard, backups) rely on
+            os.chmod(tmp_path, _file_mode(full_path))
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            read_cache.invalidate(full_path)
+
+
+def write_json_file(path: Union[str, Path], data: Any) -> None:
+    """Write a JSON file by path and invalidate its read cache entry."""
+    write_file_atomic(path, codec.dumps(data, compact=JSON_COMPACT_STORAGE))
+
+
+def update_json_file(path: Union[str, Path], mutator: Callable[[Any], Any], default: Any = None) -> Any:
+    """
+    Locked read-modify-write of a JSON file.
+
+    mutator receives a private copy of the current contents (or default) and
+    returns the new contents; returning None keeps the in-place changes.
+    The new contents are returned.
+    """
+    full_path = Path(path).resolve()
+    with file_lock(full_path):
+        data = read_json_file(full_path, default, use_cache=False)
+        result = mutator(data)
+        if result is not None:
+            data = result
+        write_json_file(full_path, data)
+        return data
+
+
+def get_read_cache_stats() -> Dict[str, Any]:
+    """Hit-rate and memory accounting for the JSON read cache."""
+    return read_cache.stats()
+
+
+def get_lock_stats() -> Dict[str, Any]:
+    """Lock acquisition counts and wait times for store mutations."""
+    return lock_stats.stats()
+
+
 def save_json(filepath: str, data: Any) -> None:
     """Save data to JSON file with proper error handling."""
     try:
-        full_path = DATA_DIR / filepath
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        write_json_file(DATA_DIR / filepath, data)
     except Exception as e:
         print(f"Error saving to {filepath}: {e}")
 
 def load_json(filepath: str, default: Any = None) -> Any:
-    """Load data from JSON file with fallback to default."""
+    """
+    Load data from JSON file with fallback to default.
+
+    Results are served from the read cache while the file is unchanged, so
+    the returned value must not be mutated in place.
+    """
+    fallback = default if default is not None else []
     try:
-        full_path = DATA_DIR / filepath
-        if full_path.exists():
-            with open(full_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return default if default is not None else []
+        data = read_json_file(DATA_DIR / filepath, None)
+        return fallback if data is None else data
     except Exception as e:
         print(f"Error loading from {filepath}: {e}")
-        return default if default is not None else []
+        return fallback
+
+def update_json(filepath: str, mutator: Callable[[Any], Any], default: Any = None) -> Any:
+    """Locked read-modify-write of a file in the data directory."""
+    return update_json_file(DATA_DIR / filepath, mutator, [] if default is None else default)
 
 def append_to_json(filepath: str, new_item: Dict) -> None:
     """Append new item to JSON array file."""
     try:
-        data = load_json(filepath, [])
-        data.append(new_item)
-        save_json(filepath, data)
+        update_json(filepath, lambda data: data + [new_item], [])
     except Exception as e:
         print(f"Error appending to {filepath}: {e}")
 
+def get_database_path(url: Optional[str] = None) -> Path:
+    """Resolve a sqlite:/// URL; relative paths are resolved from the project root."""
+    url = url or DATABASE_URL
+    if not url:
+        return DATA_DIR / "trivance.db"
+    if not url.startswith("sqlite:///"):
+        raise ValueError(f"Unsupported DATABASE_URL (expected sqlite:///...): {url}")
+    path = Path(url[len("sqlite:///"):])
+    if not path.is_absolute():
+        path = SCHEMA_PATH.parent.parent / path
+    return path
+
+def get_db_connection(url: Optional[str] = None) -> sqlite3.Connection:
+    """Open the SQLite database and make sure the schema exists."""
+    path = get_database_path(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=PERSISTENCE_LOCK_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    return conn
+
 # Future-ready database integration stubs
 class DatabaseInterface:
     """
@@ -0,0 +1,268 @@
+"""
+Indexed post repository on top of the JSON stores.
+
+Keeps a by-ID index and a timestamp index in memory so lookups, deletes
+and "most recent N" queries don't scan or sort the full history. IDs come
+from a monotonic allocator whose high-water mark is persisted separately,
+so they stay unique across concurrent saves and are never reused after a
+delete.
+"""
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import persistence
+from .persistence import file_lock, load_json, update_json, write_json_file
+
+# Persisted high-water marks for every repository, keyed by store filename
+ID_ALLOCATOR_FILE = "post_ids.json"
+
+
+def normalize_timestamp(value: Any) -> float:
+    """Convert unix or ISO-8601 timestamps to a sortable float."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+class IDAllocator:
+    """Monotonic integer IDs per store, persisted in ``post_ids.json``."""
+
+    def __init__(self, filename: str = ID_ALLOCATOR_FILE):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def allocate(self, store: str, floor: int = 0) -> int:
+        """Return the next ID for store, never lower than floor + 1."""
+        allocated = {}
+
+        def bump(marks: Dict[str, int]) -> Dict[str, int]:
+            allocated["id"] = max(int(marks.get(store, 0)), floor) + 1
+            marks[store] = allocated["id"]
+            return marks
+
+        with self._lock:
+            update_json(self.filename, bump, {})
+            return allocated["id"]
+
+
+id_allocator = IDAllocator()
+
+
+class PostRepository:
+    """
+    Post store backed by one JSON array file.
+
+    Indexes are rebuilt only when the file changes underneath us (another
+    process or a manual edit); writes made through the repository update
+    them in place. Mutations hold the store's file lock, so several workers
+    can write to the same file without losing updates.
+    """
+
+    def __init__(self, filename: str, timestamp_field: str = "timestamp",
+                 allocator: IDAllocator = id_allocator):
+        self.filename = filename
+        self.timestamp_field = timestamp_field
+        self.allocator = allocator
+        self._lock = threading.RLock()
+        self._signature: Optional[Tuple[str, int, int, int]] = None
+        self._by_id: Dict[Any, Dict] = {}
+        self._ts_keys: List[float] = []
+        self._ts_ids: List[Any] = []
+        self._stale = 0
+        self._max_int_id = 0
+
+    # -- index maintenance -------------------------------------------------
+
+    @property
+    def path(self):
+        return persistence.DATA_DIR / self.filename
+
+    def _file_signature(self) -> Optional[Tuple[str, int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (str(self.path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self) -> None:
+        """Rebuild indexes if the backing file changed since we last saw it."""
+        signature = self._file_signature()
+        if signature == self._signature and (signature is not None or not self._by_id):
+            return
+        posts = load_json(self.filename, [])
+        if self._needs_rekey(posts):
+            with file_lock(self.path):
+                posts = self._rekey(load_json(self.filename, []))
+                signature = self._file_signature()
+        self._by_id = {}
+        self._max_int_id = 0
+        entries = []
+        for post in posts:
+            post_id = post.get("id")
+            self._by_id[post_id] = post
+            self._track_int_id(post_id)
+            entries.append((normalize_timestamp(post.get(self.timestamp_field)), post_id))
+        entries.sort(key=lambda entry: entry[0])
+        self._ts_keys = [ts for ts, _ in entries]
+        self._ts_ids = [post_id for _, post_id in entries]
+        self._stale = 0
+        self._signature = signature
+
+    @staticmethod
+    def _needs_rekey(posts: List[Dict]) -> bool:
+        ids = [post.get("id") for post in posts]
+        return None in ids or len(set(ids)) != len(ids)
+
+    def _rekey(self, posts: List[Dict]) -> List[Dict]:
+        """
+        Give rows without an ID, or sharing one with an earlier row, a fresh
+        ID and persist them, so keying the index by ID can't drop any.
+        Caller holds the file lock.
+        """
+        if not self._needs_rekey(posts):
+            return posts
+        floor = max([p["id"] for p in posts if isinstance(p.get("id"), int)], default=0)
+        seen = set()
+        repaired = []
+        rekeyed = 0
+        for post in posts:
+            post_id = post.get("id")
+            if post_id is None or post_id in seen:
+                rekeyed += 1
+                new_id = self.allocator.allocate(self.filename, floor=floor)
+                post = {**post, "id": new_id}
+                if post_id is not None:
+                    post["previous_id"] = post_id
+                post_id = new_id
+            seen.add(post_id)
+            repaired.append(post)
+        print(f"Re-keyed {rekeyed} posts with missing or duplicate IDs in {self.filename}")
+        write_json_file(self.path, repaired)
+        return repaired
+
+    def _track_int_id(self, post_id: Any) -> None:
+        if isinstance(post_id, int) and post_id > self._max_int_id:
+            self._max_int_id = post_id
+
+    def _persist(self) -> None:
+        write_json_file(self.path, list(self._by_id.values()))
+        self._signature = self._file_signature()
+
+    def _compact_if_needed(self) -> None:
+        # Deletes leave tombstones in the timestamp index; drop them lazily
+        if self._stale > 64 and self._stale * 2 > len(self._ts_ids):
+            live = [(ts, pid) for ts, pid in zip(self._ts_keys, self._ts_ids) if pid in self._by_id]
+            self._ts_keys = [ts for ts, _ in live]
+            self._ts_ids = [pid for _, pid in live]
+            self._stale = 0
+
+    def _resolve_id(self, post_id: Any) -> Any:
+        """Accept numeric IDs passed as strings (path/query parameters)."""
+        if post_id in self._by_id:
+            return post_id
+        if isinstance(post_id, str) and post_id.isdigit() and int(post_id) in self._by_id:
+            return int(post_id)
+        return post_id
+
+    # -- public API --------------------------------------------------------
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self.allocator.allocate(self.filename, floor=self._max_int_id)
+
+    def add(self, post: Dict) -> Dict:
+        """Assign a stable ID (unless one is set) and persist the post."""
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            if post.get("id") is None:
+                post = {**post, "id": self.allocator.allocate(self.filename, floor=self._max_int_id)}
+            post_id = post["id"]
+            if post_id in self._by_id:
+                self._stale += 1
+            self._by_id[post_id] = post
+            self._track_int_id(post_id)
+            ts = normalize_timestamp(post.get(self.timestamp_field))
+            index = bisect_right(self._ts_keys, ts)
+            self._ts_keys.insert(index, ts)
+            self._ts_ids.insert(index, post_id)
+            self._persist()
+            return post
+
+    def get(self, post_id: Any) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(self._resolve_id(post_id))
+
+    def delete(self, post_id: Any) -> bool:
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            post_id = self._resolve_id(post_id)
+            if post_id not in self._by_id:
+                return False
+            del self._by_id[post_id]
+            self._stale += 1
+            self._compact_if_needed()
+            self._persist()
+            return True
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._by_id)
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            self._refresh()
+            return list(self._by_id.values())
+
+    def _iter_newest(self, lo: int, hi: int) -> Iterable[Dict]:
+        seen = set()
+        for i in range(hi - 1, lo - 1, -1):
+            post_id = self._ts_ids[i]
+            post = self._by_id.get(post_id)
+            if post is None or post_id in seen:
+                continue
+            # A re-added ID leaves its old timestamp entry behind; skip it
+            if normalize_timestamp(post.get(self.timestamp_field)) != self._ts_keys[i]:
+                continue
+            seen.add(post_id)
+            yield post
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        """Newest posts first, without sorting the full history."""
+        with self._lock:
+            self._refresh()
+            result = []
+            for post in self._iter_newest(0, len(self._ts_ids)):
+                if len(result) >= limit:
+                    break
+                result.append(post)
+            return result
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Posts with start <= timestamp <= end, newest first."""
+        with self._lock:
+            self._refresh()
+            lo = 0 if start is None else bisect_left(self._ts_keys, start)
+            hi = len(self._ts_keys) if end is None else bisect_right(self._ts_keys, end)
+            result = []
+            for post in self._iter_newest(lo, hi):
+                if limit is not None and len(result) >= limit:
+                    break
+                result.append(post)
+            return result
+
+
+# Repositories for the two post stores
+posts_repository = PostRepository("posts.json")
+history_repository = PostRepository("generated_posts.json")
@@ -2,13 +2,13 @@
 Posts service for managing generated posts with persistence.
 """
 from datetime import datetime
-from typing import Dict, List
-from .persistence import save_json, load_json, append_to_json
+from typing import Dict, List, Optional
+from .post_store import posts_repository
+from .retention import find_archived, query_archive
 
 def save_generated_post(title: str, summary: str, source: str, link: str, generated_content: str) -> Dict:
     """Save a generated post to persistent storage."""
     post_data = {
-        "id": datetime.now().isoformat(),
         "title": title,
         "summary": summary,
         "source": source,
@@ -18,39 +18,54 @@ def save_generated_post(title: str, summary: str, source: str, link: str, genera
         "timestamp": datetime.now().timestamp()
     }
     
-    append_to_json("posts.json", post_data)
+    post_data = posts_repository.add(post_data)
     return {"message": "Post saved successfully", "post_id": post_data["id"]}
 
+def upgrade_generated_post(post_id, generated_content: str, **fields) -> bool:
+    """Replace a saved post's content in place (same ID); False if the post is gone."""
+    post = posts_repository.get(post_id)
+    if post is None:
+        return False
+    posts_repository.add({**post, **fields, "generated_content": generated_content,
+                          "upgraded_at": datetime.now().isoformat()})
+    return True
+
 def get_all_posts() -> List[Dict]:
     """Retrieve all generated posts from storage."""
-    return load_json("posts.json", [])
+    return posts_repository.all()
+
+def get_post(post_id) -> Optional[Dict]:
+    """Look up a single post by ID, falling back to the archive."""
+    post = posts_repository.get(post_id)
+    if post is None:
+        post = find_archived("posts", post_id)
+    return post
 
-def get_recent_posts(limit: int = 10) -> List[Dict]:
+def get_recent_posts(limit: int = 10, include_archived: bool = False) -> List[Dict]:
     """Get the most recent posts, limited by count."""
-    posts = get_all_posts()
-    # Sort by timestamp descending and limit
-    sorted_posts = sorted(posts, key=lambda x: x.get("timestamp", 0), reverse=True)
-    return sorted_posts[:limit]
+    posts = posts_repository.recent(limit)
+    if include_archived and len(posts) < limit:
+        # Archived posts are always older than the hot store
+        posts = posts + query_archive("posts", limit=limit - len(posts))
+    return posts
 
 def delete_post(post_id: str) -> Dict:
     """Delete a post by ID."""
-    posts = get_all_posts()
-    updated_posts = [p for p in posts if p.get("id") != post_id]
-    
-    if len(updated_posts) == len(posts):
+    if not posts_repository.delete(post_id):
         return {"message": "Post not found", "success": False}
     
-    save_json("posts.json", updated_posts)
     return {"message": "Post deleted successfully", "success": True}
 
-# Future database integration methods
-def migrate_posts_to_db():
+# Database integration
+def migrate_posts_to_db(batch_size: int = 500, restart: bool = False) -> Dict:
     """
-    Future: Migrate existing JSON posts to database.
-    This function would:
-    1. Load all posts from posts.json
-    2. Insert them into database tables
-    3. Handle any data transformation needed
-    4. Backup JSON file before migration
+    Migrate the JSON post stores (posts.json, generated_posts.json and the
+    content vault) into the SQLite database. The JSON files are left in
+    place as a backup. See app/services/migration.py for the full tool.
     """
-    pass
+    from .migration import run_migration
+    return run_migration(
+        sources=["posts", "generated_posts", "content_vault"],
+        batch_size=batch_size,
+        restart=restart,
+    )
@@ -0,0 +1,217 @@
+"""
+Prompt assembly with local token estimates and per-platform budgets.
+
+The instruction block never changes between calls and is sent first (as
+the system message), so the prompt prefix stays byte-identical and
+provider-side prefix caching can apply. Everything article-specific goes
+in the user message after it. When the estimate exceeds the platform's
+budget the summary is compressed extractively (key sentences only), then
+cut to fit as a last resort.
+"""
+import html
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+SYSTEM_PROMPT = (
+    "You are a strategic, human-sounding content writer for Trivance AI. You write posts that are "
+    "specific, business-relevant, and NEVER use clichés like 'consider this' or 'smart businesses recognize.'\n"
+    "\n"
+    "Trivance AI is a consultancy that helps small and mid-sized companies apply AI in practical, "
+    "high-leverage ways.\n"
+    "\n"
+    "**You MUST avoid** generic phrases like:\n"
+    "- “Consider this:”\n"
+    "- “Smart businesses recognize”\n"
+    "- “Here's what's interesting:”\n"
+    "These sound templated and generic. Do not use them.\n"
+    "\n"
+    "Instead:\n"
+    "- Reference specific features, technologies, or business problems from the article\n"
+    "- Explain where this tool could fit into a small/mid-sized org (e.g., HR, logistics, IT ops)\n"
+    "- Write like you’re speaking to a COO or Director of Ops — smart and time-conscious\n"
+    "- Keep the Trivance tone: clear, consultative, and outcome-driven\n"
+    "\n"
+    "Structure:\n"
+    "1. Hook (clear, relevant to the headline)\n"
+    "2. Specific insight (e.g. what this enables)\n"
+    "3. Strategic framing (why it matters, where it fits)\n"
+    "4. Soft CTA or reflection\n"
+    "\n"
+    "Final Reminder: Write like a strategist, not a marketer."
+)
+
+PLATFORM_NOTES = {
+    "LinkedIn": "Include hashtags at the end.",
+    "Email": "No hashtags. Use subject line style tone.",
+    "X": "Post must be under 280 characters. Short, bold, and direct.",
+}
+
+# Styles without a template of their own (e.g. "consultative") use this one
+DEFAULT_STYLE = "trivance_default"
+
+# Prompt (input) token budgets per platform, including the system message
+DEFAULT_PROMPT_BUDGETS = {"LinkedIn": 600, "Email": 650, "X": 450}
+PROMPT_BUDGETS = {
+    platform: int(os.getenv(f"PROMPT_TOKEN_BUDGET_{platform.upper()}", str(budget)))
+    for platform, budget in DEFAULT_PROMPT_BUDGETS.items()
+}
+
+# Chat formatting overhead: per message, plus the reply primer
+_MESSAGE_OVERHEAD = 4
+_REPLY_OVERHEAD = 3
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for text: exact with tiktoken installed, otherwise a close local estimate."""
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    # ~4 characters per token for English prose; long words split into more pieces
+    words = len(text.split())
+    return max(math.ceil(len(text) / 4), math.ceil(words * 4 / 3))
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(m["content"]) + _MESSAGE_OVERHEAD for m in messages) + _REPLY_OVERHEAD
+
+
+def style_key(post_style: Optional[str]) -> str:
+    """The STYLE_EXAMPLES key for a style as the UI or API sends it ("Trivance Default" -> "trivance_default")."""
+    return re.sub(r"[\s-]+", "_", (post_style or "").strip().lower())
+
+
+def _sentences(text: str) -> List[str]:
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+
+@dataclass
+class PromptPlan:
+    """The messages to send plus how they were fitted to the budget."""
+
+    messages: List[Dict[str, str]]
+    insights: List[str]
+    estimated_tokens: int
+    budget: int
+    summary_strategy: str = "full"           # full | extractive | truncated
+    original_tokens: int = 0
+
+    @property
+    def prompt(self) -> str:
+        return self.messages[-1]["content"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "estimated_tokens": self.estimated_tokens,
+            "original_tokens": self.original_tokens,
+            "budget": self.budget,
+            "summary_strategy": self.summary_strategy,
+        }
+
+
+class PromptBuilder:
+    """Builds budgeted chat prompts; ``extract_insights`` picks the key sentences of a summary."""
+
+    def __init__(self, extract_insights: Callable[[str], List[str]],
+                 budgets: Optional[Dict[str, int]] = None, system_prompt: str = SYSTEM_PROMPT):
+        self.extract_insights = extract_insights
+        self.budgets = dict(PROMPT_BUDGETS if budgets is None else budgets)
+        self.system_prompt = system_prompt
+
+    def budget_for(self, platform: str) -> int:
+        return self.budgets.get(platform, self.budgets.get("LinkedIn", DEFAULT_PROMPT_BUDGETS["LinkedIn"]))
+
+    @staticmethod
+    def _task(post_style: str, platform: str) -> List[str]:
+        note = PLATFORM_NOTES.get(platform, PLATFORM_NOTES["LinkedIn"])
+        return [f"Create an engaging {platform} post about this article using a {post_style} tone. {note}"]
+
+    @staticmethod
+    def _fanout_task(post_style: str, platforms: List[str]) -> List[str]:
+        lines = [f"Create one post per platform about this article using a {post_style} tone:"]
+        lines += [f"- {p}: {PLATFORM_NOTES.get(p, PLATFORM_NOTES['LinkedIn'])}" for p in platforms]
+        keys = ", ".join(f'"{p}"' for p in platforms)
+        lines.append(f"Reply with only a JSON object with the keys {keys}, each holding that platform's post text.")
+        return lines
+
+    def _user_prompt(self, task: List[str], title: str, source: str, link: str, summary: str,
+                     insights: List[str]) -> str:
+        lines = task + [
+            "",
+            "Article Details:",
+            f"Title: {title}",
+            f"Source: {source}",
+            f"Link: {link}",
+            f"Summary: {summary}",
+        ]
+        if insights:
+            lines += ["", f"Key insights to optionally reference: {insights}"]
+        return "\n".join(lines)
+
+    def _messages(self, user_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def build(self, article, post_style: str = "trivance_default", platform: str = "LinkedIn") -> PromptPlan:
+        return self._fit(article, self._task(post_style, platform), self.budget_for(platform))
+
+    def build_fanout(self, article, post_style: str, platforms: List[str]) -> PromptPlan:
+        """One prompt asking for every platform's post as a JSON object; budgeted like the largest platform."""
+        budget = max(self.budget_for(p) for p in platforms)
+        return self._fit(article, self._fanout_task(post_style, platforms), budget)
+
+    def _fit(self, article, task: List[str], budget: int) -> PromptPlan:
+        title = html.unescape(article.title) if article.title else ""
+        summary = html.unescape(article.summary) if article.summary else ""
+        source = (article.source or "").strip() or "RSS Feeds"
+        link = article.link or ""
+        insights = self.extract_insights(summary)
+
+        def plan(summary_text: str, insight_list: List[str], strategy: str) -> PromptPlan:
+            messages = self._messages(self._user_prompt(task, title, source, link, summary_text,
+                                                        insight_list))
+            return PromptPlan(messages, insights, estimate_message_tokens(messages), budget, strategy)
+
+        result = plan(summary, insights, "full")
+        original = result.estimated_tokens
+        if result.estimated_tokens > budget:
+            # Extractive: the key sentences become the summary; a separate insights list would repeat them
+            key_sentences = [i.split(": ", 1)[-1] for i in insights]
+            for keep in range(len(key_sentences), 0, -1):
+                result = plan(" ".join(key_sentences[:keep]), [], "extractive")
+                if result.estimated_tokens <= budget:
+                    break
+        if result.estimated_tokens > budget:
+            # Last resort: whole sentences of the summary, then words, until it fits
+            without_summary = plan("", [], "truncated").estimated_tokens
+            room = max(0, budget - without_summary)
+            kept: List[str] = []
+            for sentence in _sentences(summary):
+                if estimate_tokens(" ".join(kept + [sentence])) > room:
+                    break
+                kept.append(sentence)
+            text = " ".join(kept)
+            if not text:
+                words = summary.split()
+                while words and estimate_tokens(" ".join(words)) > room:
+                    words = words[: max(0, len(words) - max(1, len(words) // 8))]
+                text = " ".join(words)
+            result = plan(text, [], "truncated")
+
+        result.original_tokens = original
+        return result
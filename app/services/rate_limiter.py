@@ -0,0 +1,257 @@
+"""
+Client-side rate limiting for OpenAI requests and tokens.
+
+Two token buckets - requests per minute and tokens per minute - are kept in
+a small SQLite database under data/, so every worker process draws from the
+same budget. Callers take a ticket in a shared FIFO queue; a ticket may
+only take capacity when there is enough left for every ticket ahead of it
+too, so waiting requests are served in arrival order across processes
+instead of whichever polls first. Tickets of
+processes that died are dropped once their heartbeat goes stale.
+
+Each request is charged its estimated prompt tokens plus max_tokens, which
+is how the provider counts it against the TPM limit.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import persistence
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+RATE_LIMIT_DB = "rate_limits.db"
+
+# Seconds without a heartbeat before a queued ticket is considered abandoned
+TICKET_STALE_SECONDS = 30.0
+MAX_POLL_INTERVAL = 0.25
+MIN_POLL_INTERVAL = 0.02
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_waiters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pid INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+
+class RateLimiter:
+    """Shared RPM/TPM token buckets with a fair cross-process queue."""
+
+    def __init__(self, rpm: int = OPENAI_RPM_LIMIT, tpm: int = OPENAI_TPM_LIMIT,
+                 enabled: bool = RATE_LIMIT_ENABLED, db_path: Optional[Path] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.enabled = enabled and (rpm > 0 or tpm > 0)
+        self._db_path = db_path
+        self._initialized: Optional[Path] = None
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path or persistence.DATA_DIR / RATE_LIMIT_DB
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.db_path
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        if self._initialized != path:
+            with self._lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._initialized = path
+        return conn
+
+    def _limits(self) -> Dict[str, int]:
+        return {name: limit for name, limit in (("requests", self.rpm), ("tokens", self.tpm)) if limit > 0}
+
+    def _refill(self, conn: sqlite3.Connection, now: float) -> Dict[str, float]:
+        levels = {}
+        for name, limit in self._limits().items():
+            row = conn.execute("SELECT level, updated_at FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                level = float(limit)
+            else:
+                level = min(float(limit), row[0] + max(0.0, now - row[1]) * limit / 60.0)
+            conn.execute(
+                "INSERT INTO rate_buckets (name, level, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated_at = excluded.updated_at",
+                (name, level, now),
+            )
+            levels[name] = level
+        return levels
+
+    def _charge(self, tokens: int) -> int:
+        # A request can never need more than a full bucket, or it would wait forever
+        return min(tokens, self.tpm) if self.tpm > 0 else 0
+
+    def _enqueue(self, tokens: int) -> int:
+        conn = self._connect()
+        try:
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO rate_waiters (pid, tokens, enqueued_at, heartbeat) VALUES (?, ?, ?, ?)",
+                (os.getpid(), self._charge(tokens), now, now),
+            )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def _dequeue(self, ticket: int) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM rate_waiters WHERE id = ?", (ticket,))
+        finally:
+            conn.close()
+
+    def _try_acquire(self, ticket: int, tokens: int) -> float:
+        """
+        Take capacity for ``ticket`` if what is left also covers every ticket
+        queued ahead of it. Returns 0 when granted, else seconds to wait.
+        """
+        wanted = {"requests": 1, "tokens": self._charge(tokens)}
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute("DELETE FROM rate_waiters WHERE heartbeat < ? AND id != ?",
+                         (now - TICKET_STALE_SECONDS, ticket))
+            if conn.execute("UPDATE rate_waiters SET heartbeat = ? WHERE id = ?", (now, ticket)).rowcount == 0:
+                # Our ticket was dropped as stale (e.g. the process was suspended); restore it
+                conn.execute(
+                    "INSERT INTO rate_waiters (id, pid, tokens, enqueued_at, heartbeat) VALUES (?, ?, ?, ?, ?)",
+                    (ticket, os.getpid(), wanted["tokens"], now, now),
+                )
+            ahead_requests, ahead_tokens = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM rate_waiters WHERE id < ?", (ticket,)
+            ).fetchone()
+            needed = {"requests": ahead_requests + 1, "tokens": ahead_tokens + wanted["tokens"]}
+            levels = self._refill(conn, now)
+
+            limits = self._limits()
+            wait = max((needed[name] - level) * 60.0 / limits[name] for name, level in levels.items())
+            if wait <= 0:
+                for name in levels:
+                    conn.execute("UPDATE rate_buckets SET level = level - ? WHERE name = ?",
+                                 (wanted[name], name))
+                conn.execute("DELETE FROM rate_waiters WHERE id = ?", (ticket,))
+                conn.execute("COMMIT")
+                return 0.0
+            conn.execute("COMMIT")
+            return max(MIN_POLL_INTERVAL, min(wait, MAX_POLL_INTERVAL))
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _record(self, waited: float, queued: bool) -> None:
+        with self._lock:
+            self.granted += 1
+            if queued:
+                self.waited += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """Block until one request and ``tokens`` tokens are available; returns seconds waited."""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        ticket = self._enqueue(tokens)
+        queued = False
+        try:
+            while True:
+                delay = self._try_acquire(ticket, tokens)
+                if delay == 0:
+                    waited = time.monotonic() - started
+                    self._record(waited, queued)
+                    return waited
+                if timeout is not None and time.monotonic() - started + delay > timeout:
+                    raise TimeoutError(f"rate limiter queue wait exceeded {timeout:g}s")
+                queued = True
+                time.sleep(delay)
+        finally:
+            self._dequeue(ticket)
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        ``acquire`` for coroutines; cancelling the caller leaves the queue.
+        The SQLite work runs in worker threads: a busy database (another
+        process holding the write lock) must not stall the event loop and
+        every other generation on it.
+        """
+        if not self.enabled:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        enqueue = loop.run_in_executor(None, self._enqueue, tokens)
+        try:
+            ticket = await asyncio.shield(enqueue)
+        except asyncio.CancelledError:
+            # The insert still lands in its thread; take the ticket back out once it does
+            enqueue.add_done_callback(
+                lambda f: f.cancelled() or f.exception() or loop.run_in_executor(None, self._dequeue, f.result()))
+            raise
+        queued = False
+        try:
+            while True:
+                delay = await loop.run_in_executor(None, self._try_acquire, ticket, tokens)
+                if delay == 0:
+                    waited = time.monotonic() - started
+                    self._record(waited, queued)
+                    return waited
+                queued = True
+                await asyncio.sleep(delay)
+        finally:
+            # Shielded so a second cancellation cannot leave the ticket behind
+            await asyncio.shield(loop.run_in_executor(None, self._dequeue, ticket))
+
+    def queue_depth(self) -> int:
+        """Requests currently waiting, across all processes."""
+        if not self.enabled or not self.db_path.exists():
+            return 0  # Nobody has asked for capacity yet; don't create the database just to look
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM rate_waiters WHERE heartbeat >= ?",
+                                (time.time() - TICKET_STALE_SECONDS,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "enabled": self.enabled,
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "granted": self.granted,
+                "waited": self.waited,
+                "avg_wait_seconds": round(self.total_wait_seconds / self.waited, 3) if self.waited else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+            }
+        try:
+            stats["queue_depth"] = self.queue_depth()
+        except sqlite3.Error as e:
+            print(f"Error reading rate limiter queue: {e}")
+            stats["queue_depth"] = None
+        return stats
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,214 @@
+"""
+Retention policies and tiered archiving for the post and vault stores.
+
+Hot records stay in the primary JSON store. Records older than a store's
+retention window (or beyond its record cap) move to gzip-compressed JSON
+Lines files partitioned by month:
+
+    data/archive/<store>/<YYYY-MM>.jsonl.gz
+
+Archived records remain queryable through query_archive(), which only opens
+the month partitions that overlap the requested range.
+"""
+import gzip
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import persistence
+from .persistence import file_lock, read_json_file, write_file_atomic, write_json_file
+from .post_store import normalize_timestamp
+
+# Opt-in: archived records drop out of /posts/all and the content vault stats
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+ARCHIVE_DIRNAME = "archive"
+
+
+@dataclass
+class RetentionPolicy:
+    """How long records of one store stay hot. 0 disables a limit."""
+
+    store: str
+    filename: str
+    max_age_days: float
+    max_records: int = 0
+    key: Optional[str] = None          # array lives under this key in a JSON object
+    timestamp_field: str = "timestamp"
+    format: str = "json"               # "json" array/object or "jsonl" log
+
+    @classmethod
+    def from_env(cls, store: str, filename: str, default_days: float, **kwargs) -> "RetentionPolicy":
+        prefix = f"RETENTION_{store.upper()}"
+        return cls(
+            store=store,
+            filename=filename,
+            max_age_days=float(os.getenv(f"{prefix}_DAYS", str(default_days))),
+            max_records=int(os.getenv(f"{prefix}_MAX_RECORDS", "0")),
+            **kwargs,
+        )
+
+
+POLICIES: Dict[str, RetentionPolicy] = {
+    "posts": RetentionPolicy.from_env("posts", "posts.json", 90),
+    "history": RetentionPolicy.from_env("history", "generated_posts.json", 365),
+    "vault": RetentionPolicy.from_env("vault", "content_vault.jsonl", 90, format="jsonl"),
+}
+
+
+def archive_dir(store: str) -> Path:
+    return persistence.DATA_DIR / ARCHIVE_DIRNAME / store
+
+
+def _month(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m")
+
+
+def _split(records: List[Dict], policy: RetentionPolicy, now: float) -> Tuple[List[Dict], List[Dict]]:
+    """Partition records into (hot, expired), preserving order."""
+    stamped = [(normalize_timestamp(r.get(policy.timestamp_field)) if isinstance(r, dict) else 0.0, r)
+               for r in records]
+    expired_ids = set()
+
+    if policy.max_age_days > 0:
+        cutoff = now - policy.max_age_days * 86400
+        # Records without a usable timestamp are never archived
+        expired_ids.update(i for i, (ts, _) in enumerate(stamped) if 0 < ts < cutoff)
+
+    if policy.max_records > 0:
+        remaining = [i for i in range(len(stamped)) if i not in expired_ids and stamped[i][0] > 0]
+        undated = len(stamped) - len(expired_ids) - len(remaining)
+        overflow = len(remaining) + undated - policy.max_records
+        if overflow > 0:
+            oldest = sorted(remaining, key=lambda i: stamped[i][0])[:overflow]
+            expired_ids.update(oldest)
+
+    hot = [r for i, (_, r) in enumerate(stamped) if i not in expired_ids]
+    expired = [r for i, (_, r) in enumerate(stamped) if i in expired_ids]
+    return hot, expired
+
+
+def _append_to_archive(store: str, records: List[Dict], timestamp_field: str) -> Dict[str, int]:
+    """Append records to their month partitions; returns counts per month."""
+    by_month: Dict[str, List[Dict]] = defaultdict(list)
+    for record in records:
+        by_month[_month(normalize_timestamp(record.get(timestamp_field)))].append(record)
+
+    directory = archive_dir(store)
+    directory.mkdir(parents=True, exist_ok=True)
+    for month, items in by_month.items():
+        path = directory / f"{month}.jsonl.gz"
+        lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+        with file_lock(path):
+            # Appending writes a new gzip member; readers see one continuous stream
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write(lines)
+    return {month: len(items) for month, items in by_month.items()}
+
+
+def prune_store(policy: RetentionPolicy, now: Optional[float] = None) -> Dict[str, Any]:
+    """Move a store's expired records into its archive."""
+    now = time.time() if now is None else now
+    path = persistence.DATA_DIR / policy.filename
+    if not path.exists():
+        return {"store": policy.store, "archived": 0, "kept": 0}
+
+    with file_lock(path):
+        if policy.format == "jsonl":
+            with open(path, "r", encoding="utf-8") as f:
+                data = None
+                records = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = read_json_file(path, None, use_cache=False)
+            records = (data or {}).get(policy.key, []) if policy.key else (data or [])
+        hot, expired = _split(records, policy, now)
+        if not expired:
+            return {"store": policy.store, "archived": 0, "kept": len(hot)}
+
+        # Archive first: a crash in between can duplicate records, never lose them
+        months = _append_to_archive(policy.store, expired, policy.timestamp_field)
+        if policy.format == "jsonl":
+            # Replacing the log changes its inode, so derived snapshots rebuild
+            write_file_atomic(path, "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in hot).encode("utf-8"))
+        elif policy.key:
+            data = {**data, policy.key: hot}
+            if "stats" in data:
+                data["stats"] = {**data["stats"], "total_stored": len(hot)}
+            write_json_file(path, data)
+        else:
+            write_json_file(path, hot)
+
+    return {"store": policy.store, "archived": len(expired), "kept": len(hot), "months": months}
+
+
+def run_retention(now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Apply every retention policy once (the scheduled pruning job)."""
+    results = []
+    for policy in POLICIES.values():
+        try:
+            results.append(prune_store(policy, now))
+        except Exception as e:
+            print(f"Error applying retention to {policy.filename}: {e}")
+            results.append({"store": policy.store, "error": str(e)})
+    archived = sum(r.get("archived", 0) for r in results)
+    if archived:
+        print(f"🗄️ Retention archived {archived} records")
+    return results
+
+
+def list_archive_months(store: str) -> List[str]:
+    """Month partitions available for a store, newest first."""
+    directory = archive_dir(store)
+    if not directory.exists():
+        return []
+    return sorted((p.name[:7] for p in directory.glob("*.jsonl.gz")), reverse=True)
+
+
+def _read_partition(path: Path) -> Iterator[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def query_archive(store: str, start: Optional[float] = None, end: Optional[float] = None,
+                  limit: Optional[int] = None) -> List[Dict]:
+    """
+    Archived records of a store with start <= timestamp <= end, newest
+    first. Only month partitions overlapping the range are read.
+    """
+    policy = POLICIES[store]
+    first_month = _month(start) if start is not None else None
+    last_month = _month(end) if end is not None else None
+    results: List[Dict] = []
+
+    for month in list_archive_months(store):
+        if last_month and month > last_month:
+            continue
+        if first_month and month < first_month:
+            break
+        records = list(_read_partition(archive_dir(store) / f"{month}.jsonl.gz"))
+        records.sort(key=lambda r: normalize_timestamp(r.get(policy.timestamp_field)), reverse=True)
+        for record in records:
+            ts = normalize_timestamp(record.get(policy.timestamp_field))
+            if (start is not None and ts < start) or (end is not None and ts > end):
+                continue
+            results.append(record)
+            if limit is not None and len(results) >= limit:
+                return results
+    return results
+
+
+def find_archived(store: str, record_id: Any) -> Optional[Dict]:
+    """Look up an archived record by ID (scans partitions newest first)."""
+    wanted = {record_id, str(record_id)}
+    for month in list_archive_months(store):
+        for record in _read_partition(archive_dir(store) / f"{month}.jsonl.gz"):
+            if record.get("id") in wanted or str(record.get("id")) in wanted:
+                return record
+    return None
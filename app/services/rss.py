@@ -3,10 +3,10 @@ import requests
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import re
-from .persistence import save_json, load_json
+from .persistence import load_json, update_json
 
 # Load feeds from persistent storage on startup
-feeds_db = load_json("feeds.json", [])
+feeds_db = list(load_json("feeds.json", []))
 
 def get_feed_name_by_url(url: str) -> Optional[str]:
     """Get the feed name by URL from the feeds database."""
@@ -208,8 +208,7 @@ def enhance_rss_summary(entry, max_length: int = None) -> str:
 def add_feed(feed):
     global feeds_db
     new_feed = {"name": feed.name, "url": feed.url}
-    feeds_db.append(new_feed)
-    save_json("feeds.json", feeds_db)
+    feeds_db = update_json("feeds.json", lambda feeds: feeds + [new_feed], [])
     return {"message": "Feed added", "total": len(feeds_db)}
 
 def get_all_feeds():
@@ -217,8 +216,7 @@ def get_all_feeds():
 
 def remove_feed(name: str):
     global feeds_db
-    feeds_db = [f for f in feeds_db if f["name"] != name]
-    save_json("feeds.json", feeds_db)
+    feeds_db = update_json("feeds.json", lambda feeds: [f for f in feeds if f["name"] != name], [])
     return {"message": f"Feed '{name}' removed."}
 
 def score_article(title: str, summary: str) -> int:
@@ -1,5 +1,6 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from app.services.generator import generate_commentary
+from app.services.retention import RETENTION_ENABLED, RETENTION_INTERVAL_HOURS, run_retention
 
 scheduler = BackgroundScheduler()
 
@@ -18,4 +19,6 @@ def scheduled_post_job():
 
 def start_scheduler():
     scheduler.add_job(scheduled_post_job, "interval", days=7)
+    if RETENTION_ENABLED:
+        scheduler.add_job(run_retention, "interval", hours=RETENTION_INTERVAL_HOURS)
     scheduler.start()
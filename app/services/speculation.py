@@ -0,0 +1,261 @@
+"""
+Speculative pre-generation for the top of the article queue.
+
+After the UI fetches the article queue, users nearly always generate for
+the first few articles. When the queue is served, the top
+SPECULATION_TOP_N articles are generated in the background with the UI's
+default style and platform and stored in the generation cache under the
+key a Generate click looks up, so it returns them instantly.
+
+Speculation only spends what is left over: at most
+SPECULATION_MAX_CONCURRENCY calls run at once, nothing starts while user
+generations are queued, and the tokens spent per day are capped at
+SPECULATION_DAILY_TOKEN_CAP. The spend is kept in a SQLite table under
+data/ (speculation.db) shared by every worker process: a generation
+reserves its worst case inside an IMMEDIATE transaction before it starts
+and records its actual usage when it ends, so concurrent workers cannot
+overshoot the cap together. Speculative entries expire after
+SPECULATION_TTL_MINUTES instead of the normal cache TTL, so unused ones do
+not linger, and they only reach the content vault once a user is served
+one.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import generator, persistence
+from .llm_resilience import OPEN
+from .model_router import current_load
+from .prompt_builder import estimate_tokens
+
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "true").lower() == "true"
+SPECULATION_TOP_N = int(os.getenv("SPECULATION_TOP_N", "3"))
+SPECULATION_MAX_CONCURRENCY = int(os.getenv("SPECULATION_MAX_CONCURRENCY", "2"))
+SPECULATION_DAILY_TOKEN_CAP = int(os.getenv("SPECULATION_DAILY_TOKEN_CAP", "20000"))
+SPECULATION_TTL_MINUTES = float(os.getenv("SPECULATION_TTL_MINUTES", "60"))
+# The Streamlit UI's default selections; the cache key uses these strings as sent
+SPECULATION_STYLE = os.getenv("SPECULATION_STYLE", "Trivance Default")
+SPECULATION_PLATFORM = os.getenv("SPECULATION_PLATFORM", "LinkedIn")
+SPECULATION_DB = "speculation.db"
+# A reservation left behind by a worker that died stops counting after this
+RESERVATION_SECONDS = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS speculation_spend (
+    id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    reserved INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS speculation_spend_day ON speculation_spend (day);
+"""
+
+
+def _as_article(article: Any) -> SimpleNamespace:
+    if isinstance(article, dict):
+        return SimpleNamespace(**{field: article.get(field) or "" for field in ("title", "summary", "source", "link")})
+    return article
+
+
+class Speculator:
+    """Background pre-generation into the generation cache, within a daily token budget."""
+
+    def __init__(self, top_n: int = SPECULATION_TOP_N,
+                 max_concurrency: int = SPECULATION_MAX_CONCURRENCY,
+                 daily_token_cap: int = SPECULATION_DAILY_TOKEN_CAP,
+                 ttl_seconds: float = SPECULATION_TTL_MINUTES * 60,
+                 style: str = SPECULATION_STYLE, platform: str = SPECULATION_PLATFORM,
+                 enabled: bool = SPECULATION_ENABLED, db_path: Optional[Path] = None):
+        self.top_n = top_n
+        self.max_concurrency = max_concurrency
+        self.daily_token_cap = daily_token_cap
+        self.ttl_seconds = ttl_seconds
+        self.style = style
+        self.platform = platform
+        self.enabled = enabled
+        self._db_path = db_path
+        self._initialized: Optional[Path] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, str] = {}  # cache key -> budget reservation
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.generated = 0
+        self.failed = 0
+        self.skipped = {"cached": 0, "in_flight": 0, "busy": 0, "circuit_open": 0, "budget": 0}
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path or persistence.DATA_DIR / SPECULATION_DB
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.db_path
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        if self._initialized != path:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = path
+        return conn
+
+    def reserve(self, tokens: int) -> Optional[str]:
+        """
+        Reserve tokens against today's cap for every worker; None if they
+        do not fit. Returns the reservation to settle() once the call ends.
+        """
+        today = date.today().isoformat()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM speculation_spend WHERE day < ?", (today,))
+            committed = conn.execute(
+                "SELECT COALESCE(SUM(tokens), 0) FROM speculation_spend "
+                "WHERE day = ? AND (reserved = 0 OR created_at > ?)",
+                (today, now - RESERVATION_SECONDS),
+            ).fetchone()[0]
+            if committed + tokens > self.daily_token_cap:
+                conn.execute("COMMIT")
+                return None
+            reservation = uuid.uuid4().hex
+            conn.execute("INSERT INTO speculation_spend (id, day, tokens, reserved, created_at) VALUES (?, ?, ?, 1, ?)",
+                         (reservation, today, tokens, now))
+            conn.execute("COMMIT")
+            return reservation
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def settle(self, reservation: str, tokens: int) -> None:
+        """Replace a reservation with the tokens actually spent."""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE speculation_spend SET tokens = ?, reserved = 0 WHERE id = ?", (tokens, reservation))
+        finally:
+            conn.close()
+
+    def _spent_today(self) -> int:
+        if not self.db_path.exists():
+            return 0
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(tokens), 0) FROM speculation_spend WHERE day = ? AND reserved = 0",
+                                (date.today().isoformat(),)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _worst_case(self, article) -> int:
+        """Worst-case tokens for one generation: the prompt plus a full completion."""
+        return estimate_tokens(f"{article.title}\n{article.summary}") + generator.OPENAI_MAX_TOKENS
+
+    def _skip(self, reason: str) -> None:
+        with self._lock:
+            self.skipped[reason] += 1
+
+    def speculate(self, articles: Iterable[Any]) -> List[str]:
+        """
+        Queue background generations for the top articles (best first, as
+        ranked by the caller). Returns the cache keys that were queued.
+        Never blocks on the LLM.
+        """
+        if not (self.enabled and generator.USE_GPT and generator.OPENAI_API_KEY) or self.top_n <= 0:
+            return []
+        queued = []
+        for article in [_as_article(a) for a in list(articles)[:self.top_n]]:
+            if not article.title or not article.summary:
+                continue
+            # Keyed like the streamed path the UI's Generate button uses (OPENAI_MODEL)
+            key = generator.generation_cache_key(article, self.style, self.platform)
+            if generator.generation_cache.contains(key):
+                self._skip("cached")
+                continue
+            if generator.circuit_breaker.state == OPEN:
+                self._skip("circuit_open")
+                continue
+            if current_load() > 0:
+                self._skip("busy")  # User generations are waiting; leave them the capacity
+                continue
+            with self._lock:
+                if key in self._pending:
+                    self.skipped["in_flight"] += 1
+                    continue
+                try:
+                    reservation = self.reserve(self._worst_case(article))
+                except Exception as e:
+                    print(f"Error reserving speculation tokens: {e}")
+                    reservation = None
+                if reservation is None:
+                    self.skipped["budget"] += 1
+                    continue
+                self._pending[key] = reservation
+                self.submitted += 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, self.max_concurrency),
+                                                        thread_name_prefix="speculation")
+                executor = self._executor
+            executor.submit(self._generate, article, key)
+            queued.append(key)
+        return queued
+
+    def _generate(self, article, key: str) -> None:
+        tokens = 0
+        try:
+            # Kept out of the content vault until a user is actually served the post
+            result = generator.generate_with_openai(article, self.style, self.platform, store=False)
+            tokens = result.get("token_usage", {}).get("total_tokens", 0)
+            if result.get("method") == "openai_gpt" and not result.get("error"):
+                generator.generation_cache.put(key, {**result, "speculative": True}, tokens,
+                                               ttl_seconds=self.ttl_seconds)
+                with self._lock:
+                    self.generated += 1
+            else:
+                print(f"Speculative generation skipped for {article.title[:50]}: {result.get('error')}")
+                with self._lock:
+                    self.failed += 1
+        except Exception as e:
+            print(f"Error in speculative generation: {e}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                reservation = self._pending.pop(key, None)
+            try:
+                self.settle(reservation, tokens)
+            except Exception as e:
+                print(f"Error recording speculation tokens: {e}")
+
+    def wait(self) -> None:
+        """Block until queued speculation has finished (tests and shutdown)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        spent = self._spent_today()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "top_n": self.top_n,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": len(self._pending),
+                "submitted": self.submitted,
+                "generated": self.generated,
+                "failed": self.failed,
+                "skipped": dict(self.skipped),
+                "tokens_today": spent,
+                "daily_token_cap": self.daily_token_cap,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+speculator = Speculator()
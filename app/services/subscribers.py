@@ -1,13 +1,21 @@
-from .persistence import save_json, load_json
+from .persistence import load_json, update_json
 
 # Load subscribers from persistent storage on startup
-subscribers_db = load_json("subscribers.json", [])
+subscribers_db = list(load_json("subscribers.json", []))
 
 def add_subscriber(email: str):
     global subscribers_db
-    if email not in subscribers_db:
-        subscribers_db.append(email)
-        save_json("subscribers.json", subscribers_db)
+    added = {"new": False}
+
+    def add(current):
+        # Merge against the file, not our startup snapshot: other workers may have written
+        if email not in current:
+            current.append(email)
+            added["new"] = True
+        return current
+
+    subscribers_db = update_json("subscribers.json", add, [])
+    if added["new"]:
         return {"message": "Subscribed!", "total": len(subscribers_db)}
     return {"message": "Already subscribed."}
 
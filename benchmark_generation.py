@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load-test the real LLM generation path offline against the mock OpenAI server.
+
+Starts app.services.mock_openai in-process (or uses --base-url) and runs
+generate_commentary concurrently, reporting latency percentiles, throughput,
+fallbacks and token usage.
+
+Usage:
+    python benchmark_generation.py [--requests 200] [--concurrency 16]
+        [--latency lognormal:0.8,0.4] [--error-rate 0.05] [--stream] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import generator, persistence
+from app.services.generation_cache import GenerationCache
+from app.services.llm_client import client_manager
+from app.services.mock_openai import MockLLMConfig, MockOpenAIServer
+
+
+def make_article(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        title=f"Article {i}: AI automation reaches mid-sized operations teams",
+        summary=("A new platform lets small teams automate ticket routing and inventory forecasting. "
+                 "Early customers report fewer manual handoffs and faster weekly reporting. ") * 3,
+        source="Benchmark News",
+        link=f"https://example.com/articles/{i}",
+    )
+
+
+def run_one(i: int, stream: bool) -> dict:
+    article = make_article(i)
+    start = time.perf_counter()
+    if stream:
+        first_token = None
+        result = {}
+        for event in generator.generate_commentary(article, "trivance_default", "LinkedIn", stream=True):
+            if event["type"] == "token" and first_token is None:
+                first_token = time.perf_counter() - start
+            elif event["type"] == "done":
+                result = event["result"]
+    else:
+        first_token = None
+        result = generator.generate_commentary(article, "trivance_default", "LinkedIn")
+    return {"seconds": time.perf_counter() - start, "first_token": first_token, "result": result}
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--base-url", default=None, help="use a running server instead of the in-process mock")
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url is None:
+        server = MockOpenAIServer(MockLLMConfig(latency=args.latency, token_delay=args.token_delay,
+                                                error_rate=args.error_rate, seed=args.seed)).start()
+    base_url = args.base_url or server.base_url
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark output out of the real data directory
+        persistence.DATA_DIR = Path(tmp)
+        generator.USE_GPT = True
+        generator.OPENAI_API_KEY = "mock"
+        generator.content_vault = None
+        generator.generation_cache = GenerationCache(enabled=False)
+        client_manager.configure(api_key="mock", base_url=base_url)
+
+        print(f"🚀 {args.requests} generations, concurrency {args.concurrency}, "
+              f"{'streaming' if args.stream else 'blocking'} against {base_url}")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            runs = list(executor.map(lambda i: run_one(i, args.stream), range(args.requests)))
+        wall = time.perf_counter() - started
+
+    if server is not None:
+        server.stop()
+
+    latencies = [r["seconds"] for r in runs]
+    methods = Counter(r["result"].get("method", "error") for r in runs)
+    reasons = Counter(r["result"]["fallback_reason"] for r in runs if r["result"].get("fallback_reason"))
+    tokens = sum(r["result"].get("token_usage", {}).get("total_tokens", 0) for r in runs)
+    print("=" * 72)
+    print(f"throughput   {len(runs) / wall:8.1f} req/s  ({wall:.2f}s wall)")
+    print(f"latency      p50 {percentile(latencies, 50):.3f}s  p95 {percentile(latencies, 95):.3f}s  "
+          f"p99 {percentile(latencies, 99):.3f}s  max {max(latencies):.3f}s")
+    first_tokens = [r["first_token"] for r in runs if r["first_token"] is not None]
+    if first_tokens:
+        print(f"first token  p50 {percentile(first_tokens, 50):.3f}s  p95 {percentile(first_tokens, 95):.3f}s")
+    print(f"methods      {dict(methods)}")
+    print(f"tokens       {tokens} total, {tokens / max(1, methods.get('openai_gpt', 0)):.0f} per LLM post")
+    for reason, count in reasons.most_common(5):
+        print(f"fallback     {count:4d} × {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON persistence load/save paths for each available codec.
+
+Usage:
+    python benchmark_persistence.py [--posts 5000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import persistence
+
+
+def make_history(count: int) -> list:
+    """Synthetic generated_posts.json contents."""
+    body = ("AI adoption at small and mid-sized companies keeps accelerating — "
+            "the teams that win map workflows before buying tools. ") * 6
+    return [
+        {
+            "id": i + 1,
+            "title": f"Article {i}: How AI is reshaping operations",
+            "source": "TechCrunch",
+            "enhanced_summary": body,
+            "generated_post": body,
+            "platform": "LinkedIn",
+            "media": None,
+            "hashtags": ["#AI", "#TrivanceAI", "#SmallBusiness"],
+            "timestamp": f"2025-01-{(i % 28) + 1:02d}T10:00:00",
+            "character_count": len(body),
+            "word_count": len(body.split()),
+        }
+        for i in range(count)
+    ]
+
+
+def time_it(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    history = make_history(args.posts)
+    print(f"📊 Persistence benchmark ({args.posts} posts, best of {args.repeat})")
+    print("=" * 72)
+    print(f"{'codec':<10}{'layout':<10}{'size KB':>10}{'save ms':>12}{'load ms':>12}{'cached ms':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "generated_posts.json"
+        for name in ("json", "orjson", "msgspec"):
+            codec = persistence.get_codec(name)
+            if codec.name != name:
+                print(f"{name:<10}not installed")
+                continue
+            for compact in (False, True):
+                persistence.codec = codec
+                persistence.JSON_COMPACT_STORAGE = compact
+
+                save_ms = time_it(lambda: persistence.write_json_file(path, history), args.repeat)
+
+                persistence.read_cache.enabled = False
+                load_ms = time_it(lambda: persistence.read_json_file(path), args.repeat)
+
+                persistence.read_cache.enabled = True
+                persistence.read_json_file(path)
+                cached_ms = time_it(lambda: persistence.read_json_file(path), args.repeat)
+
+                size_kb = path.stat().st_size / 1024
+                layout = "compact" if compact else "indent"
+                print(f"{name:<10}{layout:<10}{size_kb:>10.0f}{save_ms:>12.2f}{load_ms:>12.2f}{cached_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+-- Trivance Content Engine SQLite schema.
+-- Mirrors the JSON stores in data/ (see DATABASE_MIGRATION.md).
+-- Statements are idempotent so the schema can be applied on every start.
+
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS subscribers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    active BOOLEAN DEFAULT TRUE
+);
+
+-- posts.json: every generation made through /posts/generate
+CREATE TABLE IF NOT EXISTS posts (
+    id VARCHAR(255) PRIMARY KEY,
+    title TEXT NOT NULL,
+    summary TEXT,
+    source VARCHAR(255),
+    link TEXT,
+    generated_content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts (timestamp);
+
+-- generated_posts.json: posts saved to history from the dashboard
+CREATE TABLE IF NOT EXISTS post_history (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    source VARCHAR(255),
+    enhanced_summary TEXT,
+    generated_post TEXT NOT NULL,
+    platform VARCHAR(32),
+    media TEXT,
+    hashtags TEXT,            -- JSON array
+    timestamp TEXT,
+    character_count INTEGER,
+    word_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_post_history_timestamp ON post_history (timestamp);
+
+-- content_vault.json: successful generations with their metadata
+CREATE TABLE IF NOT EXISTS vault_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    article_title TEXT,
+    generated_post TEXT NOT NULL,
+    character_count INTEGER,
+    method VARCHAR(64),
+    style_used VARCHAR(64),
+    platform VARCHAR(32),
+    token_usage TEXT,         -- JSON object
+    generation_time REAL,
+    UNIQUE (timestamp, article_title)
+);
+
+-- Resume bookkeeping for the JSON -> SQLite migration
+CREATE TABLE IF NOT EXISTS migration_progress (
+    source VARCHAR(64) PRIMARY KEY,
+    records_done INTEGER NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,84 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Make the ``app`` package importable regardless of how pytest is invoked
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point JSON persistence at a temporary data directory."""
+    from app.services import persistence
+
+    monkeypatch.setattr(persistence, "DATA_DIR", tmp_path)
+    persistence.read_cache.clear()
+    yield tmp_path
+    persistence.read_cache.clear()
+
+
+@pytest.fixture
+def mock_openai_server(data_dir, monkeypatch):
+    """Local OpenAI stand-in; the shared client manager is pointed at it."""
+    from app.services import generator
+    from app.services.llm_client import client_manager
+    from app.services.llm_resilience import CircuitBreaker
+    from app.services.mock_openai import MockLLMConfig, MockOpenAIServer
+    from app.services.model_router import ModelRouter
+
+    # Latency history and failures from earlier tests must not steer routing or trip the breaker
+    monkeypatch.setattr(generator, "model_router", ModelRouter(models=[generator.OPENAI_MODEL]))
+    monkeypatch.setattr(generator, "circuit_breaker", CircuitBreaker())
+
+    config = MockLLMConfig(
+        reply=("Mock post: the article shows how small teams can automate intake "
+               "workflows without adding headcount."),
+        usage=(100, 50),
+    )
+    server = MockOpenAIServer(config).start()
+    previous = client_manager.settings
+    client_manager.configure(api_key="test-key", base_url=server.base_url)
+    yield server
+    client_manager.configure(**previous)
+    server.stop()
+
+
+ARTICLE_FIELDS = {
+    "title": "Automation tools for operations teams",
+    "summary": "Small teams are using AI automation to route tickets and forecast inventory demand.",
+    "source": "Example News",
+    "link": "https://example.com/article",
+}
+
+
+@pytest.fixture
+def make_article():
+    """Factory for articles as the generator takes them; any field can be overridden."""
+    def make(**fields):
+        return SimpleNamespace(**{**ARTICLE_FIELDS, **fields})
+    return make
+
+
+@pytest.fixture
+def llm_enabled(mock_openai_server, monkeypatch):
+    """The generator on the mock server: GPT on, no content vault, generation cache off."""
+    from app.services import generator
+    from app.services.generation_cache import GenerationCache
+
+    monkeypatch.setattr(generator, "USE_GPT", True)
+    monkeypatch.setattr(generator, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(generator, "content_vault", None)
+    monkeypatch.setattr(generator, "generation_cache", GenerationCache(enabled=False))
+    return mock_openai_server
+
+
+@pytest.fixture
+def llm_cached(llm_enabled, monkeypatch):
+    """``llm_enabled`` with a working generation cache."""
+    from app.services import generator
+    from app.services.generation_cache import GenerationCache
+
+    monkeypatch.setattr(generator, "generation_cache", GenerationCache(ttl_seconds=3600))
+    return llm_enabled
@@ -0,0 +1,48 @@
+import pytest
+
+from app.services import generator
+
+
+@pytest.fixture
+def articles(make_article):
+    def make(n):
+        return [make_article(title=f"Article {i}: automation tools for operations teams",
+                             link=f"https://example.com/{i}") for i in range(n)]
+    return make
+
+
+def test_template_batch_covers_every_combination(articles, monkeypatch):
+    monkeypatch.setattr(generator, "USE_GPT", False)
+
+    batch = generator.generate_batch(articles(2), list(generator.STYLE_EXAMPLES), ["LinkedIn", "X"])
+
+    items = batch["items"]
+    assert len(items) == 2 * len(generator.STYLE_EXAMPLES) * 2
+    assert {(i["article_index"], i["post_style"], i["platform"]) for i in items} == {
+        (a, s, p) for a in range(2) for s in generator.STYLE_EXAMPLES for p in ("LinkedIn", "X")
+    }
+    assert all(i["result"]["method"] == "template_improved" for i in items)
+    assert batch["summary"]["total"] == len(items)
+    assert batch["summary"]["token_usage"]["total_tokens"] == 0
+
+
+def test_llm_batch_aggregates_tokens(mock_openai_server, llm_enabled, articles):
+    batch = generator.generate_batch(articles(3), ["casual"], ["LinkedIn", "Email"], max_concurrency=4)
+
+    summary = batch["summary"]
+    assert summary["methods"] == {"openai_gpt": 6}
+    assert summary["fallbacks"] == 0
+    assert summary["token_usage"]["total_tokens"] == 6 * 150
+    assert summary["latency_seconds"]["max"] >= summary["latency_seconds"]["p50"]
+    assert len(mock_openai_server.requests) == 6
+
+
+def test_llm_batch_falls_back_per_item(mock_openai_server, llm_enabled, articles):
+    mock_openai_server.config.reply = "Too short"
+
+    batch = generator.generate_batch(articles(2), ["trivance_default"], ["LinkedIn"])
+
+    assert batch["summary"]["fallbacks"] == 2
+    for item in batch["items"]:
+        assert item["result"]["method"] == "template_improved"
+        assert "too short" in item["result"]["fallback_reason"]
@@ -0,0 +1,58 @@
+import time
+
+from app.services import generator
+from app.services.llm_resilience import CircuitBreaker
+
+
+def _breaker(**kwargs):
+    return CircuitBreaker(**{"window": 4, "min_calls": 4, "failure_rate": 0.5, "open_seconds": 0.1, **kwargs})
+
+
+def test_opens_on_failure_rate_and_recovers_through_a_probe():
+    breaker = _breaker()
+    for outcome in (True, False, True):
+        breaker.allow()
+        breaker.record(outcome)
+    assert breaker.state == "closed"  # too few calls to judge
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+    time.sleep(0.12)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_and_cancelled_probe_frees_the_slot():
+    breaker = _breaker(min_calls=1, open_seconds=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+
+
+def test_open_circuit_skips_the_llm(mock_openai_server, llm_enabled, make_article, monkeypatch):
+    monkeypatch.setattr(generator, "circuit_breaker", _breaker(min_calls=2, open_seconds=60))
+    monkeypatch.setattr("app.services.llm_resilience.LATENCY_BUDGETS", {"Email": 0.3})
+    article = make_article()
+
+    mock_openai_server.delays.extend([1.0, 1.0])
+    for _ in range(2):
+        result = generator.generate_commentary(article, "casual", "Email")
+        assert "timeout" in result["fallback_reason"]
+    requests_made = len(mock_openai_server.requests)
+
+    started = time.time()
+    result = generator.generate_commentary(article, "casual", "Email")
+    assert time.time() - started < 0.2
+    assert result["method"] == "template_improved"
+    assert result["fallback_reason"].startswith("Circuit open")
+    assert len(mock_openai_server.requests) == requests_made
@@ -0,0 +1,79 @@
+import json
+import time
+
+from app.services import content_vault as vault_module
+from app.services.content_vault import ContentVault
+from app.services.retention import RetentionPolicy, prune_store
+
+
+def store(vault, n, method="openai_gpt", style="punchy"):
+    vault.store_successful_post(f"Article {n}", "x" * (10 * n), {"method": method, "style_used": style})
+
+
+def test_store_appends_and_updates_stats_incrementally(data_dir):
+    vault = ContentVault()
+    for n in (1, 2, 3):
+        store(vault, n, method="openai_gpt" if n < 3 else "template_improved")
+
+    stats = vault.get_stats()
+    assert stats["total_posts"] == 3
+    assert stats["average_length"] == 20
+    assert stats["methods_used"] == {"openai_gpt": 2, "template_improved": 1}
+    assert stats["styles_used"] == {"punchy": 3}
+    assert len((data_dir / "content_vault.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_files_are_created_on_first_write(data_dir):
+    vault = ContentVault()
+
+    assert vault.get_stats() == {"total_posts": 0}
+    assert vault.get_recent_successes(5) == []
+    assert list(data_dir.iterdir()) == []
+
+    store(vault, 1)
+    assert (data_dir / "content_vault.jsonl").exists()
+
+
+def test_recent_successes_tail_the_log(data_dir, monkeypatch):
+    monkeypatch.setattr(vault_module, "TAIL_BLOCK_SIZE", 16)
+    vault = ContentVault()
+    for n in range(1, 8):
+        store(vault, n)
+
+    assert [p["article_title"] for p in vault.get_recent_successes(3)] == ["Article 5", "Article 6", "Article 7"]
+    assert len(vault.get_recent_successes(50)) == 7
+
+
+def test_stats_catch_up_with_entries_appended_elsewhere(data_dir):
+    vault = ContentVault()
+    store(vault, 1)
+    # Another writer appended without refreshing our snapshot
+    with open(vault.log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": "2025-01-01", "character_count": 30, "method": "m"}) + "\n")
+
+    assert vault.get_stats()["total_posts"] == 2
+
+
+def test_legacy_vault_is_converted_once(data_dir):
+    legacy = {"successful_posts": [{"timestamp": "2025-01-01T00:00:00", "article_title": "old",
+                                    "character_count": 4, "method": "openai_gpt"}],
+              "stats": {"total_stored": 1}}
+    (data_dir / "content_vault.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    vault = ContentVault()
+
+    assert vault.get_stats()["total_posts"] == 1
+    assert vault.get_recent_successes(1)[0]["article_title"] == "old"
+    assert (data_dir / "content_vault.json.migrated").exists()
+
+
+def test_stats_rebuild_after_retention_rewrites_log(data_dir):
+    vault = ContentVault()
+    store(vault, 1)
+    store(vault, 2)
+    policy = RetentionPolicy("vault", "content_vault.jsonl", max_age_days=0, max_records=1, format="jsonl")
+
+    prune_store(policy, now=time.time())
+
+    assert vault.get_stats()["total_posts"] == 1
+    assert vault.get_recent_successes(5)[0]["article_title"] == "Article 2"
@@ -0,0 +1,48 @@
+import json
+
+from app.services import generator
+
+LONG = "Operations teams can now route tickets automatically, which removes a manual handoff every day."
+
+
+def test_fanout_uses_one_call_for_all_platforms(llm_cached, make_article):
+    llm_cached.config.reply = "```json\n" + json.dumps(
+        {"LinkedIn": LONG, "X": "Ticket routing on autopilot: small ops teams get hours back every week.", "Email": LONG}) + "\n```"
+
+    result = generator.generate_commentary(make_article(), "casual", platforms=["LinkedIn", "X", "Email"])
+
+    assert len(llm_cached.requests) == 1
+    body = llm_cached.requests[0]["body"]
+    assert body["response_format"] == {"type": "json_object"}
+    assert body["max_tokens"] == 3 * generator.OPENAI_MAX_TOKENS
+    platforms = result["platforms"]
+    assert [r["method"] for r in platforms.values()] == ["openai_gpt"] * 3
+    assert "#" in platforms["LinkedIn"]["post"] and "#" not in platforms["Email"]["post"]
+    assert result["token_usage"]["total_tokens"] == 150
+    assert result["fallbacks"] == 0
+
+    # Each platform was cached individually
+    single = generator.generate_commentary(make_article(), "casual", "Email")
+    assert single["cached"] and len(llm_cached.requests) == 1
+
+
+def test_fanout_falls_back_per_platform(llm_enabled, make_article):
+    llm_enabled.config.reply = json.dumps({"LinkedIn": LONG, "X": "x" * 300})
+
+    result = generator.generate_commentary(make_article(), "punchy", platforms=["LinkedIn", "X", "Email"])
+
+    platforms = result["platforms"]
+    assert platforms["LinkedIn"]["method"] == "openai_gpt"
+    assert platforms["X"]["method"] == "template_improved"
+    assert "too long" in platforms["X"]["fallback_reason"]
+    assert "No Email post" in platforms["Email"]["fallback_reason"]
+    assert result["fallbacks"] == 2
+
+
+def test_unparseable_reply_falls_back_everywhere(llm_enabled, make_article):
+    llm_enabled.config.reply = "Not JSON at all, just a long enough post about automation for teams."
+
+    result = generator.generate_commentary(make_article(), "casual", platforms=["LinkedIn", "X"])
+
+    assert {r["method"] for r in result["platforms"].values()} == {"template_improved"}
+    assert all("not a JSON object" in r["fallback_reason"] for r in result["platforms"].values())
@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import generator
+from app.services.generation_cache import GenerationCache, make_cache_key
+
+
+def test_key_ignores_cosmetic_differences():
+    a = make_cache_key("AI &amp; Ops", "Some  summary", "punchy", "X", "gpt", 0.7)
+    b = make_cache_key("ai & ops ", "some summary", "punchy", "X", "gpt", 0.7)
+    c = make_cache_key("ai & ops", "some summary", "punchy", "LinkedIn", "gpt", 0.7)
+
+    assert a == b
+    assert a != c
+
+
+def test_ttl_lru_and_persistence(data_dir):
+    cache = GenerationCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", {"post": "A"}, total_tokens=100)
+    cache.put("b", {"post": "B"})
+    cache.get("a")
+    cache.put("c", {"post": "C"})  # evicts b, the least recently used
+
+    assert cache.get("b") is None
+    reloaded = GenerationCache(ttl_seconds=60, max_entries=2)
+    assert reloaded.get("a")["post"] == "A"
+    assert reloaded.get("a")["cached"] is True
+    assert reloaded.stats()["tokens_saved"] == 200
+
+    cache.put("old", {"post": "stale"}, ttl_seconds=-1)
+    assert cache.get("old") is None
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.fixture
+def fake_openai(monkeypatch, data_dir):
+    calls = []
+
+    def fake_generate(article, post_style="trivance_default", platform="LinkedIn", variants=1, **kwargs):
+        calls.append((article.title, post_style, platform))
+        return {"post": f"post {len(calls)}", "method": "openai_gpt",
+                "token_usage": {"total_tokens": 42}}
+
+    monkeypatch.setattr(generator, "USE_GPT", True)
+    monkeypatch.setattr(generator, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(generator, "generate_with_openai", fake_generate)
+    monkeypatch.setattr(generator, "generation_cache", GenerationCache(ttl_seconds=60))
+    return calls
+
+
+def test_generate_commentary_reuses_cached_llm_result(fake_openai, make_article):
+    first = generator.generate_commentary(make_article(), "punchy", "X")
+    second = generator.generate_commentary(make_article(), "punchy", "X")
+    other_platform = generator.generate_commentary(make_article(), "punchy", "LinkedIn")
+
+    assert len(fake_openai) == 2
+    assert second["post"] == first["post"]
+    assert second["cached"] is True
+    assert other_platform["post"] == "post 2"
+    assert generator.generation_cache.stats()["tokens_saved"] == 42
+
+
+def test_fresh_bypasses_and_refreshes_cache(fake_openai, make_article):
+    generator.generate_commentary(make_article(), "punchy", "X")
+    fresh = generator.generate_commentary(make_article(), "punchy", "X", fresh=True)
+    cached = generator.generate_commentary(make_article(), "punchy", "X")
+
+    assert len(fake_openai) == 2
+    assert fresh["post"] == "post 2"
+    assert cached["post"] == "post 2"
+    assert generator.generation_cache.stats()["bypassed"] == 1
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import posts
+from app.services import generator
+from app.services.idempotency import IdempotencyConflict, IdempotencyStore
+
+ARTICLE = {
+    "title": "Automation tools for operations teams",
+    "summary": "Small teams are using AI automation to route tickets and forecast inventory demand.",
+    "source": "Example News",
+    "link": "https://example.com/idempotency",
+}
+
+
+def test_retry_replays_without_running_again(data_dir):
+    store = IdempotencyStore()
+    calls = []
+
+    first = store.run("generate", "k1", {"a": 1}, lambda: calls.append(1) or {"n": len(calls)})
+    second = store.run("generate", "k1", {"a": 1}, lambda: calls.append(1) or {"n": len(calls)})
+
+    assert first == ({"n": 1}, False)
+    assert second == ({"n": 1}, True)
+    assert len(calls) == 1
+    with pytest.raises(IdempotencyConflict):
+        store.run("generate", "k1", {"a": 2}, lambda: {})
+    # Keys are per endpoint
+    assert store.run("save", "k1", {"a": 2}, lambda: {"other": True}) == ({"other": True}, False)
+
+
+def test_failures_free_the_key(data_dir):
+    store = IdempotencyStore()
+    with pytest.raises(RuntimeError):
+        store.run("generate", "k", {}, lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert store.run("generate", "k", {}, lambda: {"error": "x"}, succeeded=lambda r: "error" not in r)[1] is False
+    assert store.run("generate", "k", {}, lambda: {"ok": 1}) == ({"ok": 1}, False)
+
+
+def test_concurrent_duplicate_waits_for_in_flight(data_dir):
+    store = IdempotencyStore()
+    started = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return {"done": True}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(store.run("generate", "k", {}, slow)))
+    first.start()
+    started.wait(2)
+    duplicate = store.run("generate", "k", {}, slow)
+    first.join()
+
+    assert duplicate == ({"done": True}, True)
+    assert results == [({"done": True}, False)]
+    assert len(calls) == 1
+    assert store.stats()["waited"] == 1
+
+
+def test_store_is_bounded(data_dir):
+    store = IdempotencyStore(max_keys=3)
+    for i in range(6):
+        store.run("save", f"k{i}", {}, lambda: {})
+    assert store.stats()["keys"] == 3
+
+
+def test_endpoints_honour_the_header(data_dir, monkeypatch):
+    monkeypatch.setattr(generator, "USE_GPT", False)
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "gen-1"}
+
+    first = client.post("/posts/generate", json=ARTICLE, headers=headers)
+    retry = client.post("/posts/generate", json=ARTICLE, headers=headers)
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert client.post("/posts/generate", json={**ARTICLE, "title": "Another title here"},
+                       headers=headers).status_code == 422
+
+    entry = {"title": "t", "source": "s", "enhanced_summary": "e", "generated_post": "p",
+             "platform": "LinkedIn", "timestamp": "2025-01-01T00:00:00Z"}
+    saved = [client.post("/posts/save", json=entry, headers={"Idempotency-Key": "save-1"}).json()
+             for _ in range(2)]
+    assert saved[0] == saved[1]
+    assert len(client.get("/posts/history").json()) == 1
+
+
+def _sse_events(response):
+    return [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+
+
+def test_duplicate_stream_waits_for_the_original(mock_openai_server, llm_enabled):
+    from app.services.post_store import posts_repository
+
+    mock_openai_server.config.token_delay = 0.02
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "stream-1"}
+
+    responses = []
+    first = threading.Thread(target=lambda: responses.append(
+        client.post("/posts/generate/stream", json=ARTICLE, headers=headers)))
+    first.start()
+    time.sleep(0.1)  # the original is mid-stream
+    duplicate = client.post("/posts/generate/stream", json=ARTICLE, headers=headers)
+    first.join()
+
+    assert "token" in _sse_events(responses[0])
+    assert _sse_events(duplicate) == ["done"]
+    assert duplicate.headers["Idempotent-Replayed"] == "true"
+    assert len(mock_openai_server.requests) == 1
+    assert len(posts_repository.all()) == 1
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import posts
+from app.services import generator, jobs
+from app.services.jobs import JobQueue, JobWorkerPool
+
+ARTICLE = {
+    "title": "Automation tools for operations teams",
+    "summary": "Small teams are using AI automation to route tickets and forecast inventory demand.",
+    "source": "Example News",
+    "link": "https://example.com/jobs",
+    "post_style": "casual",
+}
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_claims_are_exclusive_and_ordered(data_dir):
+    queue = JobQueue()
+    first = queue.enqueue("generate", {"n": 1})
+    second = queue.enqueue("generate", {"n": 2})
+
+    assert queue.claim("a")["id"] == first
+    assert queue.claim("b")["id"] == second
+    assert queue.claim("c") is None
+    assert queue.finish(first, "a", {"ok": True})
+    assert not queue.finish(second, "a", {"ok": True})  # not a's lease
+    assert queue.get(first)["result"] == {"ok": True}
+    assert queue.stats() == {"queued": 0, "running": 1, "succeeded": 1, "failed": 0}
+
+
+def test_expired_leases_are_reclaimed_then_given_up(data_dir):
+    queue = JobQueue(lease_seconds=0, max_attempts=2)
+    job_id = queue.enqueue("generate", {})
+
+    assert queue.claim("dead-worker")["id"] == job_id
+    time.sleep(0.01)
+    assert queue.claim("second-worker")["id"] == job_id
+    time.sleep(0.01)
+    assert queue.claim("third-worker") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["attempts"] == 2
+
+
+def test_queued_jobs_survive_a_restart(data_dir):
+    job_id = JobQueue().enqueue("echo", {"value": 42})
+
+    # A new process: fresh queue object and workers on the same data directory
+    pool = JobWorkerPool(JobQueue(), {"echo": lambda payload: {"echo": payload["value"]}},
+                         workers=2, poll_interval=0.02)
+    pool.start()
+    try:
+        assert _wait_for(lambda: pool.queue.get(job_id)["status"] == "succeeded")
+    finally:
+        pool.stop()
+    assert pool.queue.get(job_id)["result"] == {"echo": 42}
+
+
+@pytest.fixture
+def callback_server():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/hook", received
+    server.shutdown()
+    server.server_close()
+
+
+def test_job_api_runs_generation_and_calls_back(data_dir, monkeypatch, callback_server):
+    monkeypatch.setattr(generator, "USE_GPT", False)
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_ALLOWED_HOSTS", {"127.0.0.1"})
+    monkeypatch.setattr(jobs.job_workers, "poll_interval", 0.05)
+    url, received = callback_server
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+    client = TestClient(app)
+
+    try:
+        response = client.post("/posts/jobs", json={"article": ARTICLE, "callback_url": url, "variants": 2})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        assert _wait_for(lambda: client.get(f"/posts/jobs/{job_id}").json()["callback_status"] is not None)
+        job = client.get(f"/posts/jobs/{job_id}").json()
+        assert job["status"] == "succeeded"
+        assert job["result"]["method"] == "template_improved"
+        assert len(job["result"]["variants"]) == 2
+        assert job["callback_status"] == "HTTP 204"
+        assert received[0]["id"] == job_id and received[0]["status"] == "succeeded"
+        assert client.get("/posts/jobs/unknown").status_code == 404
+    finally:
+        jobs.job_workers.stop()
+
+
+def test_finished_jobs_are_pruned_after_retention(data_dir):
+    queue = JobQueue(retention_seconds=60)
+    old, recent, running = (queue.enqueue("generate", {}) for _ in range(3))
+    for job_id in (old, recent):
+        queue.claim("a")
+        queue.finish(job_id, "a", {"ok": True})
+    queue.claim("a")
+    with sqlite3.connect(queue.db_path) as conn:
+        conn.execute("UPDATE generation_jobs SET finished_at = finished_at - 120 WHERE id = ?", (old,))
+
+    assert queue.prune() == 1
+    assert queue.get(old) is None
+    assert queue.get(recent)["status"] == "succeeded"
+    assert queue.get(running)["status"] == "running"
+    assert JobQueue(retention_seconds=0).prune() == 0
+
+
+def test_callbacks_to_internal_addresses_are_refused(data_dir, monkeypatch, callback_server):
+    url, received = callback_server
+    for internal in (url, "http://localhost/hook", "http://10.0.0.5/hook", "http://169.254.169.254/latest",
+                     "http://[::1]/hook", "http://[::ffff:127.0.0.1]/hook", "ftp://example.com/hook"):
+        assert jobs.callback_url_error(internal), internal
+    assert jobs.callback_url_error("https://93.184.216.34/hook") is None
+
+    assert jobs.send_callback(url, {"id": "x"}).startswith("refused")
+    assert received == []
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+    assert TestClient(app).post("/posts/jobs", json={"article": ARTICLE, "callback_url": url}).status_code == 422
+    assert jobs.job_queue.stats()["queued"] == 0
+
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_ALLOWED_HOSTS", {"127.0.0.1"})
+    assert jobs.callback_url_error(url) is None
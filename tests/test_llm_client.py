@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from app.services import generator, llm_resilience
+from app.services.llm_client import GenerationPool, GenerationTimeout, OpenAIClientManager, client_manager
+
+
+def test_client_is_built_once_and_rebuilt_after_configure():
+    manager = OpenAIClientManager(api_key="k", base_url="http://127.0.0.1:9/v1")
+    first = manager.get_client()
+    assert manager.get_client() is first
+    assert manager.clients_created == 1
+
+    manager.configure(timeout=3.0)
+    assert manager.get_client() is not first
+    assert manager.clients_created == 2
+    manager.close()
+
+
+def test_generate_with_openai_reuses_connection(mock_openai_server, llm_enabled, make_article):
+    results = [generator.generate_with_openai(make_article(), "casual", "Email") for _ in range(3)]
+
+    for result in results:
+        assert result["method"] == "openai_gpt"
+        assert result["post"].startswith("Mock post:")
+        assert result["token_usage"]["total_tokens"] == 150
+    requests = mock_openai_server.requests
+    assert [r["path"] for r in requests] == ["/v1/chat/completions"] * 3
+    assert requests[0]["body"]["model"] == generator.OPENAI_MODEL
+    # One pooled keep-alive connection served every call
+    assert len({r["client_port"] for r in requests}) == 1
+    assert client_manager.get_client() is client_manager.get_client()
+
+
+def _completion(client):
+    return client.chat.completions.create(
+        model="mock", messages=[{"role": "user", "content": "hi"}], max_tokens=10)
+
+
+def test_pool_timeout_cancels_request(mock_openai_server):
+    pool = GenerationPool(client_manager, max_concurrency=2)
+    mock_openai_server.config.latency = "fixed:1.0"
+
+    started = time.time()
+    with pytest.raises(GenerationTimeout):
+        pool.run(_completion, timeout=0.2)
+
+    assert time.time() - started < 0.9
+    stats = pool.stats()
+    assert stats["timed_out"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_pool_cancel_and_concurrency_bound(mock_openai_server):
+    pool = GenerationPool(client_manager, max_concurrency=1)
+    mock_openai_server.config.latency = "fixed:0.3"
+
+    first = pool.submit(_completion, timeout=5)
+    second = pool.submit(_completion, timeout=5)
+    time.sleep(0.1)
+    assert pool.stats()["in_flight"] == 1
+    assert pool.stats()["waiting"] == 1
+
+    second.cancel()
+    assert first.result(timeout=5).usage.total_tokens == 150
+    time.sleep(0.05)
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["cancelled"] == 1
+    assert len(mock_openai_server.requests) == 1
+
+
+def test_generate_with_openai_falls_back_on_timeout(mock_openai_server, llm_enabled, make_article, monkeypatch):
+    monkeypatch.setitem(llm_resilience.LATENCY_BUDGETS, "Email", 0.2)
+    mock_openai_server.config.latency = "fixed:1.0"
+
+    result = generator.generate_with_openai(make_article(), "casual", "Email")
+
+    assert result["fallback"] is True
+    assert "timeout" in result["error"]
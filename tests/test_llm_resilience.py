@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from app.services.llm_client import GenerationPool, client_manager
+from app.services.llm_resilience import LatencyTracker, ResilientCaller, RetryPolicy
+
+
+def _completion(client):
+    return client.chat.completions.create(
+        model="mock", messages=[{"role": "user", "content": "hi"}], max_tokens=10)
+
+
+@pytest.fixture
+def pool():
+    return GenerationPool(client_manager, max_concurrency=4)
+
+
+def _caller(**kwargs):
+    return ResilientCaller(RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05), **kwargs)
+
+
+def test_retries_transient_errors(mock_openai_server, pool):
+    mock_openai_server.errors = [500, 429]
+    caller = _caller(hedging=False)
+
+    completion = pool.run(lambda c: caller.call(c, _completion), timeout=5)
+
+    assert completion.usage.total_tokens == 150
+    assert caller.retries == 2
+    assert len(mock_openai_server.requests) == 3
+
+
+def test_does_not_retry_client_errors(mock_openai_server, pool):
+    mock_openai_server.errors = [400]
+    caller = _caller(hedging=False)
+
+    with pytest.raises(openai.BadRequestError):
+        pool.run(lambda c: caller.call(c, _completion), timeout=5)
+    assert caller.retries == 0
+    assert len(mock_openai_server.requests) == 1
+
+
+def test_gives_up_after_max_attempts(mock_openai_server, pool):
+    mock_openai_server.errors = [503, 503, 503]
+    caller = _caller(hedging=False)
+
+    with pytest.raises(openai.InternalServerError):
+        pool.run(lambda c: caller.call(c, _completion), timeout=5)
+    assert caller.retries == 2
+    assert caller.retries_exhausted == 1
+
+
+def test_hedge_beats_slow_primary(mock_openai_server, pool):
+    mock_openai_server.delays = [1.5, 0.0]
+    caller = _caller(hedging=True, hedge_default_delay=0.1)
+
+    started = time.monotonic()
+    completion = pool.run(lambda c: caller.call(c, _completion, "X"), timeout=5)
+
+    assert completion.usage.total_tokens == 150
+    assert time.monotonic() - started < 1.0
+    assert caller.hedges_fired == 1
+    assert caller.hedges_won == 1
+
+
+def test_cancelling_during_hedge_delay_cancels_the_primary():
+    calls = {"started": 0, "cancelled": 0, "finished": 0}
+
+    async def slow_call(client):
+        calls["started"] += 1
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        calls["finished"] += 1
+
+    async def scenario():
+        caller = _caller(hedging=True, hedge_default_delay=5.0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(caller.call(None, slow_call), timeout=0.1)
+        await asyncio.sleep(0.05)
+        # Checked before asyncio.run() tears the loop down and cancels leftovers itself
+        return dict(calls)
+
+    assert asyncio.run(scenario()) == {"started": 1, "cancelled": 1, "finished": 0}
+
+
+def test_hedge_delay_follows_observed_p95():
+    caller = ResilientCaller(hedging=True, hedge_default_delay=6.0, hedge_min_samples=20)
+    assert caller.hedge_delay("LinkedIn") == 6.0
+
+    for ms in range(1, 101):
+        caller._tracker("LinkedIn").record(ms / 100)
+    assert caller.hedge_delay("LinkedIn") == pytest.approx(0.95)
+
+
+def test_backoff_is_capped_full_jitter():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=2.0)
+    delays = [policy.delay(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= d <= 2.0 for d in delays)
+
+    tracker = LatencyTracker()
+    assert tracker.percentile(95) is None
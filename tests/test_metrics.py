@@ -0,0 +1,55 @@
+from app.services import generator, metrics
+
+
+def test_render_counter_and_histogram():
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter("demo_total", "Demo.", ("platform",)))
+    histogram = registry.register(metrics.Histogram("demo_seconds", "Demo.", ("platform",), buckets=(0.1, 1.0)))
+    registry.register(metrics.CallbackMetric("demo_depth", "Depth.", lambda: {(): 3}))
+    counter.inc(platform='X "quoted"')
+    histogram.observe(0.5, platform="X")
+
+    text = registry.render()
+
+    assert "# TYPE demo_total counter" in text
+    assert 'demo_total{platform="X \\"quoted\\""} 1' in text
+    assert 'demo_seconds_bucket{platform="X",le="0.1"} 0' in text
+    assert 'demo_seconds_bucket{platform="X",le="1"} 1' in text
+    assert 'demo_seconds_bucket{platform="X",le="+Inf"} 1' in text
+    assert 'demo_seconds_sum{platform="X"} 0.5' in text
+    assert "demo_depth 3" in text
+
+
+def test_fallback_reasons_are_bounded():
+    assert metrics.fallback_reason_label("OpenAI API error: Request timed out.") == "timeout"
+    assert metrics.fallback_reason_label("Error code: 429 - rate limit") == "rate_limited"
+    assert metrics.fallback_reason_label("Error code: 503 - unavailable") == "server_error"
+    assert metrics.fallback_reason_label("OpenAI response too short: 'x'") == "too_short"
+    assert metrics.fallback_reason_label("Circuit open: OpenAI calls paused (next probe in 9s)") == "circuit_open"
+    assert metrics.fallback_reason_label("something new") == "other"
+
+
+def test_style_labels_follow_the_template_styles():
+    # What the Streamlit UI and older API clients actually send
+    assert metrics.style_label("Trivance Default") == "trivance_default"
+    assert metrics.style_label("Punchy") == "punchy"
+    assert metrics.style_label("Casual") == "casual"
+    assert metrics.style_label("consultative") == "trivance_default"
+    assert metrics.style_label(None) == "trivance_default"
+    assert metrics.KNOWN_STYLES == set(generator.STYLE_EXAMPLES)
+
+
+def test_generation_records_tokens_and_cache(llm_cached, make_article):
+    labels = {"style": "casual", "platform": "Email"}
+    before_llm = metrics.GENERATIONS.value(method="openai_gpt", **labels)
+    before_tokens = metrics.GENERATION_TOKENS.value(method="openai_gpt", kind="completion", **labels)
+    before_hits = metrics.CACHE_LOOKUPS.value(result="hit", **labels)
+
+    generator.generate_commentary(make_article(), "casual", "Email")
+    generator.generate_commentary(make_article(), "casual", "Email")
+
+    assert metrics.GENERATIONS.value(method="openai_gpt", **labels) == before_llm + 1
+    assert metrics.GENERATION_TOKENS.value(method="openai_gpt", kind="completion", **labels) == before_tokens + 50
+    assert metrics.CACHE_LOOKUPS.value(result="hit", **labels) == before_hits + 1
+    assert metrics.GENERATION_SECONDS.count(method="cache", **labels) >= 1
+    assert 'trivance_generations_total{style="casual",platform="Email",method="openai_gpt"}' in metrics.render_metrics()
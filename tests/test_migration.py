@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from app.services import persistence
+from app.services.migration import iter_json_array, run_migration
+
+
+def write(path, data):
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def test_iter_json_array_streams_across_small_chunks(tmp_path):
+    items = [{"id": i, "title": f"Post {i} — “quoted”", "score": i * 1.5} for i in range(50)] + [12345]
+    path = tmp_path / "posts.json"
+    write(path, items)
+
+    assert list(iter_json_array(path, chunk_size=7)) == items
+
+
+def test_iter_json_array_finds_nested_key(tmp_path):
+    path = tmp_path / "content_vault.json"
+    write(path, {"stats": {"total_stored": 2}, "successful_posts": [{"a": 1}, {"b": "]"}]})
+
+    assert list(iter_json_array(path, key="successful_posts", chunk_size=5)) == [{"a": 1}, {"b": "]"}]
+
+
+def test_migration_moves_every_store(data_dir):
+    write(data_dir / "feeds.json", [{"name": "TC", "url": "https://tc/feed"}])
+    write(data_dir / "subscribers.json", ["a@example.com", "b@example.com"])
+    write(data_dir / "posts.json", [{"id": 1, "title": "t", "generated_content": "g", "timestamp": 1.0}])
+    write(data_dir / "generated_posts.json", [{"id": 3, "title": "t", "generated_post": "g", "hashtags": ["#AI"]}])
+    write(data_dir / "content_vault.json", {"successful_posts": [{"timestamp": "2025", "generated_post": "g"}],
+                                            "stats": {"total_stored": 1}})
+
+    report = run_migration(report=lambda line: None)
+
+    conn = persistence.get_db_connection()
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("feeds", "subscribers", "posts", "post_history", "vault_entries")}
+    assert report["migrated"] == 6
+    assert counts == {"feeds": 1, "subscribers": 2, "posts": 1, "post_history": 1, "vault_entries": 1}
+    assert json.loads(conn.execute("SELECT hashtags FROM post_history").fetchone()[0]) == ["#AI"]
+
+
+def test_migration_resumes_after_failure(data_dir):
+    posts = [{"id": i, "title": "t", "generated_content": "g"} for i in range(10)]
+    posts[7] = "corrupt record"
+    write(data_dir / "posts.json", posts)
+
+    with pytest.raises(Exception):
+        run_migration(sources=["posts"], batch_size=3, report=lambda line: None)
+
+    conn = persistence.get_db_connection()
+    assert conn.execute("SELECT records_done FROM migration_progress").fetchone()[0] == 6
+
+    posts[7] = {"id": 7, "title": "fixed", "generated_content": "g"}
+    write(data_dir / "posts.json", posts)
+    result = run_migration(sources=["posts"], batch_size=3, report=lambda line: None)
+
+    assert result["sources"][0]["skipped"] == 6
+    assert result["sources"][0]["migrated"] == 4
+    assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 10
+
+
+def test_clashing_and_missing_ids_are_rekeyed_not_dropped(data_dir):
+    write(data_dir / "posts.json", [
+        {"id": 1, "title": "a", "generated_content": "g"},
+        {"id": 1, "title": "b (same id)", "generated_content": "g"},
+        {"title": "no id 1", "generated_content": "g"},
+        {"title": "no id 2", "generated_content": "g"},
+    ])
+    write(data_dir / "subscribers.json", ["a@example.com", "a@example.com"])
+
+    report = run_migration(sources=["posts", "subscribers"], report=lambda line: None)
+
+    conn = persistence.get_db_connection()
+    titles = sorted(row[0] for row in conn.execute("SELECT title FROM posts"))
+    assert titles == ["a", "b (same id)", "no id 1", "no id 2"]
+    assert "None" not in [row[0] for row in conn.execute("SELECT id FROM posts")]
+    posts, subscribers = report["sources"]
+    assert (posts["migrated"], posts["rekeyed"], posts["duplicates"]) == (4, 3, 0)
+    assert (subscribers["migrated"], subscribers["duplicates"]) == (1, 1)
+
+    # Re-running over rows that are already there skips them as duplicates
+    again = run_migration(sources=["posts"], restart=True, report=lambda line: None)["sources"][0]
+    assert (again["migrated"], again["duplicates"]) == (0, 4)
@@ -0,0 +1,66 @@
+import random
+
+import httpx
+import openai
+import pytest
+
+from app.services.mock_openai import MockLLMConfig, MockOpenAIServer, parse_latency
+
+
+def _client(server):
+    return openai.OpenAI(api_key="mock", base_url=server.base_url, max_retries=0, http_client=httpx.Client())
+
+
+def _run(config, count=20):
+    """Outcome of ``count`` sequential requests: reply text or HTTP status."""
+    outcomes = []
+    with MockOpenAIServer(config) as server:
+        client = _client(server)
+        for _ in range(count):
+            try:
+                completion = client.chat.completions.create(
+                    model="mock-gpt", messages=[{"role": "user", "content": "Title: Ops automation\nSummary: x"}])
+                outcomes.append(completion.choices[0].message.content)
+            except openai.APIStatusError as e:
+                outcomes.append(e.status_code)
+    return outcomes
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2 for _ in range(50))
+    assert parse_latency("normal:0,1")(rng) >= 0  # clamped
+    samples = sorted(parse_latency("lognormal:0.5,0.3")(rng) for _ in range(201))
+    assert 0.4 < samples[100] < 0.6
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
+
+
+def test_seeded_runs_are_reproducible():
+    config = dict(error_rate=0.3, error_statuses=(500, 503), seed=7)
+    first = _run(MockLLMConfig(**config))
+    second = _run(MockLLMConfig(**config))
+
+    assert first == second
+    assert {500, 503} & set(first)
+    assert any(isinstance(o, str) and o.startswith("Ops automation") for o in first)
+    assert _run(MockLLMConfig(**{**config, "seed": 8})) != first
+
+
+def test_choices_usage_and_streaming():
+    with MockOpenAIServer(MockLLMConfig()) as server:
+        client = _client(server)
+        messages = [{"role": "user", "content": "Title: Ops automation\nSummary: teams automate intake."}]
+
+        completion = client.chat.completions.create(model="mock-gpt", messages=messages, n=3)
+        assert len(completion.choices) == 3
+        assert completion.usage.completion_tokens > 0
+        assert completion.usage.total_tokens == completion.usage.prompt_tokens + completion.usage.completion_tokens
+
+        chunks = list(client.chat.completions.create(
+            model="mock-gpt", messages=messages, stream=True, stream_options={"include_usage": True}))
+        text = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+        assert text.startswith("Ops automation")
+        assert chunks[-1].usage.total_tokens > 0
+        assert server.counters["requests"] == 2
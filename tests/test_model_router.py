@@ -0,0 +1,92 @@
+from app.services import generator, model_router
+from app.services.model_router import ModelRouter
+
+
+def _router(load=0.0, **kwargs):
+    return ModelRouter(models=["big", "small"], min_samples=3, headroom=1.0, load=lambda: load, **kwargs)
+
+
+def _observe(router, model, seconds, n=3):
+    for _ in range(n):
+        router.observe(model, seconds)
+
+
+def test_prefers_first_model_that_fits():
+    router = _router()
+    assert router.route(5).model == "big"  # no history yet: try it
+
+    _observe(router, "big", 8)
+    _observe(router, "small", 2)
+    route = router.route(5)
+    assert route.model == "small"
+    assert "big (~8.0s)" in route.reason
+    assert router.route(10).model == "big"
+
+
+def test_queue_depth_degrades_to_templates():
+    router = _router(load=2.0)
+    _observe(router, "big", 3)
+    _observe(router, "small", 1.5)
+
+    route = router.route(4)
+    assert route.model is None
+    assert route.to_dict()["target"] == "template"
+    assert "no model fits 4s budget" in route.reason
+    assert router.stats()["routes"] == {"template": 1}
+
+
+def test_current_load_rereads_the_rate_limit_queue_at_most_once_per_ttl(monkeypatch):
+    reads = []
+    monkeypatch.setattr(model_router.rate_limiter, "queue_depth", lambda: reads.append(1) or 4)
+    monkeypatch.setattr(model_router, "_queue_depth_reading", (float("-inf"), 0))
+    monkeypatch.setattr(model_router.generation_pool, "max_concurrency", 4)
+
+    loads = [model_router.current_load() for _ in range(3)]
+    assert loads == [1.0, 1.0, 1.0]
+    assert len(reads) == 1
+
+    monkeypatch.setattr(model_router, "ROUTER_QUEUE_DEPTH_TTL", 0)
+    model_router.current_load()
+    assert len(reads) == 2
+
+
+def test_old_samples_age_out():
+    router = _router(window_seconds=0)
+    _observe(router, "big", 30)
+    assert router.latency("big") is None
+    assert router.route(5).model == "big"
+
+
+def test_generation_reports_route(mock_openai_server, llm_enabled, make_article, monkeypatch):
+    router = _router()
+    monkeypatch.setattr(generator, "model_router", router)
+    article = make_article()
+
+    _observe(router, "big", 20)
+    result = generator.generate_commentary(article, "casual", "Email", budget_seconds=5)
+    assert result["method"] == "openai_gpt"
+    assert result["model"] == "small"
+    assert result["route"]["target"] == "small"
+    assert mock_openai_server.requests[-1]["body"]["model"] == "small"
+
+    _observe(router, "small", 20)
+    result = generator.generate_commentary(article, "casual", "Email", budget_seconds=5)
+    assert result["method"] == "template_improved"
+    assert result["route"]["target"] == "template"
+    assert len(mock_openai_server.requests) == 1
+
+
+def test_cached_post_beats_template_routing(mock_openai_server, llm_cached, make_article, monkeypatch):
+    router = _router()
+    monkeypatch.setattr(generator, "model_router", router)
+    article = make_article()
+    generator.generate_commentary(article, "casual", "Email", budget_seconds=5)
+
+    # Every model is now too slow for the budget, but the post is already cached
+    _observe(router, "big", 20)
+    _observe(router, "small", 20)
+    result = generator.generate_commentary(article, "casual", "Email", budget_seconds=5)
+    assert result["method"] == "openai_gpt"
+    assert result["cached"] is True
+    assert result["route"] == {**result["route"], "target": "big", "reason": "cached"}
+    assert len(mock_openai_server.requests) == 1
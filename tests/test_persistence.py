@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from app.services import persistence
+from app.services.persistence import JSONReadCache, load_json, save_json, append_to_json
+
+
+def test_load_json_is_served_from_cache(data_dir):
+    save_json("posts.json", [{"id": 1}])
+    before = persistence.read_cache.stats()
+
+    first = load_json("posts.json", [])
+    second = load_json("posts.json", [])
+
+    stats = persistence.read_cache.stats()
+    assert first == [{"id": 1}]
+    assert second is first
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["bytes"] == os.path.getsize(data_dir / "posts.json")
+
+
+def test_save_json_invalidates_cached_entry(data_dir):
+    save_json("posts.json", [{"id": 1}])
+    load_json("posts.json", [])
+
+    append_to_json("posts.json", {"id": 2})
+
+    assert load_json("posts.json", []) == [{"id": 1}, {"id": 2}]
+
+
+def test_external_write_is_detected_by_mtime_and_size(data_dir):
+    save_json("feeds.json", [])
+    assert load_json("feeds.json", []) == []
+
+    path = data_dir / "feeds.json"
+    path.write_text(json.dumps([{"name": "x", "url": "y"}]), encoding="utf-8")
+
+    assert load_json("feeds.json", []) == [{"name": "x", "url": "y"}]
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = JSONReadCache(max_bytes=10)
+    cache.put(tmp_path / "a.json", (1, 1, 6), "a")
+    cache.put(tmp_path / "b.json", (2, 1, 6), "b")
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 6
+    assert stats["evictions"] == 1
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_codecs_round_trip_non_ascii(name):
+    codec = persistence.get_codec(name)
+    if codec.name != name:
+        pytest.skip(f"{name} not installed")
+    data = [{"title": "AI — what’s next", "hashtags": ["#AI"], "score": 4.5}]
+
+    assert codec.loads(codec.dumps(data)) == data
+    assert codec.loads(codec.dumps(data, compact=True)) == data
+    assert len(codec.dumps(data, compact=True)) < len(codec.dumps(data))
+
+
+def test_unknown_codec_falls_back_to_stdlib():
+    assert persistence.get_codec("nope").name == "json"
+
+
+def test_compact_storage_option(data_dir, monkeypatch):
+    monkeypatch.setattr(persistence, "JSON_COMPACT_STORAGE", True)
+    save_json("posts.json", [{"id": 1}])
+
+    assert b"\n" not in (data_dir / "posts.json").read_bytes()
+    assert load_json("posts.json", []) == [{"id": 1}]
+
+
+def test_atomic_writes_keep_the_file_mode(data_dir):
+    save_json("posts.json", [])
+    assert os.stat(data_dir / "posts.json").st_mode & 0o777 == 0o666 & ~persistence._UMASK
+
+    os.chmod(data_dir / "posts.json", 0o640)
+    save_json("posts.json", [{"id": 1}])
+    assert os.stat(data_dir / "posts.json").st_mode & 0o777 == 0o640
@@ -0,0 +1,91 @@
+"""
+Stress tests: parallel writers against the same JSON stores must not lose updates.
+"""
+import multiprocessing
+import threading
+
+import pytest
+
+from app.services import persistence
+from app.services.persistence import append_to_json, file_lock, load_json, LockTimeoutError
+from app.services.post_store import IDAllocator, PostRepository
+
+WORKERS = 4
+WRITES_PER_WORKER = 25
+
+
+def _append_worker(data_dir, worker):
+    persistence.DATA_DIR = data_dir
+    for i in range(WRITES_PER_WORKER):
+        append_to_json("posts.json", {"worker": worker, "i": i})
+
+
+def _repository_worker(data_dir, worker):
+    persistence.DATA_DIR = data_dir
+    repo = PostRepository("generated_posts.json", allocator=IDAllocator())
+    for i in range(WRITES_PER_WORKER):
+        repo.add({"worker": worker, "i": i, "timestamp": float(i)})
+
+
+def _run_processes(target, data_dir):
+    try:
+        ctx = multiprocessing.get_context("fork")
+    except ValueError:
+        pytest.skip("fork start method not available")
+    processes = [ctx.Process(target=target, args=(data_dir, w)) for w in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+
+def test_parallel_appends_across_processes(data_dir):
+    _run_processes(_append_worker, data_dir)
+
+    posts = load_json("posts.json", [])
+    assert len(posts) == WORKERS * WRITES_PER_WORKER
+
+
+def test_parallel_repository_saves_get_unique_ids(data_dir):
+    _run_processes(_repository_worker, data_dir)
+
+    posts = load_json("generated_posts.json", [])
+    ids = [post["id"] for post in posts]
+    assert len(posts) == WORKERS * WRITES_PER_WORKER
+    assert sorted(ids) == list(range(1, WORKERS * WRITES_PER_WORKER + 1))
+
+
+def test_parallel_appends_across_threads(data_dir):
+    threads = [threading.Thread(target=_append_worker, args=(data_dir, w)) for w in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(load_json("posts.json", [])) == WORKERS * WRITES_PER_WORKER
+
+
+def test_lock_timeout_is_reported(data_dir):
+    path = data_dir / "feeds.json"
+    before = persistence.get_lock_stats()["timeouts"]
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with file_lock(path):
+            acquired.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    acquired.wait(5)
+    try:
+        with pytest.raises(LockTimeoutError):
+            with file_lock(path, timeout=0.05):
+                pass
+    finally:
+        release.set()
+        thread.join()
+
+    assert persistence.get_lock_stats()["timeouts"] == before + 1
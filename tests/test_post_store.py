@@ -0,0 +1,72 @@
+import json
+
+from app.services.post_store import IDAllocator, PostRepository
+
+
+def make_repo():
+    return PostRepository("generated_posts.json", allocator=IDAllocator())
+
+
+def test_ids_are_monotonic_and_not_reused_after_delete(data_dir):
+    repo = make_repo()
+    first = repo.add({"title": "a", "timestamp": "2025-01-01T00:00:00"})
+    second = repo.add({"title": "b", "timestamp": "2025-01-02T00:00:00"})
+
+    assert repo.delete(second["id"])
+    third = repo.add({"title": "c", "timestamp": "2025-01-03T00:00:00"})
+
+    assert (first["id"], second["id"], third["id"]) == (1, 2, 3)
+    assert repo.get(2) is None
+    assert repo.get("3")["title"] == "c"
+
+
+def test_allocator_continues_after_legacy_ids(data_dir):
+    (data_dir / "generated_posts.json").write_text(
+        json.dumps([{"id": 1, "timestamp": "2025-01-01"}, {"id": 7, "timestamp": "2025-01-02"}]),
+        encoding="utf-8",
+    )
+
+    assert make_repo().add({"title": "new"})["id"] == 8
+
+
+def test_recent_and_range_use_timestamp_order(data_dir):
+    repo = make_repo()
+    for day in (3, 1, 2, 5, 4):
+        repo.add({"title": f"day {day}", "timestamp": f"2025-01-0{day}T00:00:00Z"})
+    repo.delete(repo.recent(1)[0]["id"])
+
+    assert [p["title"] for p in repo.recent(3)] == ["day 4", "day 3", "day 2"]
+
+    start = repo.recent(10)[-1]["timestamp"]
+    titles = [p["title"] for p in repo.range(start=1735776000.0, end=1735948800.0)]
+    assert titles == ["day 4", "day 3", "day 2"]
+    assert start == "2025-01-01T00:00:00Z"
+
+
+def test_external_changes_rebuild_indexes(data_dir):
+    repo = make_repo()
+    repo.add({"title": "a", "timestamp": 1.0})
+
+    (data_dir / "generated_posts.json").write_text(
+        json.dumps([{"id": 10, "title": "external", "timestamp": 2.0}]), encoding="utf-8"
+    )
+
+    assert [p["title"] for p in repo.recent(5)] == ["external"]
+
+
+def test_rows_with_duplicate_or_missing_ids_are_rekeyed_not_dropped(data_dir):
+    (data_dir / "generated_posts.json").write_text(json.dumps([
+        {"id": 1, "title": "a", "timestamp": 1.0},
+        {"id": 2, "title": "b", "timestamp": 2.0},
+        {"id": 2, "title": "c (collided after delete)", "timestamp": 3.0},
+        {"title": "no id 1", "timestamp": 4.0},
+        {"title": "no id 2", "timestamp": 5.0},
+    ]), encoding="utf-8")
+    repo = make_repo()
+
+    repo.add({"title": "new", "timestamp": 6.0})
+
+    stored = json.loads((data_dir / "generated_posts.json").read_text(encoding="utf-8"))
+    assert [p["title"] for p in stored] == ["a", "b", "c (collided after delete)", "no id 1", "no id 2", "new"]
+    assert sorted(p["id"] for p in stored) == [1, 2, 3, 4, 5, 6]
+    assert repo.get(3)["previous_id"] == 2
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from app.services.generator import extract_key_insights
+from app.services.prompt_builder import PromptBuilder, estimate_message_tokens, estimate_tokens
+
+SENTENCES = [
+    "The new AI platform automates invoice matching for small finance teams.",
+    "Early customers report a 40 percent reduction in manual data entry across workflows.",
+    "The vendor also announced a partnership with a regional bank.",
+    "Integration with existing accounting tools takes under a day according to the company.",
+    "Pricing starts at a flat monthly fee with no per-seat charges.",
+]
+
+
+def _article(summary, title="AI platform automates invoice matching"):
+    return SimpleNamespace(title=title, summary=summary, source="Example News", link="https://example.com/a")
+
+
+def test_estimate_tokens_scales_with_text():
+    assert estimate_tokens("") == 0
+    short = estimate_tokens("A short sentence about automation.")
+    assert 5 <= short <= 12
+    assert estimate_tokens("A short sentence about automation. " * 10) > 8 * short
+
+
+def test_static_prefix_is_identical_across_requests():
+    builder = PromptBuilder(extract_key_insights)
+    first = builder.build(_article(" ".join(SENTENCES)), "casual", "LinkedIn")
+    second = builder.build(_article(SENTENCES[0] + " " + SENTENCES[1], title="Other title"), "punchy", "X")
+
+    assert first.messages[0]["role"] == "system"
+    assert first.messages[0]["content"].encode() == second.messages[0]["content"].encode()
+    assert "Other title" not in second.messages[0]["content"]
+    assert "Other title" in second.prompt
+
+
+def test_under_budget_keeps_full_summary():
+    summary = " ".join(SENTENCES)
+    plan = PromptBuilder(extract_key_insights, budgets={"LinkedIn": 2000}).build(_article(summary))
+
+    assert plan.summary_strategy == "full"
+    assert f"Summary: {summary}" in plan.prompt
+    assert "Key insights to optionally reference" in plan.prompt
+    assert plan.estimated_tokens == estimate_message_tokens(plan.messages)
+
+
+def test_over_budget_compresses_extractively():
+    summary = " ".join(SENTENCES * 3)
+    full = PromptBuilder(extract_key_insights, budgets={"LinkedIn": 5000}).build(_article(summary))
+    budget = full.estimated_tokens - 150
+    plan = PromptBuilder(extract_key_insights, budgets={"LinkedIn": budget}).build(_article(summary))
+
+    assert plan.summary_strategy == "extractive"
+    assert plan.original_tokens == full.estimated_tokens
+    assert plan.estimated_tokens <= budget
+    assert "invoice matching" in plan.prompt
+    assert "Key insights to optionally reference" not in plan.prompt
+
+
+def test_tight_budget_truncates_to_fit():
+    builder = PromptBuilder(extract_key_insights, budgets={"X": 1})
+    system_only = builder.build(_article("x" * 30), platform="X")
+    tight = PromptBuilder(extract_key_insights, budgets={"X": system_only.estimated_tokens + 6})
+    plan = tight.build(_article(" ".join(SENTENCES * 3)), platform="X")
+
+    assert plan.summary_strategy == "truncated"
+    assert plan.estimated_tokens <= plan.budget
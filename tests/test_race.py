@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import posts
+from app.services import jobs
+from app.services.post_store import posts_repository
+from app.services.posts import save_generated_post
+
+ARTICLE = {
+    "title": "Automation tools for operations teams",
+    "summary": "Small teams are using AI automation to route tickets and forecast inventory demand.",
+    "source": "Example News",
+    "link": "https://example.com/race",
+    "post_style": "casual",
+    "platform": "Email",
+}
+
+
+@pytest.fixture
+def client(llm_enabled):
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+    yield TestClient(app)
+    jobs.job_workers.stop()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_fast_llm_wins_the_race(client):
+    result = client.post("/posts/generate", params={"race_sla": 3}, json=ARTICLE).json()
+
+    assert result["method"] == "openai_gpt"
+    assert result["race"]["winner"] == "llm"
+    assert "upgrade_job" not in result
+
+
+def test_slow_llm_upgrades_history_later(client, mock_openai_server):
+    mock_openai_server.config.latency = "fixed:0.6"
+
+    started = time.time()
+    result = client.post("/posts/generate", params={"race_sla": 0.1}, json=ARTICLE).json()
+
+    assert time.time() - started < 0.5
+    assert result["method"] == "template_improved"
+    assert result["race"]["winner"] == "template"
+    post_id = result["post_id"]
+    assert posts_repository.get(post_id)["generated_content"] == result["post"]
+
+    job_url = result["upgrade_job"]["status_url"]
+    assert _wait_for(lambda: client.get(job_url).json()["status"] == "succeeded")
+    assert _wait_for(lambda: posts_repository.get(post_id).get("method") == "openai_gpt")
+    upgraded = posts_repository.get(post_id)
+    assert upgraded["generated_content"] == mock_openai_server.config.reply
+    assert upgraded["upgrade_job"] == result["upgrade_job"]["id"]
+    assert len(posts_repository.all()) == 1
+
+
+def test_upgrade_applies_when_job_finishes_first(data_dir):
+    saved = save_generated_post("t", "s", "src", "", "template text")
+    job_id = jobs.job_queue.enqueue("upgrade", {})
+    job = jobs.job_queue.claim("w")
+    jobs.job_queue.finish(job["id"], "w", {"post": "llm text", "method": "openai_gpt"})
+
+    jobs.attach_upgrade(job_id, saved["post_id"])
+
+    assert posts_repository.get(saved["post_id"])["generated_content"] == "llm text"
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.services.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def limiter(data_dir):
+    # 600 tokens/minute refills 10 tokens per second
+    return RateLimiter(rpm=10000, tpm=600, enabled=True, db_path=data_dir / "limits.db")
+
+
+def test_burst_then_wait_for_refill(limiter):
+    assert limiter.acquire(600) < 0.1
+
+    waited = limiter.acquire(5)
+
+    assert 0.3 < waited < 1.0
+    assert limiter.stats()["granted"] == 2
+    assert limiter.stats()["waited"] == 1
+
+
+def test_queue_depth_while_waiting(limiter):
+    limiter.acquire(600)
+    thread = threading.Thread(target=limiter.acquire, args=(8,))
+    thread.start()
+    time.sleep(0.2)
+
+    assert limiter.queue_depth() == 1
+    thread.join(timeout=5)
+    assert limiter.queue_depth() == 0
+
+
+def test_cancelled_waiter_leaves_queue(limiter):
+    limiter.acquire(600)
+
+    async def cancel_waiter():
+        task = asyncio.ensure_future(limiter.acquire_async(300))
+        await asyncio.sleep(0.1)
+        assert limiter.queue_depth() == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_waiter())
+    assert limiter.queue_depth() == 0
+
+
+def test_locked_database_does_not_block_the_event_loop(limiter):
+    limiter.acquire(0)  # creates the database before it is locked
+    other_process = sqlite3.connect(str(limiter.db_path), isolation_level=None)
+    other_process.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        ticks = 0
+        task = asyncio.ensure_future(limiter.acquire_async(1))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.3, other_process.execute, "COMMIT")
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        await task
+        return ticks
+
+    # The loop kept running while the acquire waited ~0.3s on the write lock
+    assert asyncio.run(scenario()) > 10
+    other_process.close()
+    assert limiter.queue_depth() == 0
+
+
+def test_disabled_limiter_never_waits(data_dir):
+    limiter = RateLimiter(rpm=1, tpm=1, enabled=False, db_path=data_dir / "limits.db")
+    assert limiter.acquire(10_000) == 0.0
+    assert limiter.acquire(10_000) == 0.0
+
+
+def _acquire_and_log(db_path, log_path, name):
+    RateLimiter(rpm=10000, tpm=600, enabled=True, db_path=db_path).acquire(3)
+    with open(log_path, "a") as f:
+        f.write(name + "\n")
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_waiters_are_served_in_arrival_order_across_processes(limiter, data_dir):
+    limiter.acquire(600)
+    log_path = data_dir / "order.log"
+    ctx = multiprocessing.get_context("fork")
+    processes = []
+    for name in ("first", "second", "third"):
+        p = ctx.Process(target=_acquire_and_log, args=(limiter.db_path, log_path, name))
+        p.start()
+        processes.append(p)
+        time.sleep(0.05)
+    for p in processes:
+        p.join(timeout=10)
+
+    assert log_path.read_text().split() == ["first", "second", "third"]
@@ -0,0 +1,53 @@
+import json
+import time
+
+from app.services import retention
+from app.services.retention import RetentionPolicy, prune_store, query_archive, find_archived
+
+DAY = 86400
+NOW = time.mktime((2025, 6, 15, 12, 0, 0, 0, 0, -1))
+
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_expired_posts_move_to_monthly_archives(data_dir):
+    posts = [{"id": i, "timestamp": NOW - days * DAY} for i, days in enumerate([200, 100, 95, 10, 1])]
+    posts.append({"id": "undated"})
+    write(data_dir / "posts.json", posts)
+
+    result = prune_store(RetentionPolicy("posts", "posts.json", max_age_days=90), now=NOW)
+
+    hot = json.loads((data_dir / "posts.json").read_text(encoding="utf-8"))
+    assert [p["id"] for p in hot] == [3, 4, "undated"]
+    assert result["archived"] == 3
+    assert sorted(result["months"]) == ["2024-11", "2025-03"]
+    assert (data_dir / "archive" / "posts" / "2025-03.jsonl.gz").exists()
+
+
+def test_archived_records_stay_queryable(data_dir, monkeypatch):
+    posts = [{"id": i, "timestamp": NOW - days * DAY} for i, days in enumerate([200, 100, 95, 1])]
+    write(data_dir / "posts.json", posts)
+    policy = RetentionPolicy("posts", "posts.json", max_age_days=90)
+    monkeypatch.setitem(retention.POLICIES, "posts", policy)
+    prune_store(policy, now=NOW)
+
+    assert [p["id"] for p in query_archive("posts")] == [2, 1, 0]
+    assert [p["id"] for p in query_archive("posts", start=NOW - 150 * DAY)] == [2, 1]
+    assert [p["id"] for p in query_archive("posts", limit=1)] == [2]
+    assert find_archived("posts", "0")["id"] == 0
+
+
+def test_record_cap_archives_oldest_vault_entries(data_dir):
+    entries = [{"timestamp": f"2025-06-0{d}T00:00:00", "generated_post": str(d)} for d in range(1, 6)]
+    write(data_dir / "content_vault.json", {"successful_posts": entries, "stats": {"total_stored": 5}})
+    policy = RetentionPolicy("vault", "content_vault.json", max_age_days=0, max_records=2,
+                             key="successful_posts")
+
+    prune_store(policy, now=NOW)
+
+    vault = json.loads((data_dir / "content_vault.json").read_text(encoding="utf-8"))
+    assert [e["generated_post"] for e in vault["successful_posts"]] == ["4", "5"]
+    assert vault["stats"]["total_stored"] == 2
+    assert len(query_archive("vault")) == 3
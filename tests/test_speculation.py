@@ -0,0 +1,113 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import posts
+from app.services import generator
+from app.services.model_router import ModelRouter
+from app.services.speculation import Speculator
+
+
+def queue(n=3):
+    return [{"title": f"Automation tools for operations teams #{i}",
+             "summary": f"Small teams use AI automation to route tickets and forecast demand ({i}).",
+             "source": "Example News", "link": f"https://example.com/{i}", "score": 10 - i}
+            for i in range(n)]
+
+
+def test_top_articles_are_pregenerated_and_served_from_cache(llm_cached, make_article, data_dir):
+    speculator = Speculator(top_n=2, ttl_seconds=120)
+    queued = speculator.speculate(queue(3))
+    speculator.wait()
+
+    assert len(queued) == 2
+    assert speculator.stats()["generated"] == 2
+    assert speculator.stats()["tokens_today"] == 300
+
+    article = make_article(**queue(1)[0])
+    result = generator.generate_commentary(article, speculator.style, speculator.platform)
+    assert result["cached"] is True
+    assert result["speculative"] is True
+
+    # Already cached: nothing is spent again
+    assert speculator.speculate(queue(2)) == []
+    assert speculator.stats()["skipped"]["cached"] == 2
+
+
+def test_ui_generate_click_is_served_from_speculation(llm_cached, monkeypatch):
+    # OPENAI_MODELS configured differently from OPENAI_MODEL must not split the keys
+    monkeypatch.setattr(generator, "model_router", ModelRouter(models=["gpt-4o", generator.OPENAI_MODEL]))
+    speculator = Speculator(top_n=1)
+    speculator.speculate(queue(1))
+    speculator.wait()
+    calls = len(llm_cached.requests)
+
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+    # What the Streamlit Generate button sends with its default selections
+    payload = {**{k: queue(1)[0][k] for k in ("title", "summary", "source", "link")},
+               "post_style": "Trivance Default", "platform": "LinkedIn"}
+    response = TestClient(app).post("/posts/generate/stream", json=payload)
+
+    done = [line for line in response.text.splitlines() if line.startswith("data: ")][-1]
+    result = json.loads(done[len("data: "):])
+    assert result["speculative"] is True
+    assert len(llm_cached.requests) == calls
+
+
+def test_speculative_entries_use_their_own_ttl(llm_cached, make_article):
+    speculator = Speculator(top_n=1, ttl_seconds=-1)
+    speculator.speculate(queue(1))
+    speculator.wait()
+
+    article = make_article(**queue(1)[0])
+    assert generator.generation_cache.contains(
+        generator.generation_cache_key(article, speculator.style, speculator.platform)) is False
+
+
+def test_daily_token_cap_is_shared_between_workers(llm_cached, data_dir):
+    # Another worker process has reserved most of today's budget
+    other_worker = Speculator(daily_token_cap=1000)
+    reservation = other_worker.reserve(900)
+    speculator = Speculator(top_n=3, daily_token_cap=1000)
+
+    assert speculator.speculate(queue(3)) == []
+    assert speculator.stats()["skipped"]["budget"] == 3
+
+    other_worker.settle(reservation, 900)
+    assert speculator.stats()["tokens_today"] == 900
+
+    # Yesterday's spend does not count
+    with sqlite3.connect(data_dir / "speculation.db") as conn:
+        conn.execute("UPDATE speculation_spend SET day = '2000-01-01'")
+    assert len(speculator.speculate(queue(1))) == 1
+    speculator.wait()
+    assert speculator.stats()["tokens_today"] == 150
+    assert other_worker.stats()["tokens_today"] == 150
+
+
+def test_speculative_posts_reach_the_vault_only_when_served(llm_cached, make_article, monkeypatch):
+    stored = []
+    monkeypatch.setattr(generator, "content_vault",
+                        SimpleNamespace(store_successful_post=lambda title, post, metadata: stored.append(title)))
+    speculator = Speculator(top_n=2)
+    speculator.speculate(queue(2))
+    speculator.wait()
+    assert stored == []
+
+    article = make_article(**queue(1)[0])
+    for _ in range(2):
+        result = generator.generate_commentary(article, speculator.style, speculator.platform)
+        assert result["speculative"] is True and "vault_metadata" not in result
+    assert stored == [article.title]
+
+
+def test_disabled_without_llm(data_dir, monkeypatch):
+    monkeypatch.setattr(generator, "USE_GPT", False)
+    speculator = Speculator()
+
+    assert speculator.speculate(queue(3)) == []
+    assert speculator.stats()["submitted"] == 0
@@ -0,0 +1,61 @@
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services import generator
+from app.services.llm_client import generation_pool
+
+
+def test_stream_yields_tokens_then_final_result(mock_openai_server, llm_cached, make_article):
+    events = list(generator.generate_commentary(make_article(), "casual", "LinkedIn", stream=True))
+
+    tokens = [e["text"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 3
+    assert "".join(tokens) == mock_openai_server.config.reply
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["result"]["method"] == "openai_gpt"
+    assert done["result"]["token_usage"]["total_tokens"] == 150
+    # Post-processing happens once the stream ends
+    assert done["result"]["post"].startswith(mock_openai_server.config.reply)
+    assert "#TrivanceAI" in done["result"]["post"]
+
+    # The streamed result is cached like a regular generation
+    assert generator.generate_commentary(make_article(), "casual", "LinkedIn")["cached"] is True
+
+
+def test_closing_stream_cancels_request(mock_openai_server, llm_enabled, make_article):
+    mock_openai_server.config.token_delay = 0.2
+    cancelled = generation_pool.stats()["cancelled"]
+
+    events = generator.generate_commentary(make_article(), "casual", "Email", stream=True)
+    assert next(events)["type"] == "token"
+    events.close()
+
+    time.sleep(0.1)
+    assert generation_pool.stats()["cancelled"] == cancelled + 1
+    assert generation_pool.stats()["in_flight"] == 0
+
+
+def test_stream_endpoint_emits_sse_and_saves(data_dir, monkeypatch):
+    from fastapi import FastAPI
+    from app.routes import posts
+    from app.services.posts import get_all_posts
+
+    app = FastAPI()
+    app.include_router(posts.router, prefix="/posts")
+
+    monkeypatch.setattr(generator, "USE_GPT", False)
+    payload = {"title": "Automation for ops teams", "post_style": "punchy",
+               "summary": "Small teams are using AI automation to route tickets quickly."}
+
+    with TestClient(app) as client:
+        response = client.post("/posts/generate/stream", json=payload)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [f for f in response.text.split("\n\n") if f]
+    assert [f.split("\n")[0] for f in frames] == ["event: token", "event: done"]
+    result = json.loads(frames[-1].split("data: ", 1)[1])
+    assert result["method"] == "template_improved"
+    assert [p["generated_content"] for p in get_all_posts()] == [result["post"]]
@@ -0,0 +1,59 @@
+import pytest
+
+from app.services import generator
+
+
+class _Vault:
+    def __init__(self):
+        self.stored = []
+
+    def store_successful_post(self, title, post, metadata):
+        self.stored.append((post, metadata))
+
+
+@pytest.fixture
+def vault(llm_enabled, monkeypatch):
+    vault = _Vault()
+    monkeypatch.setattr(generator, "content_vault", vault)
+    return vault
+
+
+def test_variants_come_from_one_request(mock_openai_server, vault, make_article):
+    result = generator.generate_commentary(make_article(), "casual", "Email", variants=3)
+
+    assert len(mock_openai_server.requests) == 1
+    assert mock_openai_server.requests[0]["body"]["n"] == 3
+    assert [v["variant"] for v in result["variants"]] == [1, 2, 3]
+    assert result["post"] == result["variants"][0]["post"]
+    assert result["token_usage"]["total_tokens"] == 150
+
+    shares = [v["token_usage"] for v in result["variants"]]
+    assert sum(s["prompt_tokens"] for s in shares) == 100
+    assert sum(s["completion_tokens"] for s in shares) == 50
+    assert [m["token_usage"] for _, m in vault.stored] == shares
+
+
+def test_single_variant_request_is_unchanged(mock_openai_server, vault, make_article):
+    result = generator.generate_commentary(make_article(), "casual", "Email")
+
+    assert "n" not in mock_openai_server.requests[0]["body"]
+    assert "variants" not in result
+    assert len(vault.stored) == 1
+
+
+def test_fallback_pads_variants_with_templates(mock_openai_server, vault, make_article):
+    mock_openai_server.config.reply = "Too short"
+
+    result = generator.generate_commentary(make_article(), "casual", "LinkedIn", variants=2)
+
+    assert result["method"] == "template_improved"
+    assert "No usable drafts" in result["fallback_reason"]
+    assert len(result["variants"]) == 2
+    assert vault.stored == []
+
+
+def test_split_usage_adds_up():
+    shares = generator._split_usage({"prompt_tokens": 10, "completion_tokens": 7, "total_tokens": 17},
+                                    ["short", "a much longer draft than the first", ""])
+    assert sum(s["total_tokens"] for s in shares) == 17
+    assert shares[1]["completion_tokens"] > shares[0]["completion_tokens"]
@@ -1,8 +1,43 @@
+import json
+import uuid
+
 import streamlit as st
 import requests
 
 API_URL = "http://localhost:8000"  # Adjust if hosted remotely
 
+
+def action_key(action, payload):
+    """
+    Idempotency key for one user action. Resending the same request before it
+    has succeeded (a double click, a rerun that interrupted it, a retry after
+    an error) reuses the key; once finish_action() is called, the next click
+    is a new action with a fresh key.
+    """
+    pending = st.session_state.setdefault("pending_actions", {})
+    body = json.dumps(payload, sort_keys=True)
+    if action not in pending or pending[action]["body"] != body:
+        pending[action] = {"body": body, "key": uuid.uuid4().hex}
+    return pending[action]["key"]
+
+
+def finish_action(action):
+    st.session_state.get("pending_actions", {}).pop(action, None)
+
+
+def stream_generation(payload, key, fresh=False):
+    """Yield (event, data) pairs from the /posts/generate/stream SSE endpoint."""
+    with requests.post(f"{API_URL}/posts/generate/stream", json=payload, stream=True, timeout=60,
+                       params={"fresh": "true"} if fresh else None,
+                       headers={"Idempotency-Key": key}) as res:
+        res.raise_for_status()
+        event = None
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                yield event, json.loads(line[len("data: "):])
+
 st.set_page_config(page_title="Trivance AI Content Engine", layout="wide")
 st.title("🧠 Trivance AI – Content Engine Dashboard")
 
@@ -202,31 +237,43 @@ with tabs[1]:
         ):
             if st.session_state.selected_article:
                 try:
-                    with st.spinner("Generating AI-powered post..."):
-                        # Prepare generation parameters with correct field names
-                        article = st.session_state.selected_article
-                        payload = {
-                            "title": article.get("title", ""),
-                            "summary": article.get("summary", ""),
-                            "source": article.get("source", "RSS Feed"),  # Ensure source is provided
-                            "link": article.get("link", ""),  # Use 'link' not 'url'
-                            "post_style": st.session_state.post_style,  # Use 'post_style' not 'style'
-                            "platform": st.session_state.platform
-                        }
-                        
-                        # Call generation API
-                        gen_res = requests.post(f"{API_URL}/posts/generate", json=payload)
-                        gen_res.raise_for_status()
-                        
-                        result = gen_res.json()
-                        # Handle the correct response field name
-                        generated_content = result.get("post", result.get("content", ""))
-                        if generated_content:
-                            st.session_state.generated_post = generated_content
-                            st.success("✅ Post generated successfully!")
-                        else:
-                            st.warning("⚠️ Post generated but content is empty")
-                            st.json(result)  # Debug: show the actual response
+                    # Prepare generation parameters with correct field names
+                    article = st.session_state.selected_article
+                    payload = {
+                        "title": article.get("title", ""),
+                        "summary": article.get("summary", ""),
+                        "source": article.get("source", "RSS Feed"),  # Ensure source is provided
+                        "link": article.get("link", ""),  # Use 'link' not 'url'
+                        "post_style": st.session_state.post_style,  # Use 'post_style' not 'style'
+                        "platform": st.session_state.platform
+                    }
+                    
+                    # Generating again for the same article and settings asks for a new post, not the cached one
+                    body = json.dumps(payload, sort_keys=True)
+                    fresh = st.session_state.get("last_generated") == body
+                    
+                    # Stream the post in as it is written
+                    preview = st.empty()
+                    streamed_text = ""
+                    result = {}
+                    for event, data in stream_generation(payload, action_key("generate", payload), fresh):
+                        if event == "token":
+                            streamed_text += data.get("text", "")
+                            preview.markdown(streamed_text + "▌")
+                        elif event == "done":
+                            result = data
+                            finish_action("generate")
+                            st.session_state.last_generated = body
+                    preview.empty()
+                    
+                    # Handle the correct response field name
+                    generated_content = result.get("post", result.get("content", ""))
+                    if generated_content:
+                        st.session_state.generated_post = generated_content
+                        st.success("✅ Post generated successfully!")
+                    else:
+                        st.warning("⚠️ Post generated but content is empty")
+                        st.json(result)  # Debug: show the actual response
                         
                 except requests.RequestException as e:
                     st.error(f"Error generating post: {e}")
@@ -362,9 +409,12 @@ with tabs[1]:
                                 }
                                 
                                 # Save to history (API call)
-                                save_res = requests.post(f"{API_URL}/posts/save", json=post_data)
+                                # A double click or retry of this save doesn't add a second row
+                                save_res = requests.post(f"{API_URL}/posts/save", json=post_data,
+                                                         headers={"Idempotency-Key": action_key("save", post_data)})
                                 
                                 if save_res.status_code == 200:
+                                    finish_action("save")
                                     st.success("🎉 Post published and saved to history!")
                                     
                                     # Log to terminal for now